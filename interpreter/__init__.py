@@ -1,10 +1,19 @@
-from .core.async_core import AsyncInterpreter
 from .core.computer.terminal.base_language import BaseLanguage
 from .core.core import OpenInterpreter
 
 interpreter = OpenInterpreter()
 computer = interpreter.computer
 
+
+def __getattr__(name):
+    # The server pulls in fastapi and uvicorn, so only import it when someone asks for it
+    if name == "AsyncInterpreter":
+        from .core.async_core import AsyncInterpreter
+
+        return AsyncInterpreter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 #     ____                      ____      __                            __
 #    / __ \____  ___  ____     /  _/___  / /____  _________  ________  / /____  _____
 #   / / / / __ \/ _ \/ __ \    / // __ \/ __/ _ \/ ___/ __ \/ ___/ _ \/ __/ _ \/ ___/
@@ -1,4 +1,5 @@
 import asyncio
+import copy
 import json
 import os
 import shutil
@@ -7,6 +8,9 @@ import threading
 import time
 import traceback
 from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
 
@@ -16,8 +20,6 @@ from starlette.websockets import WebSocketState
 
 from .core import OpenInterpreter
 
-last_start_time = 0
-
 try:
     import janus
     import uvicorn
@@ -46,6 +48,9 @@ class AsyncInterpreter(OpenInterpreter):
         super().__init__(*args, **kwargs)
 
         self.respond_thread = None
+        self.respond_pool = (
+            None  # Set by the SessionManager, so sessions share a capped pool
+        )
         self.stop_event = threading.Event()
         self.output_queue = None
         self.unsent_messages = deque()
@@ -57,10 +62,22 @@ class AsyncInterpreter(OpenInterpreter):
         )
         self.acknowledged_outputs = []
 
-        self.server = Server(self)
+        self._server = None
 
         # For the 01. This lets the OAI compatible server accumulate context before responding.
         self.context_mode = True
+        self.last_start_time = 0
+
+    @property
+    def server(self):
+        # Created on first use, so sessions (which are AsyncInterpreters too) don't each build one
+        if self._server is None:
+            self._server = Server(self)
+        return self._server
+
+    @server.setter
+    def server(self, value):
+        self._server = value
 
     async def input(self, chunk):
         """
@@ -70,9 +87,8 @@ class AsyncInterpreter(OpenInterpreter):
 
         if "start" in chunk:
             # If the user is starting something, the interpreter should stop.
-            if self.respond_thread is not None and self.respond_thread.is_alive():
-                self.stop_event.set()
-                self.respond_thread.join()
+            if self.is_responding():
+                self.stop_responding()
             self.accumulate(chunk)
         elif "content" in chunk:
             self.accumulate(chunk)
@@ -88,19 +104,46 @@ class AsyncInterpreter(OpenInterpreter):
 
                 if command == "stop":
                     # Any start flag would have stopped it a moment ago, but to be sure:
-                    self.stop_event.set()
-                    self.respond_thread.join()
+                    self.stop_responding()
                     return
                 if command == "go":
                     # This is to approve code.
                     run_code = True
                     pass
 
-            self.stop_event.clear()
+            self.start_responding(run_code)
+
+    def start_responding(self, run_code=None):
+        """
+        Runs respond() in the background, on the shared pool if there is one.
+        """
+        self.stop_event.clear()
+        if self.respond_pool is None:
             self.respond_thread = threading.Thread(
                 target=self.respond, args=(run_code,)
             )
             self.respond_thread.start()
+        else:
+            self.respond_thread = self.respond_pool.submit(self.respond, run_code)
+
+    def is_responding(self):
+        if isinstance(self.respond_thread, Future):
+            return not self.respond_thread.done()
+        return self.respond_thread is not None and self.respond_thread.is_alive()
+
+    def stop_responding(self):
+        """
+        Tells respond() to stop, and waits until it has.
+        """
+        if self.respond_thread is None:
+            return
+        self.stop_event.set()
+        if isinstance(self.respond_thread, Future):
+            # Still waiting for a worker? Then it never has to start
+            self.respond_thread.cancel()
+            wait([self.respond_thread])
+        else:
+            self.respond_thread.join()
 
     async def output(self):
         if self.output_queue == None:
@@ -276,6 +319,254 @@ class AsyncInterpreter(OpenInterpreter):
             self.messages[-1]["content"] += chunk
 
 
+async def iterate_in_thread(make_iterator, pool=None, maxsize=64):
+    """
+    Runs a blocking iterator on a worker thread, and yields its items on the event loop.
+
+    The queue between the two is bounded, so a slow client slows the iterator down
+    instead of letting output pile up. If we stop early (say, the client went away), so does the iterator.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=maxsize)
+    cancelled = threading.Event()
+    done = object()
+
+    def put(item):
+        if cancelled.is_set():
+            return
+        try:
+            # Blocks while the queue is full. That's the backpressure
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        except RuntimeError:
+            # The event loop is gone
+            return
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except FutureTimeoutError:
+                if cancelled.is_set():
+                    future.cancel()
+                    return
+
+    def work():
+        iterator = make_iterator()
+        try:
+            for item in iterator:
+                if cancelled.is_set():
+                    break
+                put((None, item))
+        except Exception as e:
+            put((e, None))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+            put((None, done))
+
+    if pool is None:
+        threading.Thread(target=work, daemon=True).start()
+    else:
+        pool.submit(work)
+
+    try:
+        while True:
+            error, item = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        cancelled.set()
+
+
+# Copied from the default interpreter onto every new session
+SESSION_SETTINGS = [
+    "offline",
+    "auto_run",
+    "verbose",
+    "debug",
+    "max_output",
+    "safe_mode",
+    "shrink_images",
+    "disable_telemetry",
+    "loop",
+    "loop_message",
+    "loop_breakers",
+    "conversation_history",
+    "conversation_history_path",
+    "os",
+    "sync_computer",
+    "system_message",
+    "custom_instructions",
+    "user_message_template",
+    "always_apply_user_message_template",
+    "code_output_template",
+    "empty_code_output_template",
+    "code_output_sender",
+    "print",
+    "require_acknowledge",
+    "context_mode",
+]
+LLM_SESSION_SETTINGS = [
+    "completions",
+    "model",
+    "temperature",
+    "supports_vision",
+    "supports_functions",
+    "execution_instructions",
+    "context_window",
+    "max_tokens",
+    "api_base",
+    "api_key",
+    "api_version",
+    "max_budget",
+]
+COMPUTER_SESSION_SETTINGS = [
+    "offline",
+    "verbose",
+    "debug",
+    "emit_images",
+    "import_computer_api",
+    "import_skills",
+    "max_output",
+]
+
+
+class SessionManager:
+    """
+    Maps session IDs to isolated AsyncInterpreters, so one server can serve many clients.
+
+    Each session has its own messages, stop event, output queue and language processes, with settings
+    copied from `default` when it's created. Clients that don't send a session ID all share `default`.
+
+    Every session's respond() runs on one pool of `max_workers` threads, and sessions that have been
+    idle for `timeout` seconds are shut down.
+    """
+
+    def __init__(self, default, max_workers=None, timeout=None):
+        if max_workers is None:
+            max_workers = int(os.getenv("INTERPRETER_MAX_WORKERS", "8"))
+        if timeout is None:
+            timeout = float(os.getenv("INTERPRETER_SESSION_TIMEOUT", "3600"))
+
+        self.default = default
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="respond"
+        )
+        self.default.respond_pool = self.pool
+
+        self.sessions = {}
+        self.last_used = {}
+        self.connections = {}
+        self.lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reaper = None
+
+    def get(self, session_id=None):
+        """
+        Returns the session's interpreter, creating it if it's new.
+        """
+        if not session_id:
+            return self.default
+
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.create()
+                self.sessions[session_id] = session
+                self._start_reaper()
+            self.last_used[session_id] = time.monotonic()
+        return session
+
+    def connect(self, session_id=None):
+        """
+        Like get(), but the session won't be evicted until you disconnect().
+        """
+        session = self.get(session_id)
+        if session_id:
+            with self.lock:
+                self.connections[session_id] = self.connections.get(session_id, 0) + 1
+        return session
+
+    def disconnect(self, session_id=None):
+        if session_id:
+            with self.lock:
+                if session_id in self.connections:
+                    self.connections[session_id] -= 1
+                self.last_used[session_id] = time.monotonic()
+
+    def create(self):
+        session = AsyncInterpreter()
+        for setting in SESSION_SETTINGS:
+            setattr(session, setting, copy.copy(getattr(self.default, setting)))
+        for setting in LLM_SESSION_SETTINGS:
+            setattr(session.llm, setting, getattr(self.default.llm, setting))
+        for setting in COMPUTER_SESSION_SETTINGS:
+            setattr(session.computer, setting, getattr(self.default.computer, setting))
+        session.computer.skills.path = self.default.computer.skills.path
+        session.computer.terminal.languages = list(
+            self.default.computer.terminal.languages
+        )
+        session.respond_pool = self.pool
+        return session
+
+    def close(self, session_id):
+        """
+        Stops the session and shuts down its language processes.
+        """
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+            self.last_used.pop(session_id, None)
+            self.connections.pop(session_id, None)
+        if session is not None:
+            session.stop_responding()
+            session.computer.terminate()
+
+    def evict_idle(self):
+        now = time.monotonic()
+        with self.lock:
+            idle = [
+                session_id
+                for session_id, session in self.sessions.items()
+                if now - self.last_used[session_id] > self.timeout
+                and not self.connections.get(session_id)
+                and not session.is_responding()
+            ]
+        for session_id in idle:
+            self.close(session_id)
+        return idle
+
+    def _start_reaper(self):
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap, daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        interval = min(max(self.timeout / 4, 1), 60)
+        while not self._closed.wait(interval):
+            self.evict_idle()
+
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            return {
+                session_id: {
+                    "idle": now - self.last_used[session_id],
+                    "connections": self.connections.get(session_id, 0),
+                    "responding": session.is_responding(),
+                    "messages": len(session.messages),
+                }
+                for session_id, session in self.sessions.items()
+            }
+
+    def shutdown(self):
+        self._closed.set()
+        for session_id in list(self.sessions):
+            self.close(session_id)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
 def authenticate_function(key):
     """
     This function checks if the provided key is valid for authentication.
@@ -294,9 +585,21 @@ def authenticate_function(key):
         return key == api_key
 
 
-def create_router(async_interpreter):
+def create_router(async_interpreter, sessions=None):
     router = APIRouter()
 
+    if sessions is None:
+        sessions = SessionManager(async_interpreter)
+
+    def get_session_id(connection):
+        """
+        Clients pick a session with an `X-Session-ID` header, or a `session_id` query parameter
+        (browsers can't set headers on websockets). Without one, they share the default interpreter.
+        """
+        return connection.headers.get("x-session-id") or connection.query_params.get(
+            "session_id"
+        )
+
     @router.get("/heartbeat")
     async def heartbeat():
         return {"status": "alive"}
@@ -438,6 +741,9 @@ def create_router(async_interpreter):
     async def websocket_endpoint(websocket: WebSocket):
         await websocket.accept()
 
+        session_id = get_session_id(websocket)
+        async_interpreter = sessions.connect(session_id)
+
         try:  # solving it ;)/ # killian super wrote this
 
             async def receive_input():
@@ -630,9 +936,13 @@ def create_router(async_interpreter):
             print(error)
             print("\n\n--- (ERROR ABOVE WILL BE SENT WHEN POSSIBLE) ---\n\n")
 
+        finally:
+            sessions.disconnect(session_id)
+
     # TODO
     @router.post("/")
-    async def post_input(payload: Dict[str, Any]):
+    async def post_input(payload: Dict[str, Any], request: Request):
+        async_interpreter = sessions.get(get_session_id(request))
         try:
             async_interpreter.input(payload)
             return {"status": "success"}
@@ -640,7 +950,8 @@ def create_router(async_interpreter):
             return {"error": str(e)}, 500
 
     @router.post("/settings")
-    async def set_settings(payload: Dict[str, Any]):
+    async def set_settings(payload: Dict[str, Any], request: Request):
+        async_interpreter = sessions.get(get_session_id(request))
         for key, value in payload.items():
             print("Updating settings...")
             # print(f"Updating settings: {key} = {value}")
@@ -667,7 +978,8 @@ def create_router(async_interpreter):
         return {"status": "success"}
 
     @router.get("/settings/{setting}")
-    async def get_setting(setting: str):
+    async def get_setting(setting: str, request: Request):
+        async_interpreter = sessions.get(get_session_id(request))
         if hasattr(async_interpreter, setting):
             setting_value = getattr(async_interpreter, setting)
             try:
@@ -677,10 +989,23 @@ def create_router(async_interpreter):
         else:
             return json.dumps({"error": "Setting not found"}), 404
 
+    @router.get("/sessions")
+    async def list_sessions():
+        return {"sessions": sessions.stats()}
+
+    @router.delete("/sessions/{session_id}")
+    def close_session(session_id: str):
+        # Not async, so FastAPI runs it on a thread while the language processes shut down
+        if session_id not in sessions.sessions:
+            return {"error": "Session not found"}, 404
+        sessions.close(session_id)
+        return {"status": "success"}
+
     if os.getenv("INTERPRETER_INSECURE_ROUTES", "").lower() == "true":
 
         @router.post("/run")
-        async def run_code(payload: Dict[str, Any]):
+        async def run_code(payload: Dict[str, Any], request: Request):
+            async_interpreter = sessions.get(get_session_id(request))
             language, code = payload.get("language"), payload.get("code")
             if not (language and code):
                 return {"error": "Both 'language' and 'code' are required."}, 400
@@ -723,7 +1048,10 @@ def create_router(async_interpreter):
         temperature: Optional[float] = None
         stream: Optional[bool] = False
 
-    async def openai_compatible_generator():
+    def openai_compatible_chunks(async_interpreter):
+        """
+        The blocking half of the OpenAI-compatible stream. Runs on a worker thread.
+        """
         made_chunk = False
 
         for message in [
@@ -734,10 +1062,9 @@ def create_router(async_interpreter):
             "Can you respond?",
             "Please reply.",
         ]:
-            for i, chunk in enumerate(
-                async_interpreter.chat(message=message, stream=True, display=True)
+            for chunk in async_interpreter.chat(
+                message=message, stream=True, display=True
             ):
-                await asyncio.sleep(0)  # Yield control to the event loop
                 made_chunk = True
 
                 if async_interpreter.stop_event.is_set():
@@ -751,22 +1078,56 @@ def create_router(async_interpreter):
                     output_content = " "
 
                 if output_content:
-                    await asyncio.sleep(0)
-                    output_chunk = {
-                        "id": i,
-                        "object": "chat.completion.chunk",
-                        "created": time.time(),
-                        "model": "open-interpreter",
-                        "choices": [{"delta": {"content": output_content}}],
-                    }
-                    yield f"data: {json.dumps(output_chunk)}\n\n"
+                    yield output_content
 
             if made_chunk:
                 break
 
+    def usage_since(async_interpreter, usage_before):
+        prompt_tokens = (
+            async_interpreter.llm.usage["prompt_tokens"] - usage_before["prompt_tokens"]
+        )
+        completion_tokens = (
+            async_interpreter.llm.usage["completion_tokens"]
+            - usage_before["completion_tokens"]
+        )
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    async def openai_compatible_generator(async_interpreter):
+        completion_id = "chatcmpl-" + shortuuid.uuid()
+        usage_before = dict(async_interpreter.llm.usage)
+
+        def output_chunk(delta, finish_reason=None):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": time.time(),
+                "model": "open-interpreter",
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+
+        # The interpreter blocks (on the LLM, on code), so it runs on a worker thread.
+        # That way a stalled stream never holds up the event loop, or anyone else's stream
+        async for output_content in iterate_in_thread(
+            lambda: openai_compatible_chunks(async_interpreter),
+            pool=async_interpreter.respond_pool,
+        ):
+            yield f"data: {json.dumps(output_chunk({'content': output_content}))}\n\n"
+
+        final_chunk = output_chunk({}, finish_reason="stop")
+        final_chunk["usage"] = usage_since(async_interpreter, usage_before)
+        yield f"data: {json.dumps(final_chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
     @router.post("/openai/chat/completions")
-    async def chat_completion(request: ChatCompletionRequest):
-        global last_start_time
+    async def chat_completion(request: ChatCompletionRequest, http_request: Request):
+        async_interpreter = sessions.get(get_session_id(http_request))
 
         # Convert to LMC
         last_message = request.messages[-1]
@@ -832,7 +1193,7 @@ def create_router(async_interpreter):
                 if async_interpreter.messages[-1]["content"] == "{START}":
                     # Remove that {START} message that would have just been added
                     async_interpreter.messages = async_interpreter.messages[:-1]
-                last_start_time = time.time()
+                async_interpreter.last_start_time = time.time()
                 if (
                     async_interpreter.messages
                     and async_interpreter.messages[-1].get("role") != "user"
@@ -841,7 +1202,7 @@ def create_router(async_interpreter):
             else:
                 # Check if we're within 6 seconds of last_start_time
                 current_time = time.time()
-                if current_time - last_start_time <= 6:
+                if current_time - async_interpreter.last_start_time <= 6:
                     # Continue processing
                     pass
                 else:
@@ -856,22 +1217,34 @@ def create_router(async_interpreter):
                 return
 
         async_interpreter.stop_event.set()
-        time.sleep(0.1)
+        await asyncio.sleep(0.1)
         async_interpreter.stop_event.clear()
 
         if request.stream:
             return StreamingResponse(
-                openai_compatible_generator(), media_type="application/x-ndjson"
+                openai_compatible_generator(async_interpreter),
+                media_type="application/x-ndjson",
             )
         else:
-            messages = async_interpreter.chat(message=".", stream=False, display=True)
+            usage_before = dict(async_interpreter.llm.usage)
+            messages = await asyncio.get_running_loop().run_in_executor(
+                async_interpreter.respond_pool,
+                lambda: async_interpreter.chat(message=".", stream=False, display=True),
+            )
             content = messages[-1]["content"]
             return {
                 "id": "200",
                 "object": "chat.completion",
                 "created": time.time(),
                 "model": request.model,
-                "choices": [{"message": {"role": "assistant", "content": content}}],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage_since(async_interpreter, usage_before),
             }
 
     return router
@@ -883,7 +1256,8 @@ class Server:
 
     def __init__(self, async_interpreter, host=None, port=None):
         self.app = FastAPI()
-        router = create_router(async_interpreter)
+        self.sessions = SessionManager(async_interpreter)
+        router = create_router(async_interpreter, self.sessions)
         self.authenticate = authenticate_function
 
         # Add authentication middleware
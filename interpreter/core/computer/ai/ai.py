@@ -1,7 +1,12 @@
+import hashlib
+import json
+import time
 from concurrent.futures import ThreadPoolExecutor
 
 import tiktoken
 
+from ...utils.lru_cache import LRUCache
+
 
 def split_into_chunks(text, tokens, llm, overlap):
     try:
@@ -77,46 +82,132 @@ def chunk_responses(responses, tokens, llm):
     return chunked_responses
 
 
-def fast_llm(llm, system_message, user_message):
-    old_messages = llm.interpreter.messages
-    old_system_message = llm.interpreter.system_message
-    try:
-        llm.interpreter.system_message = system_message
-        llm.interpreter.messages = []
-        response = llm.interpreter.chat(user_message)
-    finally:
-        llm.interpreter.messages = old_messages
-        llm.interpreter.system_message = old_system_message
-        return response[-1].get("content")
-
-
-def query_map_chunks(chunks, llm, query):
-    """Query the chunks of text using query_chunk_map."""
-    with ThreadPoolExecutor() as executor:
-        responses = list(
-            executor.map(lambda chunk: fast_llm(llm, query, chunk), chunks)
-        )
-    return responses
-
+def complete(llm, system_message, user_message):
+    """
+    One completion, straight from llm.completions. Apart from resolving the model (which loads it
+    the first time, like a chat would) nothing is changed, so this is safe to call from many threads at once.
+    """
+    params = {
+        "model": llm.resolve_model(),
+        "messages": [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ],
+        "stream": True,
+    }
+    for setting in ["api_key", "api_base", "api_version", "max_tokens", "temperature"]:
+        if getattr(llm, setting, None):
+            params[setting] = getattr(llm, setting)
+    # Our own endpoint ("i") wants it
+    conversation_id = getattr(
+        getattr(llm, "interpreter", None), "conversation_id", None
+    )
+    if conversation_id:
+        params["conversation_id"] = conversation_id
+
+    response = []
+    for chunk in llm.completions(**params):
+        if "choices" not in chunk or len(chunk["choices"]) == 0:
+            continue
+        content = chunk["choices"][0]["delta"].get("content")
+        if content:
+            response.append(content)
+    return "".join(response)
+
+
+class MapReduce:
+    """
+    Runs a prompt over chunks of text in parallel, then merges the answers in a tree until one is left.
+
+    Every call is one stateless completion (see `complete`), at most `max_workers` at a time,
+    retried up to `retries` times with backoff. Answers are cached by a hash of the model, prompt and text,
+    so running it again on a mostly unchanged document only pays for what changed.
+    """
+
+    def __init__(self, llm, max_workers=8, retries=2, retry_delay=1, cache=None):
+        self.llm = llm
+        self.max_workers = max_workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.cache = cache if cache is not None else LRUCache(1000)
+
+    def key(self, prompt, text):
+        data = json.dumps([self.llm.model, prompt, text])
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def answer(self, prompt, text, key):
+        for attempt in range(self.retries + 1):
+            try:
+                response = complete(self.llm, prompt, text)
+                break
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.retry_delay * 2**attempt)
+
+        self.cache.set(key, response)
+        return response
 
-def query_reduce_chunks(responses, llm, chunk_size, query):
-    """Reduce query responses in a while loop."""
-    while len(responses) > 1:
-        chunks = chunk_responses(responses, chunk_size, llm)
+    def map(self, prompt, texts):
+        """
+        Runs `prompt` on each text and returns the answers in order. Identical texts are only sent once.
+        """
+        keys = [self.key(prompt, text) for text in texts]
+        answers = {key: self.cache.get(key) for key in keys}
+        missing = {key: text for key, text in zip(keys, texts) if answers[key] is None}
+
+        if missing:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(missing))
+            ) as executor:
+                futures = {
+                    key: executor.submit(self.answer, prompt, text, key)
+                    for key, text in missing.items()
+                }
+                for key, future in futures.items():
+                    answers[key] = future.result()
+
+        return [answers[key] for key in keys]
+
+    def reduce(self, prompt, answers, max_tokens):
+        """
+        Merges answers in groups that fit in `max_tokens`, one level at a time, until there's one.
+        """
+        while len(answers) > 1:
+            groups = chunk_responses(answers, max_tokens, self.llm)
+            if len(groups) >= len(answers):
+                # Each answer is too long to group with another. Pair them up anyway, so every level shrinks
+                groups = [
+                    "\n\n".join(answers[i : i + 2]) for i in range(0, len(answers), 2)
+                ]
+            answers = self.map(prompt, groups)
+        return answers[0]
+
+    def run(self, text, prompt, reduce_prompt=None, chunk_size=2000, overlap=50):
+        chunks = split_into_chunks(text, chunk_size, self.llm, overlap)
+        if not chunks:
+            return ""
 
-        # Use multithreading to summarize each chunk simultaneously
-        with ThreadPoolExecutor() as executor:
-            summaries = list(
-                executor.map(lambda chunk: fast_llm(llm, query, chunk), chunks)
-            )
+        # (Map) Query each chunk
+        answers = self.map(prompt, chunks)
 
-    return summaries[0]
+        # (Reduce) Compress the answers
+        return self.reduce(reduce_prompt or prompt, answers, chunk_size)
 
 
 class Ai:
     def __init__(self, computer):
         self.computer = computer
 
+        # Settings for query and summarize
+        self.chunk_size = 2000
+        self.overlap = 50
+        self.max_workers = 8
+        self.retries = 2
+
+        # Answers by content hash, shared across queries, so unchanged chunks aren't sent again
+        self.cache = LRUCache(1000)
+
     def chat(self, text, base64=None):
         messages = [
             {
@@ -165,27 +256,20 @@ class Ai:
             return response[-1].get("content")
 
     def query(self, text, query, custom_reduce_query=None):
-        if custom_reduce_query == None:
-            custom_reduce_query = query
-
-        chunk_size = 2000
-        overlap = 50
-
-        # Split the text into chunks
-        chunks = split_into_chunks(
-            text, chunk_size, self.computer.interpreter.llm, overlap
+        map_reduce = MapReduce(
+            self.computer.interpreter.llm,
+            max_workers=self.max_workers,
+            retries=self.retries,
+            cache=self.cache,
         )
-
-        # (Map) Query each chunk
-        responses = query_map_chunks(chunks, self.computer.interpreter.llm, query)
-
-        # (Reduce) Compress the responses
-        response = query_reduce_chunks(
-            responses, self.computer.interpreter.llm, chunk_size, custom_reduce_query
+        return map_reduce.run(
+            text,
+            query,
+            reduce_prompt=custom_reduce_query,
+            chunk_size=self.chunk_size,
+            overlap=self.overlap,
         )
 
-        return response
-
     def summarize(self, text):
         query = "You are a highly skilled AI trained in language comprehension and summarization. I would like you to read the following text and summarize it into a concise abstract paragraph. Aim to retain the most important points, providing a coherent and readable summary that could help a person understand the main points of the discussion without needing to read the entire text. Please avoid unnecessary details or tangential points."
         custom_reduce_query = "You are tasked with taking multiple summarized texts and merging them into one unified and concise summary. Maintain the core essence of the content and provide a clear and comprehensive summary that encapsulates all the main points from the individual summaries."
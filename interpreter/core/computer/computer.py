@@ -1,21 +1,30 @@
+import importlib
 import json
+import threading
 
-from .ai.ai import Ai
-from .browser.browser import Browser
-from .calendar.calendar import Calendar
-from .clipboard.clipboard import Clipboard
-from .contacts.contacts import Contacts
-from .display.display import Display
-from .docs.docs import Docs
-from .files.files import Files
-from .keyboard.keyboard import Keyboard
-from .mail.mail import Mail
-from .mouse.mouse import Mouse
-from .os.os import Os
-from .skills.skills import Skills
-from .sms.sms import SMS
 from .terminal.terminal import Terminal
-from .vision.vision import Vision
+
+# Tools are imported and created the first time they're used. Between them they pull in
+# PIL, IPython, selenium and more, which most sessions never need
+TOOLS = {
+    "mouse": ("mouse.mouse", "Mouse"),
+    "keyboard": ("keyboard.keyboard", "Keyboard"),
+    "display": ("display.display", "Display"),
+    "clipboard": ("clipboard.clipboard", "Clipboard"),
+    "mail": ("mail.mail", "Mail"),
+    "sms": ("sms.sms", "SMS"),
+    "calendar": ("calendar.calendar", "Calendar"),
+    "contacts": ("contacts.contacts", "Contacts"),
+    "browser": ("browser.browser", "Browser"),
+    "os": ("os.os", "Os"),
+    "vision": ("vision.vision", "Vision"),
+    "skills": ("skills.skills", "Skills"),
+    "docs": ("docs.docs", "Docs"),
+    "ai": ("ai.ai", "Ai"),
+    "files": ("files.files", "Files"),
+}
+
+tools_lock = threading.RLock()
 
 
 class Computer:
@@ -28,23 +37,9 @@ class Computer:
         self.verbose = False
         self.debug = False
 
-        self.mouse = Mouse(self)
-        self.keyboard = Keyboard(self)
-        self.display = Display(self)
-        self.clipboard = Clipboard(self)
-        self.mail = Mail(self)
-        self.sms = SMS(self)
-        self.calendar = Calendar(self)
-        self.contacts = Contacts(self)
-        self.browser = Browser(self)
-        self.os = Os(self)
-        self.vision = Vision(self)
-        self.skills = Skills(self)
-        self.docs = Docs(self)
-        self.ai = Ai(self)
-        self.files = Files(self)
-
         self.emit_images = True
+        # Only show the part of the screen that changed since the last screenshot
+        self.screenshot_changes_only = False
         self.api_base = "https://api.openinterpreter.com/v0"
         self.save_skills = True
 
@@ -81,6 +76,20 @@ Do not import the computer module, or any of its sub-modules. They are already i
 
     """.strip()
 
+    def __getattr__(self, name):
+        # Only called for attributes we don't have yet, like a tool's first use
+        if name not in TOOLS:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+
+        with tools_lock:
+            if name not in self.__dict__:
+                module, class_name = TOOLS[name]
+                module = importlib.import_module("." + module, __package__)
+                self.__dict__[name] = getattr(module, class_name)(self)
+        return self.__dict__[name]
+
     # Shortcut for computer.terminal.languages
     @property
     def languages(self):
@@ -14,6 +14,7 @@ from IPython.display import display
 from PIL import Image
 
 from ...utils.lazy_import import lazy_import
+from ..utils.frame_diff import FrameDiff
 from ..utils.recipient_utils import format_to_recipient
 
 # Still experimenting with this
@@ -41,7 +42,8 @@ class Display:
         # set width and height to None initially to prevent pyautogui from importing until it's needed
         self._width = None
         self._height = None
-        self._hashes = {}
+        # The last screenshot we showed, to tell what changed since
+        self.frames = FrameDiff()
 
     # We use properties here so that this code only executes when height/width are accessed for the first time
     @property
@@ -81,6 +83,7 @@ class Display:
         screen=0,
         combine_screens=True,
         active_app_only=True,
+        changes_only=None,
     ):
         """
         Redirects to self.screenshot
@@ -91,6 +94,7 @@ class Display:
             quadrant=quadrant,
             combine_screens=combine_screens,
             active_app_only=active_app_only,
+            changes_only=changes_only,
         )
 
     # def get_active_window(self):
@@ -103,11 +107,13 @@ class Display:
         quadrant=None,
         active_app_only=True,
         combine_screens=True,
+        changes_only=None,
     ):
         """
         Shows you what's on the screen by taking a screenshot of the entire screen or a specified quadrant. Returns a `pil_image` `in case you need it (rarely). **You almost always want to do this first!**
         :param screen: specify which display; 0 for primary and 1 and above for secondary.
         :param combine_screens: If True, a collage of all display screens will be returned. Otherwise, a list of display screens will be returned.
+        :param changes_only: If True, only shows the part of the screen that changed since the last screenshot (or nothing, if nothing did). Defaults to computer.screenshot_changes_only.
         """
 
         # Since Local II, all images sent to local models will be rendered to text with moondream and pytesseract.
@@ -195,6 +201,33 @@ class Display:
         else:
             screenshot = screenshot.convert("RGB")
 
+        if changes_only is None:
+            changes_only = self.computer.screenshot_changes_only
+
+        if show and changes_only and not isinstance(screenshot, list):
+            change = self.frames.update(screenshot)
+            if change["change"] == "none":
+                print(
+                    format_to_recipient(
+                        "The screen hasn't changed since the last screenshot.",
+                        "assistant",
+                    )
+                )
+                show = False
+            elif change["change"] == "region":
+                left, top, right, bottom = change["region"]
+                print(
+                    format_to_recipient(
+                        f"Only part of the screen changed since the last screenshot. Showing that part, from ({left}, {top}) to ({right}, {bottom}) in screenshot pixels. To see the whole screen, use computer.display.view(changes_only=False).",
+                        "assistant",
+                    )
+                )
+                display(change["image"])
+                show = False
+        elif show:
+            # Whatever we show next is compared with this, not an older frame
+            self.frames.reset()
+
         if show:
             # Show the image using IPython display
             if isinstance(screenshot, list):
@@ -205,6 +238,16 @@ class Display:
 
         return screenshot  # this will be a list of combine_screens == False
 
+    def changes(self, screenshot=None):
+        """
+        What changed on screen since the last call (or the last screenshot shown with changes_only).
+        Returns a dict: "change" is "none", "region" or "full", "region" is the changed (left, top, right, bottom),
+        and "image" is what to look at (None, the changed region, or the whole screenshot).
+        """
+        if screenshot == None:
+            screenshot = self.screenshot(show=False)
+        return self.frames.update(screenshot)
+
     def find(self, description, screenshot=None):
         if description.startswith('"') and description.endswith('"'):
             return self.find_text(description.strip('"'), screenshot)
@@ -212,7 +255,6 @@ class Display:
             try:
                 if self.computer.debug:
                     print("DEBUG MODE ON")
-                    print("NUM HASHES:", len(self._hashes))
                 else:
                     message = format_to_recipient(
                         "Locating this icon will take ~15 seconds. Subsequent icons should be found more quickly.",
@@ -220,14 +262,10 @@ class Display:
                     )
                     print(message)
 
-                if len(self._hashes) > 5000:
-                    self._hashes = dict(list(self._hashes.items())[-5000:])
-
                 from .point.point import point
 
-                result = point(
-                    description, screenshot, self.computer.debug, self._hashes
-                )
+                # Icon embeddings are cached on disk, see point.get_embedding_store
+                result = point(description, screenshot, self.computer.debug)
 
                 return result
             except:
@@ -266,6 +304,22 @@ class Display:
                         + "\n\nIcon locating API not available, or we were unable to find the icon. Please try another method to find this icon."
                     )
 
+    def warm_up(self):
+        """
+        Loads the icon-finding models in a background thread, so the first find() doesn't wait for them.
+        """
+        from .point.point import models
+
+        return models.warmup()
+
+    def model_stats(self):
+        """
+        Which icon-finding models are loaded, how long they took to load, and roughly how much memory they use.
+        """
+        from .point.point import models
+
+        return models.stats()
+
     def find_text(self, text, screenshot=None):
         """
         Searches for specified text within a screenshot or the current screen if no screenshot is provided.
@@ -2,26 +2,34 @@ import hashlib
 import io
 import os
 import subprocess
+import time
+from contextlib import contextmanager
 from typing import List
 
-import cv2
-import nltk
-import numpy as np
-import torch
 from PIL import Image, ImageDraw, ImageEnhance, ImageFont
-from sentence_transformers import SentenceTransformer, util
 
 from .....terminal_interface.utils.oi_dir import oi_dir
+from ....utils.lazy_import import lazy_import
+from ...utils.box_index import BoxGrid, merge_overlapping
 from ...utils.computer_vision import pytesseract_get_text_bounding_boxes
+from ...utils.embedding_store import EmbeddingStore
+from ...utils.model_registry import ModelRegistry
+from ...utils.ocr_cache import OcrCache
 
-try:
-    nltk.corpus.words.words()
-except LookupError:
-    nltk.download("words", quiet=True)
-from nltk.corpus import words
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
 
-# Create a set of English words
-english_words = set(words.words())
+# How long each stage of the last find_icon took, in seconds
+timings = {}
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - start
 
 
 def take_screenshot_to_pil(filename="temp_screenshot.png"):
@@ -52,13 +60,16 @@ def point(description, screenshot=None, debug=False, hashes=None):
 def find_icon(description, screenshot=None, debug=False, hashes=None):
     if debug:
         print("STARTING")
+    timings.clear()
     if screenshot == None:
-        image_data = take_screenshot_to_pil()
+        with timed("screenshot"):
+            image_data = take_screenshot_to_pil()
     else:
         image_data = screenshot
 
+    # Icon embeddings by hash. Persisted under oi_dir, so they outlive the session
     if hashes == None:
-        hashes = {}
+        hashes = get_embedding_store()
 
     image_width, image_height = image_data.size
 
@@ -68,7 +79,8 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
     #     temp_image_path = temp_file.name
     #   print("yeah took", time.time()-thetime)
 
-    icons_bounding_boxes = get_element_boxes(image_data, debug)
+    with timed("detect"):
+        icons_bounding_boxes = get_element_boxes(image_data, debug)
 
     if debug:
         print("GOT ICON BOUNDING BOXES")
@@ -131,7 +143,8 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
     if debug:
         print("GETTING TEXT")
 
-    response = pytesseract_get_text_bounding_boxes(screenshot)
+    with timed("ocr"):
+        response = pytesseract_get_text_bounding_boxes(image_data)
 
     if debug:
         print("GOT TEXT, processing it")
@@ -160,6 +173,8 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
     ]  # icons are sometimes text, like "X"
 
     # Filter blocks so the text.lower() needs to be a real word in the English dictionary
+    with timed("load_english_words"):
+        english_words = models.get("english_words")
     filtered_blocks = []
     for b in blocks:
         words = b["text"].lower().split()
@@ -210,26 +225,26 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
             os.path.join(debug_path, "pytesseract_filtered_blocks_image_with_text.png")
         )
 
-    # Create an empty list to store the filtered boxes
-    filtered_boxes = []
+    filter_start = time.perf_counter()
+
+    # Text boxes in a grid, so each icon is only compared with the text near it
+    text_grid = BoxGrid(
+        (
+            (b["left"], b["top"], b["left"] + b["width"], b["top"] + b["height"])
+            for b in blocks
+        ),
+        cell_size=int(os.getenv("OI_POINT_GRID_CELL_SIZE", "64")),
+    )
+
+    def corners(box):
+        return (box["x"], box["y"], box["x"] + box["width"], box["y"] + box["height"])
 
     # Filter out boxes that fall inside text
-    for box in icons_bounding_boxes:
-        if not any(
-            text_box["left"] <= box["x"] <= text_box["left"] + text_box["width"]
-            and text_box["top"] <= box["y"] <= text_box["top"] + text_box["height"]
-            and text_box["left"]
-            <= box["x"] + box["width"]
-            <= text_box["left"] + text_box["width"]
-            and text_box["top"]
-            <= box["y"] + box["height"]
-            <= text_box["top"] + text_box["height"]
-            for text_box in blocks
-        ):
-            filtered_boxes.append(box)
-        else:
-            pass
-            # print("Filtered out an icon because I think it is text.")
+    filtered_boxes = [
+        box
+        for box in icons_bounding_boxes
+        if not text_grid.any_containing(corners(box))
+    ]
 
     icons_bounding_boxes = filtered_boxes
 
@@ -252,17 +267,13 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
         )
 
     # Filter out boxes that intersect with text at all
-    filtered_boxes = []
-    for box in icons_bounding_boxes:
-        if not any(
-            max(text_box["left"], box["x"])
-            < min(text_box["left"] + text_box["width"], box["x"] + box["width"])
-            and max(text_box["top"], box["y"])
-            < min(text_box["top"] + text_box["height"], box["y"] + box["height"])
-            for text_box in blocks
-        ):
-            filtered_boxes.append(box)
-    icons_bounding_boxes = filtered_boxes
+    icons_bounding_boxes = [
+        box
+        for box in icons_bounding_boxes
+        if not text_grid.any_overlapping(corners(box))
+    ]
+
+    timings["filter_text"] = time.perf_counter() - filter_start
 
     if debug:
         # Create a copy of the image data
@@ -340,43 +351,25 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
         )
 
     def combine_boxes(icons_bounding_boxes):
-        while True:
-            combined_boxes = []
-            for box in icons_bounding_boxes:
-                for i, combined_box in enumerate(combined_boxes):
-                    if (
-                        box["x"] < combined_box["x"] + combined_box["width"]
-                        and box["x"] + box["width"] > combined_box["x"]
-                        and box["y"] < combined_box["y"] + combined_box["height"]
-                        and box["y"] + box["height"] > combined_box["y"]
-                    ):
-                        combined_box["x"] = min(box["x"], combined_box["x"])
-                        combined_box["y"] = min(box["y"], combined_box["y"])
-                        combined_box["width"] = (
-                            max(
-                                box["x"] + box["width"],
-                                combined_box["x"] + combined_box["width"],
-                            )
-                            - combined_box["x"]
-                        )
-                        combined_box["height"] = (
-                            max(
-                                box["y"] + box["height"],
-                                combined_box["y"] + combined_box["height"],
-                            )
-                            - combined_box["y"]
-                        )
-                        break
-                else:
-                    combined_boxes.append(box.copy())
-            if len(combined_boxes) == len(icons_bounding_boxes):
-                break
-            else:
-                icons_bounding_boxes = combined_boxes
-        return combined_boxes
+        merged = merge_overlapping(
+            (corners(box) for box in icons_bounding_boxes),
+            cell_size=int(os.getenv("OI_POINT_GRID_CELL_SIZE", "64")),
+        )
+        return [
+            {
+                "x": left,
+                "y": top,
+                "width": right - left,
+                "height": bottom - top,
+                "center_x": (left + right) / 2,
+                "center_y": (top + bottom) / 2,
+            }
+            for left, top, right, bottom in merged
+        ]
 
     if os.getenv("OI_POINT_OVERLAP", "True") == "True":
-        icons_bounding_boxes = combine_boxes(icons_bounding_boxes)
+        with timed("combine"):
+            icons_bounding_boxes = combine_boxes(icons_bounding_boxes)
 
     if debug:
         image_data_copy = image_data.copy()
@@ -388,6 +381,7 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
             os.path.join(debug_path, "debug_image_after_combining_boxes.png")
         )
 
+    crop_start = time.perf_counter()
     icons = []
     for box in icons_bounding_boxes:
         x, y, w, h = box["x"], box["y"], box["width"], box["height"]
@@ -414,6 +408,8 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
 
         icons.append(icon)
 
+    timings["crop"] = time.perf_counter() - crop_start
+
     # Draw and show an image with the full screenshot and all the icons bounding boxes drawn on it in red
     if debug:
         image_data_copy = image_data.copy()
@@ -430,10 +426,13 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
     if debug:
         print("FINALLY, SEARCHING")
 
-    top_icons = image_search(description, icons, hashes, debug)
+    with timed("search"):
+        top_icons = image_search(description, icons, hashes, debug)
 
     if debug:
         print("DONE")
+        for stage, seconds in timings.items():
+            print(f"{stage}: {seconds * 1000:.1f} ms")
 
     coordinates = [t["coordinate"] for t in top_icons]
 
@@ -445,110 +444,195 @@ def find_icon(description, screenshot=None, debug=False, hashes=None):
 
 fast_model = True
 
-# First, we load the respective CLIP model
-model = SentenceTransformer("clip-ViT-B-32")
+# Where the SigLIP weights are saved, if fast_model is False
+model_path = os.path.join(oi_dir, "models", "vit_base_patch16_siglip.pt")
 
 
-import os
+def get_device():
+    import torch
 
-import timm
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    elif torch.backends.mps.is_available():
+        return torch.device("mps")
+    else:
+        return torch.device("cpu")
 
-if fast_model == False:
-    # Check if the model file exists
-    if not os.path.isfile(model_path):
-        # If not, create and save the model
-        model = timm.create_model(
-            "vit_base_patch16_siglip_224",
-            pretrained=True,
-            num_classes=0,
-        )
-        model = model.eval()
-        torch.save(model.state_dict(), model_path)
+
+def load_english_words():
+    import nltk
+
+    try:
+        nltk.corpus.words.words()
+    except LookupError:
+        nltk.download("words", quiet=True)
+    from nltk.corpus import words
+
+    # Create a set of English words
+    return set(words.words())
+
+
+def load_icon_model():
+    import torch
+
+    transforms = None
+
+    if fast_model:
+        # First, we load the respective CLIP model
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer("clip-ViT-B-32")
     else:
-        # If the model file exists, load the model from the saved state
-        model = timm.create_model(
-            "vit_base_patch16_siglip_256",
-            pretrained=False,  # Don't load pretrained weights
-            num_classes=0,
-        )
-        model.load_state_dict(torch.load(model_path))
-        model = model.eval()
+        import timm
+
+        # Check if the model file exists
+        if not os.path.isfile(model_path):
+            # If not, create and save the model
+            model = timm.create_model(
+                "vit_base_patch16_siglip_224",
+                pretrained=True,
+                num_classes=0,
+            )
+            model = model.eval()
+            os.makedirs(os.path.dirname(model_path), exist_ok=True)
+            torch.save(model.state_dict(), model_path)
+        else:
+            # If the model file exists, load the model from the saved state
+            model = timm.create_model(
+                "vit_base_patch16_siglip_256",
+                pretrained=False,  # Don't load pretrained weights
+                num_classes=0,
+            )
+            model.load_state_dict(torch.load(model_path))
+            model = model.eval()
+
+        # get model specific transforms (normalization, resize)
+        data_config = timm.data.resolve_model_data_config(model)
+        transforms = timm.data.create_transform(**data_config, is_training=False)
+
+    # Move the model to the specified device
+    return model.to(get_device()), transforms
 
-    # get model specific transforms (normalization, resize)
-    data_config = timm.data.resolve_model_data_config(model)
-    transforms = timm.data.create_transform(**data_config, is_training=False)
 
-    def embed_images(images: List[Image.Image], model, transforms):
-        # Stack images along the batch dimension
-        image_batch = torch.stack([transforms(image) for image in images])
-        # Get embeddings
-        embeddings = model(image_batch)
-        return embeddings
+def embed_images(images: List[Image.Image], model, transforms):
+    import torch
+
+    # Stack images along the batch dimension
+    image_batch = torch.stack([transforms(image) for image in images])
+    # Get embeddings
+    embeddings = model(image_batch)
+    return embeddings
 
     # Usage:
     # images = [Image.open(io.BytesIO(image_bytes1)), Image.open(io.BytesIO(image_bytes2)), ...]
     # embeddings = embed_images(images, model, transforms)
 
 
-if torch.cuda.is_available():
-    device = torch.device("cuda")
-elif torch.backends.mps.is_available():
-    device = torch.device("mps")
-else:
-    device = torch.device("cpu")
+# Nothing heavy loads until it's used, and models we stop using are unloaded again.
+# See computer.display.warm_up() and computer.display.model_stats()
+models = ModelRegistry(idle_timeout=600)
+models.register("english_words", load_english_words)
+models.register("icon_model", load_icon_model)
 
-# Move the model to the specified device
-model = model.to(device)
 
+def get_embedding_store():
+    global embedding_store
+    if embedding_store is None:
+        model_name = "clip-ViT-B-32" if fast_model else "vit_base_patch16_siglip"
+        embedding_store = EmbeddingStore(os.path.join(oi_dir, "embeddings", model_name))
+    return embedding_store
 
-def image_search(query, icons, hashes, debug):
-    hashed_icons = [icon for icon in icons if icon["hash"] in hashes]
-    unhashed_icons = [icon for icon in icons if icon["hash"] not in hashes]
 
-    # Embed the unhashed icons
+embedding_store = None
+
+
+def embed(items, debug):
+    model, transforms = models.get("icon_model")
+
     if fast_model:
-        query_and_unhashed_icons_embeds = model.encode(
-            [query] + [icon["data"] for icon in unhashed_icons],
+        return model.encode(
+            items,
             batch_size=128,
-            convert_to_tensor=True,
+            convert_to_numpy=True,
             show_progress_bar=debug,
         )
     else:
-        query_and_unhashed_icons_embeds = embed_images(
-            [query] + [icon["data"] for icon in unhashed_icons], model, transforms
-        )
-
-    query_embed = query_and_unhashed_icons_embeds[0]
-    unhashed_icons_embeds = query_and_unhashed_icons_embeds[1:]
+        import torch
 
-    # Store hashes for unhashed icons
-    for icon, emb in zip(unhashed_icons, unhashed_icons_embeds):
-        hashes[icon["hash"]] = emb
+        with torch.no_grad():
+            return embed_images(items, model, transforms).cpu().numpy()
 
-    # Move tensors to the specified device before concatenating
-    unhashed_icons_embeds = unhashed_icons_embeds.to(device)
 
-    # Include hashed icons in img_emb
-    img_emb = torch.cat(
-        [unhashed_icons_embeds]
-        + [hashes[icon["hash"]].unsqueeze(0) for icon in hashed_icons]
-    )
+def image_search(query, icons, hashes, debug):
+    """
+    Ranks icons by how well they match the query. Only icons (and queries) we haven't seen before are embedded.
+    """
+    query_hash = "query:" + hashlib.sha256(query.encode()).hexdigest()
+
+    # Adding new ones to a full store evicts the least recently used, which mustn't be the ones on screen
+    hashes.touch([icon["hash"] for icon in icons] + [query_hash])
+
+    # The same icon often shows up more than once on a screen
+    unhashed_icons = []
+    seen = set()
+    for icon in icons:
+        if icon["hash"] not in hashes and icon["hash"] not in seen:
+            unhashed_icons.append(icon)
+            seen.add(icon["hash"])
+    items = [icon["data"] for icon in unhashed_icons]
+    if query_hash not in hashes:
+        items = [query] + items
+
+    # Embed whatever's new. Repeated searches on the same screen skip the model entirely
+    if items:
+        embeds = embed(items, debug)
+        keys = [icon["hash"] for icon in unhashed_icons]
+        if query_hash not in hashes:
+            keys = [query_hash] + keys
+        hashes.add(keys, embeds)
 
     # Perform semantic search
-    hits = util.semantic_search(query_embed, img_emb)[0]
+    hits = hashes.search(hashes.get(query_hash), [icon["hash"] for icon in icons])
 
     # Filter hits with score over 90
-    results = [hit for hit in hits if hit["score"] > 90]
+    results = [(i, score) for i, score in hits if score > 90]
 
     # Ensure top result is included
     if hits and (hits[0] not in results):
         results.insert(0, hits[0])
 
     # Convert results to original icon format
-    return [icons[hit["corpus_id"]] for hit in results]
+    return [icons[i] for i, _ in results]
+
+
+# Element boxes from recent screenshots. When the screen barely changed, only the part that did is detected again
+element_cache = OcrCache(max_entries=4)
 
 
 def get_element_boxes(image_data, debug):
+    """
+    Boxes around everything on screen that might be an icon, as {"x", "y", "width", "height"} dicts.
+    """
+    if debug or os.getenv("OI_POINT_REUSE_BOXES", "True") != "True":
+        return detect_element_boxes(image_data, debug)
+
+    def detect(img):
+        boxes = detect_element_boxes(img, False)
+        return {
+            "left": [box["x"] for box in boxes],
+            "top": [box["y"] for box in boxes],
+            "width": [box["width"] for box in boxes],
+            "height": [box["height"] for box in boxes],
+        }
+
+    data = element_cache.get(image_data, "elements", detect)
+    return [
+        {"x": x, "y": y, "width": w, "height": h}
+        for x, y, w, h in zip(data["left"], data["top"], data["width"], data["height"])
+    ]
+
+
+def detect_element_boxes(image_data, debug):
     desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
     debug_path = os.path.join(desktop_path, "oi-debug")
 
@@ -567,6 +651,11 @@ def get_element_boxes(image_data, debug):
     # Convert to grayscale
     pil_image = pil_image.convert("L")
 
+    # Optionally detect on a downscaled copy. Much faster, but small icons can get lost
+    scale = int(os.getenv("OI_POINT_DOWNSCALE", "1"))
+    if scale > 1:
+        pil_image = pil_image.reduce(scale)
+
     def process_image(
         pil_image,
         contrast_level=1.8,
@@ -695,7 +784,9 @@ def get_element_boxes(image_data, debug):
         # Get the rectangle that bounds the contour
         x, y, w, h = cv2.boundingRect(contour)
         # Append the box as a dictionary to the list
-        boxes.append({"x": x, "y": y, "width": w, "height": h})
+        boxes.append(
+            {"x": x * scale, "y": y * scale, "width": w * scale, "height": h * scale}
+        )
 
     if debug:
         print("WE HHERE")
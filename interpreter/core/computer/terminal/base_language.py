@@ -12,6 +12,8 @@ class BaseLanguage:
     run (Generator that yields a dictionary in LMC format)
     stop (Halts code execution, but does not terminate state)
     terminate (Terminates state)
+    warm (OPTIONAL) Starts whatever run() would start on first use, so it's ready. Called in the background
+    is_alive (OPTIONAL) False if the process died, so Terminal starts a new instance
     """
 
     def run(self, code):
@@ -1,3 +1,4 @@
+from ...utils.html_renderer import renderer
 from ...utils.html_to_png_base64 import html_to_png_base64
 from ..base_language import BaseLanguage
 
@@ -9,6 +10,13 @@ class HTML(BaseLanguage):
     def __init__(self):
         super().__init__()
 
+    def warm(self):
+        # Start Chrome now, so the first screenshot doesn't wait for it
+        try:
+            renderer.start()
+        except Exception:
+            pass
+
     def run(self, code):
         # Assistant should know what's going on
         yield {
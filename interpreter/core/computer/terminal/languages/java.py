@@ -1,26 +1,169 @@
+import hashlib
 import os
-import queue
 import re
+import shutil
 import subprocess
-import threading
-import time
-import traceback
+
+from .....terminal_interface.utils.local_storage_path import get_storage_path
 from .subprocess_language import SubprocessLanguage
 
+# Stays running, so the JVM (and the compiler in it) only starts once. Each line on stdin is
+# "<snippet directory>\t<class name>\t<file name>". The snippet is compiled into its classes
+# directory unless it already was, then its main runs in a new class loader.
+RUNNER = r"""
+import java.io.*;
+import java.lang.reflect.*;
+import java.net.*;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.*;
+import javax.tools.*;
+
+public class OpenInterpreterRunner {
+    public static void main(String[] args) throws Exception {
+        BufferedReader requests = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        String request;
+        while ((request = requests.readLine()) != null) {
+            String[] parts = request.split("\t");
+            try {
+                Path snippet = Paths.get(parts[0]);
+                if (compile(snippet, parts[2])) {
+                    run(snippet.resolve("classes"), parts[1]);
+                }
+            } catch (Throwable e) {
+                e.printStackTrace();
+            }
+            System.err.flush();
+            System.out.println("##end_of_execution##");
+            System.out.flush();
+        }
+    }
+
+    static boolean compile(Path snippet, String file) throws IOException {
+        Path compiled = snippet.resolve("compiled");
+        if (Files.exists(compiled)) {
+            return true;
+        }
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        if (compiler == null) {
+            System.out.println("Compilation Error:\nThere's no Java compiler. Install a JDK, not just a JRE.");
+            return false;
+        }
+        Path classes = snippet.resolve("classes");
+        Files.createDirectories(classes);
+
+        // With active line markers, or as written if the markers broke it (so errors are about the code as written)
+        ByteArrayOutputStream errors = new ByteArrayOutputStream();
+        for (String version : new String[] {"marked", "source"}) {
+            errors.reset();
+            String path = snippet.resolve(version).resolve(file).toString();
+            if (compiler.run(null, null, errors, "-encoding", "UTF-8", "-d", classes.toString(), path) == 0) {
+                Files.write(compiled, new byte[0]);
+                return true;
+            }
+        }
+        String prefix = snippet.resolve("source").toString() + File.separator;
+        System.out.println("Compilation Error:\n" + errors.toString("UTF-8").replace(prefix, ""));
+        return false;
+    }
+
+    static void run(Path classes, String className) {
+        try {
+            // A new class loader every time, so a changed class with the same name is the new one
+            URLClassLoader loader = new URLClassLoader(new URL[] {classes.toUri().toURL()}, OpenInterpreterRunner.class.getClassLoader());
+            Method main = loader.loadClass(className).getMethod("main", String[].class);
+            main.setAccessible(true);
+            main.invoke(null, (Object) new String[0]);
+        } catch (InvocationTargetException e) {
+            e.getCause().printStackTrace();
+        } catch (Throwable e) {
+            e.printStackTrace();
+        }
+    }
+}
+"""
+
+
 class Java(SubprocessLanguage):
     file_extension = "java"
     name = "Java"
+    # Compiled snippets kept between sessions. The least recently run ones go first
+    max_cached_snippets = 200
 
     def __init__(self):
         super().__init__()
-        self.start_cmd = None  # We will handle the start command in the run method
+        self.start_cmd = None  # Set in start_process, once the runner is compiled
+        # Compiled runner and snippets, by hash
+        self.cache_dir = get_storage_path("java")
+        # Part of the hash, so switching JDKs compiles again
+        self.jdk = os.path.realpath(shutil.which("java") or "java")
 
-    def preprocess_code(self, code):
-        return preprocess_java(code)
+    def start_process(self):
+        self.start_cmd = [
+            "java",
+            "-Dfile.encoding=UTF-8",
+            "-Dstdout.encoding=UTF-8",
+            "-Dstderr.encoding=UTF-8",
+            "-cp",
+            self.compile_runner(),
+            "OpenInterpreterRunner",
+        ]
+        self.prune_cache()
+        super().start_process()
+
+    def prune_cache(self):
+        """
+        Deletes all but the `max_cached_snippets` most recently run snippets.
+        """
+        classes_dir = os.path.join(self.cache_dir, "classes")
+        if not os.path.isdir(classes_dir):
+            return
+        snippets = [entry for entry in os.scandir(classes_dir) if entry.is_dir()]
+        snippets.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in snippets[self.max_cached_snippets :]:
+            shutil.rmtree(entry.path, ignore_errors=True)
 
-    def line_postprocessor(self, line):
-        # Clean up output from javac and java
-        return line.strip()
+    def compile_runner(self):
+        """
+        The runner's class directory. It's compiled the first time (and again whenever RUNNER changes).
+        """
+        digest = hashlib.sha256(RUNNER.encode()).hexdigest()[:16]
+        runner_dir = os.path.join(self.cache_dir, f"runner-{digest}")
+        if not os.path.exists(os.path.join(runner_dir, "OpenInterpreterRunner.class")):
+            os.makedirs(runner_dir, exist_ok=True)
+            source = os.path.join(runner_dir, "OpenInterpreterRunner.java")
+            with open(source, "w", encoding="utf-8", newline="\n") as file:
+                file.write(RUNNER)
+            result = subprocess.run(
+                ["javac", "-encoding", "UTF-8", "-d", runner_dir, source],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                raise RuntimeError(
+                    f"Couldn't compile the Java runner:\n{result.stderr}"
+                )
+        return runner_dir
+
+    def preprocess_code(self, code):
+        """
+        Writes the code (as written, and with active line markers) to a directory named after its hash,
+        and returns the runner's request for it. Code that ran before is already compiled there.
+        """
+        class_name, file_name = main_class(code)
+        digest = hashlib.sha256(f"{self.jdk}\n{code}".encode()).hexdigest()[:24]
+        snippet_dir = os.path.join(self.cache_dir, "classes", digest)
+        if os.path.exists(os.path.join(snippet_dir, "compiled")):
+            os.utime(snippet_dir)  # Most recently run, so pruned last
+        else:
+            for version, source in [
+                ("source", code),
+                ("marked", preprocess_java(code)),
+            ]:
+                os.makedirs(os.path.join(snippet_dir, version), exist_ok=True)
+                path = os.path.join(snippet_dir, version, file_name)
+                with open(path, "w", encoding="utf-8", newline="\n") as file:
+                    file.write(source)
+        return f"{snippet_dir}\t{class_name}\t{file_name}"
 
     def detect_active_line(self, line):
         if "##active_line" in line:
@@ -31,116 +174,128 @@ class Java(SubprocessLanguage):
         return "##end_of_execution##" in line
 
     def run(self, code):
-        try:
-            # Extract the class name from the code
-            match = re.search(r'class\s+(\w+)', code)
-            if not match:
-                yield {
-                    "type": "console",
-                    "format": "output",
-                    "content": "Error: No class definition found in the provided code."
-                }
-                return
+        if not re.search(r"\bclass\s+\w+", code):
+            yield {
+                "type": "console",
+                "format": "output",
+                "content": "Error: No class definition found in the provided code.",
+            }
+            return
 
-            class_name = match.group(1)
-            file_name = f"{class_name}.java"
+        yield from super().run(code)
 
-            # Write the Java code to a file, preserving newlines
-            with open(file_name, "w", newline='\n') as file:
-                file.write(code)
 
-            # Compile the Java code
-            compile_process = subprocess.Popen(
-                ["javac", file_name],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+def main_class(code):
+    """
+    The class to run (the last one declared before `main`), and the file the code has to be in
+    (named after the public class, if there is one).
+    """
+    classes = list(re.finditer(r"(\bpublic\s+(?:\w+\s+)*)?\bclass\s+(\w+)", code))
+    main = re.search(r"\bstatic\s+(?:\w+\s+)*void\s+main\s*\(", code)
+    before_main = [m for m in classes if main and m.start() < main.start()]
+    class_name = (before_main or classes)[-1 if before_main else 0].group(2)
+    public = [m for m in classes if m.group(1)]
+    file_name = (public[0].group(2) if public else class_name) + ".java"
+    return class_name, file_name
 
-            stdout, stderr = compile_process.communicate()
 
-            if compile_process.returncode != 0:
-                yield {
-                    "type": "console",
-                    "format": "output",
-                    "content": f"Compilation Error:\n{stderr}"
-                }
-                return
-
-            # Run the compiled Java code
-            run_process = subprocess.Popen(
-                ["java", class_name],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+def code_only(line, in_comment):
+    """
+    The line without comments, and with strings and chars emptied (so braces in them don't count).
+    Also returns whether a /* comment is still open at the end of it.
+    """
+    result = ""
+    i = 0
+    while i < len(line):
+        if in_comment:
+            end = line.find("*/", i)
+            if end == -1:
+                return result, True
+            i = end + 2
+            in_comment = False
+        elif line.startswith("//", i):
+            break
+        elif line.startswith("/*", i):
+            in_comment = True
+            i += 2
+        elif line[i] in "\"'":
+            quote = line[i]
+            i += 1
+            while i < len(line) and line[i] != quote:
+                i += 2 if line[i] == "\\" else 1
+            i += 1
+            result += quote * 2
+        else:
+            result += line[i]
+            i += 1
+    return result, in_comment
 
-            stdout_thread = threading.Thread(
-                target=self.handle_stream_output,
-                args=(run_process.stdout, False),
-                daemon=True,
-            )
-            stderr_thread = threading.Thread(
-                target=self.handle_stream_output,
-                args=(run_process.stderr, True),
-                daemon=True,
-            )
 
-            stdout_thread.start()
-            stderr_thread.start()
-
-            stdout_thread.join()
-            stderr_thread.join()
-
-            run_process.wait()
-            self.done.set()
-
-            while True:
-                if not self.output_queue.empty():
-                    yield self.output_queue.get()
-                else:
-                    time.sleep(0.1)
-                try:
-                    output = self.output_queue.get(timeout=0.3)
-                    yield output
-                except queue.Empty:
-                    if self.done.is_set():
-                        for _ in range(3):
-                            if not self.output_queue.empty():
-                                yield self.output_queue.get()
-                            time.sleep(0.2)
-                        break
-
-        except Exception as e:
-            yield {
-                "type": "console",
-                "format": "output",
-                "content": f"{traceback.format_exc()}"
-            }
-        finally:
-            # Clean up the generated Java files
-            if os.path.exists(file_name):
-                os.remove(file_name)
-            class_file = file_name.replace(".java", ".class")
-            if os.path.exists(class_file):
-                os.remove(class_file)
+def brace_kind(before, braces):
+    """
+    What a { opens, from the code since the last ; { or }: a "class" body, an array "initializer",
+    or a "block" of statements (methods, loops, lambdas...).
+    """
+    if re.search(r"\b(class|interface|enum|record)\s+\w+", before):
+        return "class"
+    if re.search(r"\bnew\s+[\w.<>, ]+\(.*\)\s*$", before, re.DOTALL):
+        return "class"  # Anonymous
+    if re.search(r"[=\],]\s*$", before) or (braces and braces[-1] == "initializer"):
+        return "initializer"
+    return "block"
+
 
 def preprocess_java(code):
     """
-    Add active line markers
-    Add end of execution marker
+    Add active line markers, in front of lines that start a statement in a block.
+    They go on the same line, so the compiler's line numbers still match the code.
     """
-    lines = code.split("\n")
     processed_lines = []
+    braces = []
+    before = ""
+    in_comment = False
+    at_statement_start = True
+
+    for i, line in enumerate(code.split("\n"), 1):
+        code_line, in_comment_after = code_only(line, in_comment)
+        stripped = code_line.strip()
 
-    for i, line in enumerate(lines, 1):
-        # Add active line print
-        processed_lines.append(f'System.out.println("##active_line{i}##");')
+        if (
+            stripped
+            and not in_comment
+            and at_statement_start
+            and braces
+            and braces[-1] == "block"
+            # Not somewhere a statement can't go, or that has to come first
+            and not re.match(
+                r"(}|else\b|catch\b|finally\b|case\b|default\b|super\s*\(|this\s*\(|@)",
+                stripped,
+            )
+            # The end of a do-while
+            and not re.match(r"while\b.*\)\s*;$", stripped)
+        ):
+            indent = line[: len(line) - len(line.lstrip())]
+            line = f'{indent}System.out.println("##active_line{i}##"); {line.lstrip()}'
         processed_lines.append(line)
 
-    # Join lines to form the processed code
-    code = "\n".join(processed_lines)
+        for char in code_line:
+            if char == "{":
+                braces.append(brace_kind(before, braces))
+                before = ""
+            elif char == "}":
+                if braces:
+                    braces.pop()
+                before = ""
+            elif char == ";":
+                before = ""
+            else:
+                before += char
+        before += "\n"
+
+        if stripped:
+            at_statement_start = stripped[-1] in ";{}" or bool(
+                re.match(r"(case\b|default\b).*:$", stripped)
+            )
+        in_comment = in_comment_after
 
-    # Add end of execution marker
-    code += '\nSystem.out.println("##end_of_execution##");'
-    return code
+    return "\n".join(processed_lines)
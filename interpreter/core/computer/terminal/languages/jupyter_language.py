@@ -14,13 +14,18 @@ import time
 import traceback
 
 os.environ["LITELLM_LOCAL_MODEL_COST_MAP"] = "True"
-import litellm
-from jupyter_client import KernelManager
-
+from ....utils.lazy_import import lazy_import
+from ...utils.computer_sync import SYNC_MIMETYPE, ComputerSync
 from ..base_language import BaseLanguage
 
+litellm = lazy_import("litellm", optional=False)
+jupyter_client = lazy_import("jupyter_client", optional=False)
+
 DEBUG_MODE = False
 
+# Put on an execution's queue when the kernel goes idle
+END_OF_EXECUTION = object()
+
 # When running from an executable, ipykernel calls itself infinitely
 # This is a workaround to detect it and launch it manually
 if "ipykernel_launcher" in sys.argv:
@@ -41,17 +46,24 @@ class JupyterLanguage(BaseLanguage):
     def __init__(self, computer):
         self.computer = computer
 
-        self.km = KernelManager(kernel_name="python3")
+        self.km = jupyter_client.KernelManager(kernel_name="python3")
         self.km.start_kernel()
         self.kc = self.km.client()
         self.kc.start_channels()
-        while not self.kc.is_alive():
-            time.sleep(0.1)
-        time.sleep(0.5)
+        # Returns once the kernel answers a request, instead of sleeping and hoping
+        self.kc.wait_for_ready(timeout=60)
 
-        self.listener_thread = None
         self.finish_flag = False
 
+        # Only sends what changed, when interpreter.sync_computer is on
+        self.computer_sync = ComputerSync(computer)
+
+        # One long-lived thread reads iopub and routes messages to executions by msg_id
+        self._executions = {}
+        self._executions_lock = threading.Lock()
+        self._terminated = False
+        self._start_dispatcher()
+
         # DISABLED because sometimes this bypasses sending it up to us for some reason!
         # Give it our same matplotlib backend
         # backend = matplotlib.get_backend()
@@ -71,8 +83,8 @@ matplotlib.use('{backend}')
 import matplotlib.pyplot as plt
 """.strip()
 
-        for _ in self.run(code):
-            pass
+        # Not waited for. The kernel runs it before anything we send after it
+        self.kc.execute(code, silent=True, store_history=False)
 
         # DISABLED because it doesn't work??
         # Disable color outputs in the terminal, which don't look good in OI and aren't useful
@@ -82,7 +94,24 @@ import matplotlib.pyplot as plt
         # """
         # self.run(code)
 
+    def warm(self):
+        """
+        Starts importing the computer API, if it'll be wanted, since that's most of the first run's wait.
+        Not waited for either. Terminal.run imports it properly later, which is quick once it's loaded.
+        """
+        if (
+            self.computer.import_computer_api
+            and os.getenv("INTERPRETER_COMPUTER_API", "True") != "False"
+        ):
+            from ..terminal import import_computer_api_code
+
+            self.kc.execute(import_computer_api_code, silent=True, store_history=False)
+
+    def is_alive(self):
+        return self.km.is_alive()
+
     def terminate(self):
+        self._terminated = True
         self.kc.stop_channels()
         self.km.shutdown_kernel()
 
@@ -122,6 +151,7 @@ import matplotlib.pyplot as plt
                 # Also, for python, you don't need them! It's just for active_line and stuff. Just looks pretty.
                 preprocessed_code = code
             message_queue = queue.Queue()
+            self._push_computer_changes()
             self._execute_code(preprocessed_code, message_queue)
             yield from self._capture_output(message_queue)
         except GeneratorExit:
@@ -131,174 +161,245 @@ import matplotlib.pyplot as plt
             yield {"type": "console", "format": "output", "content": content}
 
     def _execute_code(self, code, message_queue):
-        def iopub_message_listener():
-            max_retries = 100
-            while True:
-                # If self.finish_flag = True, and we didn't set it (we do below), we need to stop. That's our "stop"
-                if self.finish_flag == True:
-                    if DEBUG_MODE:
-                        print("interrupting kernel!!!!!")
-                    self.km.interrupt_kernel()
-                    return
-                # For async usage
-                if (
-                    hasattr(self.computer.interpreter, "stop_event")
-                    and self.computer.interpreter.stop_event.is_set()
-                ):
-                    self.km.interrupt_kernel()
-                    self.finish_flag = True
+        if not self.dispatcher_thread.is_alive():
+            self._start_dispatcher()
+
+        # Hold the lock until the execution is registered, so the dispatcher can't see its first message before we do
+        with self._executions_lock:
+            msg_id = self.kc.execute(code)
+            self._executions[msg_id] = message_queue
+
+        if DEBUG_MODE:
+            print("executing:", msg_id)
+
+    def syncing_computer(self):
+        return getattr(self.computer.interpreter, "sync_computer", False) and getattr(
+            self.computer, "_has_imported_computer_api", False
+        )
+
+    def _push_computer_changes(self):
+        """
+        Queues our computer's changes for the kernel's, just ahead of the code. Nothing waits for it:
+        the kernel runs shell requests in order, so it's applied before the code runs.
+        """
+        if not self.syncing_computer():
+            return
+        code = self.computer_sync.push_code()
+        if code:
+            self.kc.execute(code, silent=True, store_history=False)
+
+    def _start_dispatcher(self):
+        self.dispatcher_thread = threading.Thread(
+            target=self._dispatch_iopub_messages, daemon=True
+        )
+        self.dispatcher_thread.start()
+
+    def _dispatch_iopub_messages(self):
+        """
+        The one long-lived reader of the kernel's iopub channel.
+        Routes every message to the execution that caused it, matched on parent_header.msg_id.
+        """
+        max_retries = 100
+        while not self._terminated:
+            try:
+                # Returns as soon as a message arrives. The timeout only exists so we can look after running executions.
+                msg = self.kc.iopub_channel.get_msg(timeout=0.5)
+            except queue.Empty:
+                self._check_on_executions()
+                continue
+            except Exception as e:
+                if self._terminated:
                     return
-                try:
-                    if (
-                        time.time() - self.last_output_time > 15
-                        and time.time() - self.last_output_message_time > 15
-                    ):
-                        self.last_output_message_time = time.time()
-
-                        text = f"{self.computer.interpreter.messages}\n\nThe program above has been running for over 15 seconds. It might require user input. Are there keystrokes that the user should type in, to proceed after the last command?"
-                        if time.time() - self.last_output_time > 500:
-                            text += f" If you think the process is frozen, or that the user wasn't expect it to run for this long (it has been {time.time() - self.last_output_time} seconds since last output) then say <input>CTRL-C</input>."
-
-                        messages = [
-                            {
-                                "role": "system",
-                                "type": "message",
-                                "content": "You are an expert programming assistant. You will help the user determine if they should enter input into the terminal, per the user's requests. If you think the user would want you to type something into stdin, enclose it in <input></input> XML tags, like <input>y</input> to type 'y'.",
-                            },
-                            {"role": "user", "type": "message", "content": text},
-                        ]
-                        params = {
-                            "messages": messages,
-                            "model": self.computer.interpreter.llm.model,
-                            "stream": True,
-                            "temperature": 0,
-                        }
-                        if self.computer.interpreter.llm.api_key:
-                            params["api_key"] = self.computer.interpreter.llm.api_key
-
-                        response = ""
-                        for chunk in litellm.completion(**params):
-                            content = chunk.choices[0].delta.content
-                            if type(content) == str:
-                                response += content
-
-                        # Parse the response for input tags
-                        input_match = re.search(r"<input>(.*?)</input>", response)
-                        if input_match:
-                            user_input = input_match.group(1)
-                            # Check if the user input is CTRL-C
-                            self.finish_flag = True
-                            if user_input.upper() == "CTRL-C":
-                                self.finish_flag = True
-                            else:
-                                self.kc.input(user_input)
-
-                    msg = self.kc.iopub_channel.get_msg(timeout=0.05)
-                    self.last_output_time = time.time()
-                except queue.Empty:
-                    continue
-                except Exception as e:
-                    max_retries -= 1
-                    if max_retries < 0:
-                        raise
-                    print("Jupyter error, retrying:", str(e))
-                    continue
+                max_retries -= 1
+                if max_retries < 0:
+                    raise
+                print("Jupyter error, retrying:", str(e))
+                continue
 
-                if DEBUG_MODE:
-                    print("-----------" * 10)
-                    print("Message received:", msg["content"])
-                    print("-----------" * 10)
+            if DEBUG_MODE:
+                print("-----------" * 10)
+                print("Message received:", msg["content"])
+                print("-----------" * 10)
+
+            msg_id = msg["parent_header"].get("msg_id")
+            with self._executions_lock:
+                message_queue = self._executions.get(msg_id)
+
+            if message_queue is not None:
+                self.last_output_time = time.time()
 
                 if (
                     msg["header"]["msg_type"] == "status"
                     and msg["content"]["execution_state"] == "idle"
                 ):
-                    # Set finish_flag and return when the kernel becomes idle
+                    # The kernel is done with this execution
                     if DEBUG_MODE:
                         print("from thread: kernel is idle")
-                    self.finish_flag = True
-                    return
-
-                content = msg["content"]
-
-                if msg["msg_type"] == "stream":
-                    line, active_line = self.detect_active_line(content["text"])
-                    if active_line:
-                        message_queue.put(
-                            {
-                                "type": "console",
-                                "format": "active_line",
-                                "content": active_line,
-                            }
-                        )
-                    message_queue.put(
-                        {"type": "console", "format": "output", "content": line}
-                    )
-                elif msg["msg_type"] == "error":
-                    content = "\n".join(content["traceback"])
-                    # Remove color codes
-                    ansi_escape = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
-                    content = ansi_escape.sub("", content)
-                    message_queue.put(
-                        {
-                            "type": "console",
-                            "format": "output",
-                            "content": content,
-                        }
-                    )
-                elif msg["msg_type"] in ["display_data", "execute_result"]:
-                    data = content["data"]
-                    if "image/png" in data:
-                        message_queue.put(
-                            {
-                                "type": "image",
-                                "format": "base64.png",
-                                "content": data["image/png"],
-                            }
-                        )
-                    elif "image/jpeg" in data:
-                        message_queue.put(
-                            {
-                                "type": "image",
-                                "format": "base64.jpeg",
-                                "content": data["image/jpeg"],
-                            }
-                        )
-                    elif "text/html" in data:
-                        message_queue.put(
-                            {
-                                "type": "code",
-                                "format": "html",
-                                "content": data["text/html"],
-                            }
-                        )
-                    elif "text/plain" in data:
-                        message_queue.put(
-                            {
-                                "type": "console",
-                                "format": "output",
-                                "content": data["text/plain"],
-                            }
-                        )
-                    elif "application/javascript" in data:
-                        message_queue.put(
-                            {
-                                "type": "code",
-                                "format": "javascript",
-                                "content": data["application/javascript"],
-                            }
-                        )
-
-        self.listener_thread = threading.Thread(target=iopub_message_listener)
-        # self.listener_thread.daemon = True
-        self.listener_thread.start()
-
-        if DEBUG_MODE:
-            print(
-                "thread is on:", self.listener_thread.is_alive(), self.listener_thread
-            )
-
-        self.kc.execute(code)
+                    self._end_execution(msg_id)
+                else:
+                    for chunk in self._convert_message(msg):
+                        message_queue.put(chunk)
+
+            # Otherwise it's from an execution we already stopped (or one that isn't ours). Drop it.
+
+            self._check_on_executions()
+
+    def _end_execution(self, msg_id):
+        with self._executions_lock:
+            message_queue = self._executions.pop(msg_id, None)
+        if message_queue is not None:
+            message_queue.put(END_OF_EXECUTION)
+
+    def _check_on_executions(self):
+        """
+        Stops executions if we've been asked to, and asks the LLM about ones that have gone quiet.
+        """
+        if not self._executions:
+            return
+
+        # For async usage
+        if (
+            hasattr(self.computer.interpreter, "stop_event")
+            and self.computer.interpreter.stop_event.is_set()
+        ):
+            self.finish_flag = True
+
+        # If self.finish_flag = True, we've been told to stop
+        if self.finish_flag:
+            if DEBUG_MODE:
+                print("interrupting kernel!!!!!")
+            self.km.interrupt_kernel()
+            for msg_id in list(self._executions):
+                self._end_execution(msg_id)
+            return
+
+        if not self.km.is_alive():
+            # The kernel crashed (or was killed), so nothing else is coming. Terminal replaces it on the next run
+            with self._executions_lock:
+                queues = list(self._executions.values())
+            for message_queue in queues:
+                message_queue.put(
+                    {
+                        "type": "console",
+                        "format": "output",
+                        "content": "\nThe Python kernel died. A new one will run the next code.",
+                    }
+                )
+            for msg_id in list(self._executions):
+                self._end_execution(msg_id)
+            return
+
+        if (
+            time.time() - self.last_output_time > 15
+            and time.time() - self.last_output_message_time > 15
+        ):
+            self.last_output_message_time = time.time()
+            try:
+                self._ask_llm_for_input()
+            except Exception as e:
+                print("Jupyter error, retrying:", str(e))
+
+    def _ask_llm_for_input(self):
+        text = f"{self.computer.interpreter.messages}\n\nThe program above has been running for over 15 seconds. It might require user input. Are there keystrokes that the user should type in, to proceed after the last command?"
+        if time.time() - self.last_output_time > 500:
+            text += f" If you think the process is frozen, or that the user wasn't expect it to run for this long (it has been {time.time() - self.last_output_time} seconds since last output) then say <input>CTRL-C</input>."
+
+        messages = [
+            {
+                "role": "system",
+                "type": "message",
+                "content": "You are an expert programming assistant. You will help the user determine if they should enter input into the terminal, per the user's requests. If you think the user would want you to type something into stdin, enclose it in <input></input> XML tags, like <input>y</input> to type 'y'.",
+            },
+            {"role": "user", "type": "message", "content": text},
+        ]
+        params = {
+            "messages": messages,
+            "model": self.computer.interpreter.llm.model,
+            "stream": True,
+            "temperature": 0,
+        }
+        if self.computer.interpreter.llm.api_key:
+            params["api_key"] = self.computer.interpreter.llm.api_key
+
+        response = ""
+        for chunk in litellm.completion(**params):
+            content = chunk.choices[0].delta.content
+            if type(content) == str:
+                response += content
+
+        # Parse the response for input tags
+        input_match = re.search(r"<input>(.*?)</input>", response)
+        if input_match:
+            user_input = input_match.group(1)
+            # Check if the user input is CTRL-C
+            self.finish_flag = True
+            if user_input.upper() == "CTRL-C":
+                self.finish_flag = True
+            else:
+                self.kc.input(user_input)
+
+    def _convert_message(self, msg):
+        """
+        Converts an iopub message into LMC chunks.
+        """
+        content = msg["content"]
+
+        if msg["msg_type"] == "stream":
+            line, active_line = self.detect_active_line(content["text"])
+            if active_line:
+                yield {
+                    "type": "console",
+                    "format": "active_line",
+                    "content": active_line,
+                }
+            yield {"type": "console", "format": "output", "content": line}
+        elif msg["msg_type"] == "error":
+            content = "\n".join(content["traceback"])
+            # Remove color codes
+            ansi_escape = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+            content = ansi_escape.sub("", content)
+            yield {
+                "type": "console",
+                "format": "output",
+                "content": content,
+            }
+        elif msg["msg_type"] in ["display_data", "execute_result"]:
+            data = content["data"]
+            if SYNC_MIMETYPE in data:
+                # The kernel's computer changed. Not output, so it's not shown
+                if self.syncing_computer():
+                    self.computer_sync.apply(data[SYNC_MIMETYPE])
+                return
+            if "image/png" in data:
+                yield {
+                    "type": "image",
+                    "format": "base64.png",
+                    "content": data["image/png"],
+                }
+            elif "image/jpeg" in data:
+                yield {
+                    "type": "image",
+                    "format": "base64.jpeg",
+                    "content": data["image/jpeg"],
+                }
+            elif "text/html" in data:
+                yield {
+                    "type": "code",
+                    "format": "html",
+                    "content": data["text/html"],
+                }
+            elif "text/plain" in data:
+                yield {
+                    "type": "console",
+                    "format": "output",
+                    "content": data["text/plain"],
+                }
+            elif "application/javascript" in data:
+                yield {
+                    "type": "code",
+                    "format": "javascript",
+                    "content": data["application/javascript"],
+                }
 
     def detect_active_line(self, line):
         if "##active_line" in line:
@@ -315,37 +416,43 @@ import matplotlib.pyplot as plt
         return line, None
 
     def _capture_output(self, message_queue):
+        """
+        Yields chunks as soon as the dispatcher routes them to us.
+        Console output that's already waiting is batched into one chunk.
+        """
+        pending = None
         while True:
-            time.sleep(0.1)
+            if pending is not None:
+                output, pending = pending, None
+            else:
+                output = message_queue.get()
 
-            # For async usage
-            if (
-                hasattr(self.computer.interpreter, "stop_event")
-                and self.computer.interpreter.stop_event.is_set()
-            ):
-                self.finish_flag = True
+            if output is END_OF_EXECUTION:
+                if DEBUG_MODE:
+                    print("we're done")
                 break
 
-            if self.listener_thread:
-                try:
-                    output = message_queue.get(timeout=0.1)
-                    if DEBUG_MODE:
-                        print(output)
-                    yield output
-
-                except queue.Empty:
-                    if self.finish_flag:
-                        time.sleep(0.1)
-
-                        try:
-                            output = message_queue.get(timeout=0.1)
-                            if DEBUG_MODE:
-                                print(output)
-                            yield output
-                        except queue.Empty:
-                            if DEBUG_MODE:
-                                print("we're done")
-                            break
+            if output["type"] == "console" and output["format"] == "output":
+                batch = [output["content"]]
+                while True:
+                    try:
+                        following = message_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if (
+                        following is not END_OF_EXECUTION
+                        and following["type"] == "console"
+                        and following["format"] == "output"
+                    ):
+                        batch.append(following["content"])
+                    else:
+                        pending = following
+                        break
+                output["content"] = "".join(batch)
+
+            if DEBUG_MODE:
+                print(output)
+            yield output
 
     def stop(self):
         self.finish_flag = True
@@ -1,5 +1,10 @@
+import hashlib
+import os
 import re
+import urllib.request
 
+from .....terminal_interface.utils.local_storage_path import get_storage_path
+from ...utils.html_renderer import renderer
 from ...utils.html_to_png_base64 import html_to_png_base64
 from ..base_language import BaseLanguage
 
@@ -12,8 +17,8 @@ template = """<!DOCTYPE html>
     <div id="root"></div>
 
     <!-- React and ReactDOM from CDN -->
-    <script crossorigin src="https://unpkg.com/react@17/umd/react.development.js"></script>
-    <script crossorigin src="https://unpkg.com/react-dom@17/umd/react-dom.development.js"></script>
+    <script crossorigin src="https://unpkg.com/react@17.0.2/umd/react.development.js"></script>
+    <script crossorigin src="https://unpkg.com/react-dom@17.0.2/umd/react-dom.development.js"></script>
 
     <!-- Babel for JSX parsing -->
     <script crossorigin src="https://unpkg.com/@babel/standalone@7.12.1/babel.min.js"></script>
@@ -25,6 +30,77 @@ template = """<!DOCTYPE html>
 </body>
 </html>"""
 
+cdn = "https://unpkg.com/"
+
+# The scripts the template loads from the CDN, and the builds screenshots inline instead.
+# Production builds, since no one reads their warnings there
+bundles = {
+    "react@17.0.2/umd/react.development.js": "react@17.0.2/umd/react.production.min.js",
+    "react-dom@17.0.2/umd/react-dom.development.js": "react-dom@17.0.2/umd/react-dom.production.min.js",
+    "@babel/standalone@7.12.1/babel.min.js": "@babel/standalone@7.12.1/babel.min.js",
+}
+
+# What each inlined build must hash to. A download (or cached copy) that doesn't match isn't used.
+# Record them with `curl -sL https://unpkg.com/<path> | sha256sum`. Until a build has one,
+# screenshots load it from the CDN like the template does
+bundle_sha256 = {
+    "react@17.0.2/umd/react.production.min.js": None,
+    "react-dom@17.0.2/umd/react-dom.production.min.js": None,
+    "@babel/standalone@7.12.1/babel.min.js": None,
+}
+
+_screenshot_template = None
+
+
+def vendored(path):
+    """
+    A bundle's source, from our copy in the storage directory. Downloaded from the CDN the first time.
+    Raises ValueError unless it matches its pinned sha256.
+    """
+    expected = bundle_sha256.get(path)
+    if expected is None:
+        raise ValueError(f"{path} has no pinned sha256")
+
+    file = os.path.join(get_storage_path("vendor"), path.replace("/", "_"))
+    if os.path.exists(file):
+        with open(file, "rb") as f:
+            source = f.read()
+        if hashlib.sha256(source).hexdigest() == expected:
+            return source.decode("utf-8")
+        # Changed since, or cached before it was pinned. Download it again
+
+    with urllib.request.urlopen(cdn + path, timeout=10) as response:
+        source = response.read()
+    if hashlib.sha256(source).hexdigest() != expected:
+        raise ValueError(f"{cdn + path} doesn't match its pinned sha256")
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    with open(file + ".part", "wb") as f:
+        f.write(source)
+    os.replace(file + ".part", file)
+    return source.decode("utf-8")
+
+
+def screenshot_template():
+    """
+    The template with React, ReactDOM and Babel inlined, so screenshots don't fetch them every time.
+    Built once. If the bundles can't be downloaded, it's the CDN template for the rest of the session.
+    """
+    global _screenshot_template
+    if _screenshot_template is None:
+        page = template
+        try:
+            for cdn_path, path in bundles.items():
+                # "<\/script" is the same to JavaScript, but doesn't end the script tag
+                source = vendored(path).replace("</script", "<\\/script")
+                page = page.replace(
+                    f'<script crossorigin src="{cdn}{cdn_path}"></script>',
+                    f"<script>{source}</script>",
+                )
+        except Exception:
+            page = template
+        _screenshot_template = page
+    return _screenshot_template
+
 
 def is_incompatible(code):
     lines = code.split("\n")
@@ -44,6 +120,14 @@ class React(BaseLanguage):
     name = "React"
     file_extension = "html"
 
+    def warm(self):
+        # Get the bundles and start Chrome now, so the first screenshot doesn't wait for them
+        screenshot_template()
+        try:
+            renderer.start()
+        except Exception:
+            pass
+
     # system_message = "When you execute code with `react`, your react code will be run in a script tag after being inserted into the HTML template, following the installation of React, ReactDOM, and Babel for JSX parsing. **We will handle this! Don't make an HTML file to run React, just execute `react`.**"
 
     def run(self, code):
@@ -56,6 +140,7 @@ class React(BaseLanguage):
             }
             return
 
+        page = screenshot_template().replace("{insert_react_code}", code)
         code = template.replace("{insert_react_code}", code)
 
         yield {
@@ -69,7 +154,7 @@ class React(BaseLanguage):
         yield {"type": "code", "format": "html", "content": code, "recipient": "user"}
 
         # Assistant sees image
-        base64 = html_to_png_base64(code)
+        base64 = html_to_png_base64(page)
         yield {
             "type": "image",
             "format": "base64.png",
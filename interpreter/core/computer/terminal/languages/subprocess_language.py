@@ -1,13 +1,42 @@
+import codecs
+import io
 import os
 import queue
 import re
+import selectors
 import subprocess
 import threading
-import time
 import traceback
 
 from ..base_language import BaseLanguage
 
+# Put on the output queue (with the execution's number) to wake up `run` as soon as execution ends
+END_OF_EXECUTION = object()
+
+
+class LineSplitter:
+    """
+    Turns raw bytes from a pipe into lines, the same way `stream.readline` would in text mode.
+    """
+
+    def __init__(self, is_error_stream):
+        self.is_error_stream = is_error_stream
+        self.decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True
+        )
+        self.pending = ""
+
+    def feed(self, data, final=False):
+        text = self.pending + self.decoder.decode(data, final=final)
+        lines = text.split("\n")
+        self.pending = "" if final else lines.pop()
+        lines = [line + "\n" for line in lines]
+        if final and lines[-1] == "\n":
+            lines.pop()  # The last "line" was just what came after the final newline
+        elif final:
+            lines[-1] = lines[-1][:-1]
+        return lines
+
 
 class SubprocessLanguage(BaseLanguage):
     def __init__(self):
@@ -16,6 +45,9 @@ class SubprocessLanguage(BaseLanguage):
         self.verbose = False
         self.output_queue = queue.Queue()
         self.done = threading.Event()
+        # Counts runs, so an end left over from an earlier one can't end the current one
+        self.execution = 0
+        self.end_lock = threading.Lock()
 
     def detect_active_line(self, line):
         return None
@@ -39,7 +71,13 @@ class SubprocessLanguage(BaseLanguage):
         if self.process:
             self.process.terminate()
             self.process.stdin.close()
-            self.process.stdout.close()
+            if os.name == "nt":
+                self.process.stdout.close()
+            # Otherwise handle_output_streams closes the pipes once it has read them to the end
+
+    def warm(self):
+        if not self.process:
+            self.start_process()
 
     def start_process(self):
         if self.process:
@@ -59,16 +97,26 @@ class SubprocessLanguage(BaseLanguage):
             encoding="utf-8",
             errors="replace",
         )
-        threading.Thread(
-            target=self.handle_stream_output,
-            args=(self.process.stdout, False),
-            daemon=True,
-        ).start()
-        threading.Thread(
-            target=self.handle_stream_output,
-            args=(self.process.stderr, True),
-            daemon=True,
-        ).start()
+
+        if os.name == "nt":
+            # Windows can't select() on pipes, so we fall back to a thread per stream
+            threading.Thread(
+                target=self.handle_stream_output,
+                args=(self.process.stdout, False),
+                daemon=True,
+            ).start()
+            threading.Thread(
+                target=self.handle_stream_output,
+                args=(self.process.stderr, True),
+                daemon=True,
+            ).start()
+        else:
+            # One thread multiplexes stdout and stderr
+            threading.Thread(
+                target=self.handle_output_streams,
+                args=(self.process,),
+                daemon=True,
+            ).start()
 
     def run(self, code):
         retry_count = 0
@@ -87,6 +135,8 @@ class SubprocessLanguage(BaseLanguage):
             }
             return
 
+        self.execution += 1
+        execution = self.execution
         while retry_count <= max_retries:
             if self.verbose:
                 print(f"(after processing) Running processed code:\n{code}\n---")
@@ -119,75 +169,129 @@ class SubprocessLanguage(BaseLanguage):
                     }
                     return
 
+        # No polling. We block until a line or the end of execution arrives
         while True:
-            if not self.output_queue.empty():
-                yield self.output_queue.get()
-            else:
-                time.sleep(0.1)
-            try:
-                output = self.output_queue.get(timeout=0.3)  # Waits for 0.3 seconds
-                yield output
-            except queue.Empty:
-                if self.done.is_set():
-                    # Try to yank 3 more times from it... maybe there's something in there...
-                    # (I don't know if this actually helps. Maybe we just need to yank 1 more time)
-                    for _ in range(3):
-                        if not self.output_queue.empty():
-                            yield self.output_queue.get()
-                        time.sleep(0.2)
+            output = self.output_queue.get()
+            if isinstance(output, tuple) and output[0] is END_OF_EXECUTION:
+                if output[1] == execution:
                     break
+                continue  # Left over from an earlier execution
+            yield output
+
+    def end_execution(self):
+        # A KeyboardInterrupt, the end marker and the process exiting can all end the same execution.
+        # Only the first one counts
+        with self.end_lock:
+            if self.done.is_set():
+                return
+            self.done.set()
+            self.output_queue.put((END_OF_EXECUTION, self.execution))
+
+    def handle_output_streams(self, process):
+        """
+        Reads stdout and stderr from a single thread, handling each line as soon as it arrives.
+        """
+        selector = selectors.DefaultSelector()
+        try:
+            for stream, is_error_stream in (
+                (process.stdout, False),
+                (process.stderr, True),
+            ):
+                selector.register(
+                    stream.fileno(), selectors.EVENT_READ, LineSplitter(is_error_stream)
+                )
+
+            while selector.get_map():
+                for key, _ in selector.select():
+                    splitter = key.data
+                    data = os.read(key.fd, 65536)
+                    if data:
+                        lines = splitter.feed(data)
+                    else:
+                        selector.unregister(key.fd)
+                        lines = splitter.feed(b"", final=True)
+
+                    if not splitter.is_error_stream and any(
+                        self.detect_end_of_execution(line) for line in lines
+                    ):
+                        # stderr written before the end marker might still be in the pipe.
+                        # Grab it first (without waiting) so it isn't attributed to the next execution.
+                        for stderr_key, _ in selector.select(timeout=0):
+                            if stderr_key.data.is_error_stream:
+                                data = os.read(stderr_key.fd, 65536)
+                                for line in stderr_key.data.feed(data, final=not data):
+                                    self.handle_line(line, True)
+                                if not data:
+                                    selector.unregister(stderr_key.fd)
+
+                    for line in lines:
+                        self.handle_line(line, splitter.is_error_stream)
+        except (OSError, ValueError):
+            # The process was terminated and its pipes closed under us
+            if self.verbose:
+                print("Stream closed while reading.")
+        finally:
+            selector.close()
+            process.stdout.close()
+            process.stderr.close()
+
+        # The process is gone. Don't leave anyone waiting for an end marker that will never come
+        if process is self.process:
+            self.end_execution()
 
     def handle_stream_output(self, stream, is_error_stream):
         try:
             for line in iter(stream.readline, ""):
-                if self.verbose:
-                    print(f"Received output line:\n{line}\n---")
-
-                line = self.line_postprocessor(line)
-
-                if line is None:
-                    continue  # `line = None` is the postprocessor's signal to discard completely
-
-                if self.detect_active_line(line):
-                    active_line = self.detect_active_line(line)
-                    self.output_queue.put(
-                        {
-                            "type": "console",
-                            "format": "active_line",
-                            "content": active_line,
-                        }
-                    )
-                    # Sometimes there's a little extra on the same line, so be sure to send that out
-                    line = re.sub(r"##active_line\d+##", "", line)
-                    if line:
-                        self.output_queue.put(
-                            {"type": "console", "format": "output", "content": line}
-                        )
-                elif self.detect_end_of_execution(line):
-                    # Sometimes there's a little extra on the same line, so be sure to send that out
-                    line = line.replace("##end_of_execution##", "").strip()
-                    if line:
-                        self.output_queue.put(
-                            {"type": "console", "format": "output", "content": line}
-                        )
-                    self.done.set()
-                elif is_error_stream and "KeyboardInterrupt" in line:
-                    self.output_queue.put(
-                        {
-                            "type": "console",
-                            "format": "output",
-                            "content": "KeyboardInterrupt",
-                        }
-                    )
-                    time.sleep(0.1)
-                    self.done.set()
-                else:
-                    self.output_queue.put(
-                        {"type": "console", "format": "output", "content": line}
-                    )
+                self.handle_line(line, is_error_stream)
         except ValueError as e:
             if "operation on closed file" in str(e):
                 if self.verbose:
                     print("Stream closed while reading.")
             else:
                 raise e
+
+    def handle_line(self, line, is_error_stream):
+        if self.verbose:
+            print(f"Received output line:\n{line}\n---")
+
+        line = self.line_postprocessor(line)
+
+        if line is None:
+            return  # `line = None` is the postprocessor's signal to discard completely
+
+        if self.detect_active_line(line):
+            active_line = self.detect_active_line(line)
+            self.output_queue.put(
+                {
+                    "type": "console",
+                    "format": "active_line",
+                    "content": active_line,
+                }
+            )
+            # Sometimes there's a little extra on the same line, so be sure to send that out
+            line = re.sub(r"##active_line\d+##", "", line)
+            if line:
+                self.output_queue.put(
+                    {"type": "console", "format": "output", "content": line}
+                )
+        elif self.detect_end_of_execution(line):
+            # Sometimes there's a little extra on the same line, so be sure to send that out
+            line = line.replace("##end_of_execution##", "").strip()
+            if line:
+                self.output_queue.put(
+                    {"type": "console", "format": "output", "content": line}
+                )
+            self.end_execution()
+        elif is_error_stream and "KeyboardInterrupt" in line:
+            self.output_queue.put(
+                {
+                    "type": "console",
+                    "format": "output",
+                    "content": "KeyboardInterrupt",
+                }
+            )
+            self.end_execution()
+        else:
+            self.output_queue.put(
+                {"type": "console", "format": "output", "content": line}
+            )
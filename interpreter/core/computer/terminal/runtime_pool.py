@@ -0,0 +1,125 @@
+import threading
+import time
+import traceback
+
+
+class RuntimePool:
+    """
+    Language instances (kernels, shells...) started in the background before code needs them.
+
+    `warm(lang_class)` starts one on a thread, unless one is already ready or starting. `take(lang_class)` hands
+    over the ready one, waits for one that's still starting, or starts one right there if there isn't any.
+    Languages in the terminal's `warm_languages` are warmed again as soon as theirs is taken, so a reset
+    or a crashed kernel is replaced by one that's already running.
+
+    `metrics` has, per language, how long starting took and how long code waited for it.
+    """
+
+    def __init__(self, computer):
+        self.computer = computer
+        self.lock = threading.Lock()
+        # lang_class -> {"instance", "error", "ready" (threading.Event), "cancelled"}
+        self.spares = {}
+        self.metrics = {}
+
+    def language_metrics(self, name):
+        return self.metrics.setdefault(
+            name,
+            {
+                "starts": 0,
+                "start_seconds": None,
+                "wait_seconds": None,
+                "runs": 0,
+                "first_output_seconds": None,
+            },
+        )
+
+    def start(self, lang_class):
+        """
+        Starts an instance, in this thread. Pass in the computer *if it takes a single argument*
+        but pass in nothing if not. This makes custom languages easier to add / understand.
+        """
+        start = time.perf_counter()
+        if lang_class.__init__.__code__.co_argcount > 1:
+            instance = lang_class(self.computer)
+        else:
+            instance = lang_class()
+        if hasattr(instance, "warm"):
+            try:
+                instance.warm()
+            except Exception:
+                # Like a missing interpreter. run() hits the same problem, and reports it
+                if self.computer.debug:
+                    print(
+                        f"Couldn't warm up {lang_class.name}:\n{traceback.format_exc()}"
+                    )
+
+        metrics = self.language_metrics(lang_class.name)
+        metrics["starts"] += 1
+        metrics["start_seconds"] = time.perf_counter() - start
+        return instance
+
+    def warm(self, lang_class):
+        with self.lock:
+            if lang_class in self.spares:
+                return
+            spare = {
+                "instance": None,
+                "error": None,
+                "ready": threading.Event(),
+                "cancelled": False,
+            }
+            self.spares[lang_class] = spare
+
+        def start():
+            instance = None
+            try:
+                instance = self.start(lang_class)
+            except Exception:
+                spare["error"] = traceback.format_exc()
+            with self.lock:
+                spare["instance"] = instance
+                spare["ready"].set()
+                cancelled = spare["cancelled"]
+            if cancelled and instance is not None:
+                instance.terminate()
+
+        threading.Thread(target=start, daemon=True).start()
+
+    def take(self, lang_class):
+        start = time.perf_counter()
+        with self.lock:
+            spare = self.spares.pop(lang_class, None)
+
+        instance = None
+        if spare is not None:
+            spare["ready"].wait()
+            instance = spare["instance"]
+            if spare["error"] and self.computer.debug:
+                print(f"Couldn't warm up {lang_class.name}:\n{spare['error']}")
+        if instance is None:
+            instance = self.start(lang_class)
+        self.language_metrics(lang_class.name)["wait_seconds"] = (
+            time.perf_counter() - start
+        )
+
+        warm_languages = self.computer.terminal.warm_languages
+        if any(
+            self.computer.terminal.get_language(name) is lang_class
+            for name in warm_languages
+        ):
+            self.warm(lang_class)
+        return instance
+
+    def terminate(self):
+        """
+        Shuts down the spares. Ones that are still starting shut down when they're done.
+        """
+        with self.lock:
+            spares = list(self.spares.values())
+            self.spares = {}
+            for spare in spares:
+                spare["cancelled"] = True
+        for spare in spares:
+            if spare["ready"].is_set() and spare["instance"] is not None:
+                spare["instance"].terminate()
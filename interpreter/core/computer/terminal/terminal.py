@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 import time
 
 from ..utils.recipient_utils import parse_for_recipient
@@ -13,6 +14,7 @@ from .languages.r import R
 from .languages.react import React
 from .languages.ruby import Ruby
 from .languages.shell import Shell
+from .runtime_pool import RuntimePool
 
 # Should this be renamed to OS or System?
 
@@ -25,6 +27,10 @@ import datetime
 from interpreter import interpreter
 
 computer = interpreter.computer
+
+# Sends changes to computer back to us after each execution, for interpreter.sync_computer
+from interpreter.core.computer.utils.computer_sync import KernelSync
+KernelSync.install(computer)
 """.strip()
 
 
@@ -45,6 +51,10 @@ class Terminal:
         ]
         self._active_languages = {}
 
+        # Started in the background when a chat starts, and kept a spare of, so code doesn't wait for them
+        self.warm_languages = ["python"]
+        self.runtimes = RuntimePool(computer)
+
     def get_language(self, language):
         for lang in self.languages:
             if language.lower() == lang.name.lower() or (
@@ -54,7 +64,35 @@ class Terminal:
                 return lang
         return None
 
+    def warm(self, language=None):
+        """
+        Starts `language` (or every language in warm_languages) in the background, so it's ready
+        by the time code for it arrives.
+        """
+        for name in [language] if language else self.warm_languages:
+            if name in self._active_languages:
+                continue
+            lang_class = self.get_language(name)
+            if lang_class:
+                self.runtimes.warm(lang_class)
+
+    def _replace_if_dead(self, language):
+        """
+        Drops a language whose process died (like a crashed kernel), so the next run gets a new one.
+        """
+        instance = self._active_languages.get(language)
+        if instance is None or not hasattr(instance, "is_alive") or instance.is_alive():
+            return
+        # Cleaning up after it can take a while, and there's nothing to wait for
+        threading.Thread(target=instance.terminate, daemon=True).start()
+        del self._active_languages[language]
+        if self.get_language(language) is Python:
+            # It died with the computer API
+            self.computer._has_imported_computer_api = False
+
     def run(self, language, code, stream=False, display=False):
+        self._replace_if_dead(language)
+
         if language == "python":
             if (
                 self.computer.import_computer_api
@@ -64,7 +102,6 @@ class Terminal:
             ):
                 self.computer._has_imported_computer_api = True
                 # Give it access to the computer via Python
-                time.sleep(0.5)
                 self.computer.run(
                     language="python",
                     code=import_computer_api_code,
@@ -121,16 +158,18 @@ class Terminal:
             return self._streaming_run(language, code, display=display)
 
     def _streaming_run(self, language, code, display=False):
+        start = time.perf_counter()
+        lang_class = self.get_language(language)
         if language not in self._active_languages:
-            # Get the language. Pass in self.computer *if it takes a single argument*
-            # but pass in nothing if not. This makes custom languages easier to add / understand.
-            lang_class = self.get_language(language)
-            if lang_class.__init__.__code__.co_argcount > 1:
-                self._active_languages[language] = lang_class(self.computer)
-            else:
-                self._active_languages[language] = lang_class()
+            # The warm one, if there is one
+            self._active_languages[language] = self.runtimes.take(lang_class)
+        first_output = True
         try:
             for chunk in self._active_languages[language].run(code):
+                if first_output and chunk.get("format") != "active_line":
+                    first_output = False
+                    self.record_first_output(lang_class, time.perf_counter() - start)
+
                 # self.format_to_recipient can format some messages as having a certain recipient.
                 # Here we add that to the LMC messages:
                 if chunk["type"] == "console" and chunk.get("format") == "output":
@@ -160,11 +199,23 @@ class Terminal:
         except GeneratorExit:
             self.stop()
 
+    def record_first_output(self, lang_class, seconds):
+        metrics = self.runtimes.language_metrics(lang_class.name)
+        metrics["runs"] += 1
+        metrics["first_output_seconds"] = seconds
+        if self.computer.debug:
+            print(f"{lang_class.name}: first output after {seconds:.3f}s")
+
     def stop(self):
         for language in self._active_languages.values():
             language.stop()
 
-    def terminate(self):
+    def terminate(self, keep_warm=False):
+        """
+        Terminates every language. With keep_warm, spares that are ready (or starting) are kept for next time.
+        """
+        if not keep_warm:
+            self.runtimes.terminate()
         for language_name in list(self._active_languages.keys()):
             language = self._active_languages[language_name]
             if (
@@ -0,0 +1,106 @@
+def overlaps(a, b):
+    """
+    Whether two (left, top, right, bottom) boxes share any area. Touching edges don't count.
+    """
+    return a[0] < b[2] and a[2] > b[0] and a[1] < b[3] and a[3] > b[1]
+
+
+def contains(outer, inner):
+    """
+    Whether `inner` is entirely inside `outer`, edges included.
+    """
+    return (
+        outer[0] <= inner[0] <= outer[2]
+        and outer[1] <= inner[1] <= outer[3]
+        and outer[0] <= inner[2] <= outer[2]
+        and outer[1] <= inner[3] <= outer[3]
+    )
+
+
+def union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+class BoxGrid:
+    """
+    Boxes bucketed by the grid cells they cover, so finding the boxes that overlap one box
+    only looks at the few boxes in its cells instead of every box.
+
+    Boxes are (left, top, right, bottom) tuples. Cells should be about the size of a typical box.
+    """
+
+    def __init__(self, boxes=(), cell_size=64):
+        self.cell_size = cell_size
+        self.boxes = []
+        self.cells = {}
+        for box in boxes:
+            self.add(box)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def cells_for(self, box):
+        size = self.cell_size
+        left, right = sorted((box[0], box[2]))
+        top, bottom = sorted((box[1], box[3]))
+        for column in range(int(left // size), int(right // size) + 1):
+            for row in range(int(top // size), int(bottom // size) + 1):
+                yield column, row
+
+    def add(self, box):
+        i = len(self.boxes)
+        self.boxes.append(box)
+        for cell in self.cells_for(box):
+            self.cells.setdefault(cell, []).append(i)
+        return i
+
+    def near(self, box):
+        """
+        Indices of the boxes that share a cell with `box`. Every box that overlaps or contains it is among them.
+        """
+        found = set()
+        for cell in self.cells_for(box):
+            found.update(self.cells.get(cell, ()))
+        return sorted(found)
+
+    def overlapping(self, box):
+        return [i for i in self.near(box) if overlaps(self.boxes[i], box)]
+
+    def any_overlapping(self, box):
+        return any(overlaps(self.boxes[i], box) for i in self.near(box))
+
+    def any_containing(self, box):
+        return any(contains(self.boxes[i], box) for i in self.near(box))
+
+
+def merge_overlapping(boxes, cell_size=64):
+    """
+    Merges overlapping boxes into their bounding box, again and again, until no two boxes overlap.
+    """
+    boxes = list(boxes)
+    while True:
+        grid = BoxGrid(boxes, cell_size=cell_size)
+
+        # Group boxes that overlap, directly or through a chain of other boxes
+        parent = list(range(len(boxes)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, box in enumerate(boxes):
+            for j in grid.overlapping(box):
+                if j < i:
+                    parent[find(i)] = find(j)
+
+        groups = {}
+        for i, box in enumerate(boxes):
+            root = find(i)
+            groups[root] = union(groups[root], box) if root in groups else box
+
+        # A group's bounding box can overlap boxes none of its members did, so go again
+        if len(groups) == len(boxes):
+            return boxes
+        boxes = list(groups.values())
@@ -0,0 +1,142 @@
+"""
+Keeps the `computer` in the Python kernel in step with ours, sending only what changed.
+
+Ours goes to the kernel as a silent execution queued just ahead of the code about to run,
+so there's no round trip to wait for. The kernel's changes come back from a post_execute hook,
+as a display message with SYNC_MIMETYPE that the Jupyter dispatcher applies before the execution ends.
+Each side remembers what the other last saw, so nothing is echoed back, and all the changes
+made during one execution travel as one message.
+"""
+
+import json
+
+SYNC_MIMETYPE = "application/vnd.open-interpreter.computer-delta+json"
+
+# Too big to be worth sending, and the same on both sides anyway
+NOT_SYNCED = {"_hashes", "system_message"}
+
+
+def computer_state(computer):
+    """
+    The computer's JSON-serializable attributes (what to_dict() gives), each as its JSON text.
+    """
+    state = {}
+    for key, value in computer.__dict__.items():
+        if key in NOT_SYNCED:
+            continue
+        try:
+            state[key] = json.dumps(value, sort_keys=True)
+        except (TypeError, ValueError):
+            continue
+    return state
+
+
+def load_delta(computer, delta):
+    computer.load_dict({key: json.loads(value) for key, value in delta.items()})
+
+
+class ComputerSync:
+    """
+    Our side. `push_code()` gives the code that sends our changes, `apply()` takes the kernel's.
+    """
+
+    def __init__(self, computer):
+        self.computer = computer
+        # What we think the kernel's computer looks like. None until we've sent it everything once
+        self.kernel_state = None
+
+    def changes(self):
+        state = computer_state(self.computer)
+        if self.kernel_state is None:
+            delta = state
+            self.kernel_state = {}
+        else:
+            delta = {
+                key: value
+                for key, value in state.items()
+                if self.kernel_state.get(key) != value
+            }
+        self.kernel_state.update(delta)
+        return delta
+
+    def push_code(self):
+        """
+        Code that applies our changes in the kernel, or None if there aren't any.
+        """
+        delta = self.changes()
+        if not delta:
+            return None
+        # Imported here, so it works even before the computer API is (the delta waits for it)
+        return (
+            "__import__('interpreter.core.computer.utils.computer_sync', fromlist=['KernelSync'])"
+            f".KernelSync.receive({json.dumps(delta)!r})"
+        )
+
+    def apply(self, delta):
+        """
+        Applies a delta from the kernel.
+        """
+        load_delta(self.computer, delta)
+        if self.kernel_state is not None:
+            self.kernel_state.update(delta)
+
+
+class KernelSync:
+    """
+    The kernel's side. `install(computer)` runs when the computer API is imported into the kernel.
+    """
+
+    instance = None
+    # Deltas that arrived before the computer API was imported
+    pending = []
+
+    def __init__(self, computer):
+        self.computer = computer
+        # What we think the other side's computer looks like
+        self.host_state = computer_state(computer)
+
+    @classmethod
+    def install(cls, computer):
+        from IPython import get_ipython
+
+        ipython = get_ipython()
+        if ipython is not None and cls.instance is not None:
+            # Imported again. Only the new one sends changes
+            ipython.events.unregister("post_execute", cls.instance.post_execute)
+
+        cls.instance = cls(computer)
+        for delta in cls.pending:
+            cls.instance.apply(delta)
+        cls.pending = []
+
+        if ipython is not None:
+            ipython.events.register("post_execute", cls.instance.post_execute)
+        return cls.instance
+
+    @classmethod
+    def receive(cls, delta_json):
+        delta = json.loads(delta_json)
+        if cls.instance is None:
+            cls.pending.append(delta)
+        else:
+            cls.instance.apply(delta)
+
+    def apply(self, delta):
+        load_delta(self.computer, delta)
+        self.host_state.update(delta)
+
+    def post_execute(self):
+        """
+        Sends whatever the code just run changed.
+        """
+        from IPython.display import publish_display_data
+
+        state = computer_state(self.computer)
+        delta = {
+            key: value
+            for key, value in state.items()
+            if self.host_state.get(key) != value
+        }
+        if delta:
+            self.host_state.update(delta)
+            publish_display_data({SYNC_MIMETYPE: delta})
@@ -1,6 +1,9 @@
 import io
 
 from ...utils.lazy_import import lazy_import
+from ...utils.lru_cache import LRUCache
+from .ocr_cache import OcrCache, image_hash
+from .text_layout import TextLayout
 
 # Lazy import of optional packages
 np = lazy_import("numpy")
@@ -12,17 +15,12 @@ PIL = lazy_import("PIL")
 pytesseract = lazy_import("pytesseract")
 
 
-def pytesseract_get_text(img):
+def tesseract_data(img):
     # List the attributes of pytesseract, which will trigger lazy loading of it
     attributes = dir(pytesseract)
     if pytesseract == None:
         raise ImportError("The pytesseract module could not be imported.")
 
-    result = pytesseract.image_to_string(img)
-    return result
-
-
-def pytesseract_get_text_bounding_boxes(img):
     # Convert PIL Image to NumPy array
     img_array = np.array(img)
 
@@ -30,7 +28,35 @@ def pytesseract_get_text_bounding_boxes(img):
     gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
 
     # Use pytesseract to get the data from the image
-    d = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+    return pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+
+
+# Shared by everything that reads text off the screen, so the same pixels are only OCR'd once
+ocr_cache = OcrCache()
+
+
+def ocr(img):
+    """
+    pytesseract's word/box data for the image, from the shared OCR cache when possible.
+    """
+    return ocr_cache.get(img, "tesseract", tesseract_data)
+
+
+def pytesseract_get_text(img):
+    d = ocr(img)
+
+    # Words are grouped into lines by their block, paragraph and line numbers
+    lines = {}
+    for i, text in enumerate(d["text"]):
+        if text.strip():
+            line = (d["block_num"][i], d["par_num"][i], d["line_num"][i])
+            lines.setdefault(line, []).append(text)
+
+    return "\n".join(" ".join(words) for words in lines.values())
+
+
+def pytesseract_get_text_bounding_boxes(img):
+    d = ocr(img)
 
     # Create an empty list to hold dictionaries for each bounding box
     boxes = []
@@ -51,163 +77,87 @@ def pytesseract_get_text_bounding_boxes(img):
     return boxes
 
 
-def find_text_in_image(img, text, debug=False):
-    # Convert PIL Image to NumPy array
-    img_array = np.array(img)
-
-    # Convert the image to grayscale
-    gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
-
-    # Use pytesseract to get the data from the image
-    d = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
-
-    # Initialize an empty list to store the centers of the bounding boxes
-    centers = []
-
-    # Get the number of detected boxes
-    n_boxes = len(d["level"])
+def text_layout(img):
+    """
+    The image's OCR result, indexed for searching. Built once per screenshot.
+    """
+    key = image_hash(img)
+    layout = layouts.get(key)
+    if layout is None:
+        layout = TextLayout(ocr_cache.get(img, "tesseract", tesseract_data, key=key))
+        layouts.set(key, layout)
+    return layout
+
+
+layouts = LRUCache(16)
+
+
+def nearby_words_center(layout, text, distance=400):
+    """
+    The midpoint of the first two of the text's words that were found within `distance` of each other.
+    """
+    boxes = [layout.find_substring(word)[0] for word in text.split()]
+    if not boxes:
+        return []
+    centers = layout.centers(np.concatenate(boxes)) / 2
+    if len(centers) < 2:
+        return []
+
+    offsets = centers[:, None, :] - centers[None, :, :]
+    close = (np.sqrt((offsets**2).sum(axis=-1)) <= distance) & (offsets != 0).any(
+        axis=-1
+    )
+    rows = np.flatnonzero(close.any(axis=1))
+    if not len(rows):
+        return []
+    first = rows[0]
+    second = np.flatnonzero(close[first])[0]
+    return [tuple((centers[first] + centers[second]) / 2)]
 
-    # Create a copy of the grayscale image to draw on
-    img_draw = np.array(gray.copy())
 
-    # Convert the img_draw grayscale image to RGB
-    img_draw = cv2.cvtColor(img_draw, cv2.COLOR_GRAY2RGB)
-
-    id = 0
-
-    # Loop through each box
-    for i in range(n_boxes):
-        if debug:
-            # (DEBUGGING) Draw each box on the grayscale image
-            cv2.rectangle(
-                img_draw,
-                (d["left"][i], d["top"][i]),
-                (d["left"][i] + d["width"][i], d["top"][i] + d["height"][i]),
-                (0, 255, 0),
-                2,
-            )
-            # Draw the detected text in the rectangle in small font
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.5
-            font_color = (0, 0, 255)
-            line_type = 2
-
-            cv2.putText(
-                img_draw,
-                d["text"][i],
-                (d["left"][i], d["top"][i] - 10),
-                font,
-                font_scale,
-                font_color,
-                line_type,
-            )
+def find_text_in_image(img, text, debug=False):
+    layout = text_layout(img)
 
-        # Print the text of the box
-        # If the text in the box matches the given text
-        if text.lower() in d["text"][i].lower():
-            # Find the start index of the matching text in the box
-            start_index = d["text"][i].lower().find(text.lower())
-            # Calculate the percentage of the box width that the start of the matching text represents
-            start_percentage = start_index / len(d["text"][i])
-            # Move the left edge of the box to the right by this percentage of the box width
-            d["left"][i] = d["left"][i] + int(d["width"][i] * start_percentage)
-
-            # Calculate the width of the matching text relative to the entire text in the box
-            text_width_percentage = len(text) / len(d["text"][i])
-            # Adjust the width of the box to match the width of the matching text
-            d["width"][i] = int(d["width"][i] * text_width_percentage)
-
-            # Calculate the center of the bounding box
-            center = (
-                d["left"][i] + d["width"][i] / 2,
-                d["top"][i] + d["height"][i] / 2,
-            )
+    # The text in one box, or its words next to each other on a line
+    left, top, width, height = layout.find_text(text, fuzzy=None)
+    centers = [(x, y) for x, y in zip(left + width / 2, top + height / 2)]
 
-            # Add the center to the list
-            centers.append(center)
+    # Its words near each other anywhere on screen
+    if not centers:
+        centers = nearby_words_center(layout, text)
 
-            # Draw the bounding box on the image in red and make it slightly larger
-            larger = 10
+    # Something that's spelled almost the same (OCR often gets a letter or two wrong)
+    if not centers:
+        left, top, width, height = layout.find_text(text)
+        centers = [(x, y) for x, y in zip(left + width / 2, top + height / 2)]
+
+    if debug:
+        # Draw every box in green, and the matches in red
+        img_draw = cv2.cvtColor(
+            cv2.cvtColor(np.array(img), cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2RGB
+        )
+        for i in range(len(layout)):
             cv2.rectangle(
                 img_draw,
-                (d["left"][i] - larger, d["top"][i] - larger),
+                (int(layout.left[i]), int(layout.top[i])),
                 (
-                    d["left"][i] + d["width"][i] + larger,
-                    d["top"][i] + d["height"][i] + larger,
+                    int(layout.left[i] + layout.width[i]),
+                    int(layout.top[i] + layout.height[i]),
                 ),
-                (255, 0, 0),
-                7,
+                (0, 255, 0),
+                2,
             )
-
-            # Create a small black square background for the ID
+        for x, y, w, h in zip(left, top, width, height):
             cv2.rectangle(
-                img_draw,
-                (
-                    d["left"][i] + d["width"][i] // 2 - larger * 2,
-                    d["top"][i] + d["height"][i] // 2 - larger * 2,
-                ),
-                (
-                    d["left"][i] + d["width"][i] // 2 + larger * 2,
-                    d["top"][i] + d["height"][i] // 2 + larger * 2,
-                ),
-                (0, 0, 0),
-                -1,
-            )
-
-            # Put the ID in the center of the bounding box in red
-            cv2.putText(
-                img_draw,
-                str(id),
-                (
-                    d["left"][i] + d["width"][i] // 2 - larger,
-                    d["top"][i] + d["height"][i] // 2 + larger,
-                ),
-                cv2.FONT_HERSHEY_DUPLEX,
-                1,
-                (255, 155, 155),
-                4,
+                img_draw, (int(x), int(y)), (int(x + w), int(y + h)), (255, 0, 0), 7
             )
-
-            # Increment id
-            id += 1
-
-    if not centers:
-        word_centers = []
-        for word in text.split():
-            for i in range(n_boxes):
-                if word.lower() in d["text"][i].lower():
-                    center = (
-                        d["left"][i] + d["width"][i] / 2,
-                        d["top"][i] + d["height"][i] / 2,
-                    )
-                    center = (center[0] / 2, center[1] / 2)
-                    word_centers.append(center)
-
-        for center1 in word_centers:
-            for center2 in word_centers:
-                if (
-                    center1 != center2
-                    and (
-                        (center1[0] - center2[0]) ** 2 + (center1[1] - center2[1]) ** 2
-                    )
-                    ** 0.5
-                    <= 400
-                ):
-                    centers.append(
-                        ((center1[0] + center2[0]) / 2, (center1[1] + center2[1]) / 2)
-                    )
-                    break
-            if centers:
-                break
-
-    bounding_box_image = PIL.Image.fromarray(img_draw)
-    bounding_box_image.format = img.format
+        bounding_box_image = PIL.Image.fromarray(img_draw)
+        bounding_box_image.format = img.format
+        # Debug by showing bounding boxes:
+        # bounding_box_image.show()
 
     # Convert centers to relative
     img_width, img_height = img.size
-    centers = [(x / img_width, y / img_height) for x, y in centers]
-
-    # Debug by showing bounding boxes:
-    # bounding_box_image.show()
+    centers = [(float(x) / img_width, float(y) / img_height) for x, y in centers]
 
     return centers
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from ...utils.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+
+class EmbeddingStore:
+    """
+    Embeddings on disk, keyed by content hash, so they outlive the process.
+
+    Vectors are normalized and kept as float16 rows of a memory-mapped file (`vectors.f16`), so only the
+    rows we touch are paged in. `index.json` maps each key to its row, oldest first. Once `max_entries`
+    is reached, the least recently used row is overwritten.
+
+    Adds are appended to `index.log` instead of rewriting the index. Once the log is longer than the
+    index (or the file grows), it's folded into a new `index.json`.
+    """
+
+    def __init__(self, path, max_entries=20000):
+        self.path = path
+        self.max_entries = max_entries
+        self.dim = None
+        self.capacity = 0
+        self.vectors = None
+        self.rows = OrderedDict()
+        self.lock = threading.RLock()
+        # Bumped every time the log is folded into the index, so a log from before that is ignored
+        self.generation = 0
+        self.log_entries = 0
+        self.saved_capacity = None
+
+        self.index_path = os.path.join(path, "index.json")
+        self.log_path = os.path.join(path, "index.log")
+        self.vectors_path = os.path.join(path, "vectors.f16")
+
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            self.dim = index["dim"]
+            self._open(index["capacity"])
+            self.saved_capacity = self.capacity
+            self.rows = OrderedDict(index["rows"])
+            self.generation = index.get("generation", 0)
+            self._replay_log()
+        except (OSError, ValueError, KeyError):
+            # Missing or half-written. Start over
+            self.dim = None
+            self.capacity = 0
+            self.vectors = None
+            self.rows = OrderedDict()
+            self.generation = 0
+            self.log_entries = 0
+            self.saved_capacity = None
+
+    def _replay_log(self):
+        try:
+            with open(self.log_path, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        if not lines or json.loads(lines[0]) != {"generation": self.generation}:
+            return  # Already in the index
+
+        keys_by_row = {row: key for key, row in self.rows.items()}
+        for line in lines[1:]:
+            try:
+                key, row = json.loads(line)
+            except ValueError:
+                break  # Half-written by a crash
+            # The row's old key was evicted
+            evicted = keys_by_row.get(row)
+            if evicted is not None and evicted != key:
+                del self.rows[evicted]
+            self.rows.pop(key, None)
+            self.rows[key] = row
+            keys_by_row[row] = key
+            self.log_entries += 1
+
+    def _open(self, capacity):
+        os.makedirs(self.path, exist_ok=True)
+        mode = "r+b" if os.path.exists(self.vectors_path) else "w+b"
+        with open(self.vectors_path, mode) as f:
+            f.truncate(capacity * self.dim * 2)
+        self.vectors = np.memmap(
+            self.vectors_path,
+            dtype=np.float16,
+            mode="r+",
+            shape=(capacity, self.dim),
+        )
+        self.capacity = capacity
+
+    def _save(self, keys=()):
+        self.vectors.flush()
+        if self.saved_capacity != self.capacity or self.log_entries >= max(
+            len(self.rows), 1024
+        ):
+            self._compact()
+            return
+        with open(self.log_path, "a") as f:
+            f.write("".join(json.dumps([key, self.rows[key]]) + "\n" for key in keys))
+        self.log_entries += len(keys)
+
+    def _compact(self):
+        self.generation += 1
+        index = {
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "generation": self.generation,
+            "rows": list(self.rows.items()),
+        }
+        # Write then rename, so a crash never leaves a half-written index
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(temp_path, self.index_path)
+        with open(self.log_path, "w") as f:
+            f.write(json.dumps({"generation": self.generation}) + "\n")
+        self.log_entries = 0
+        self.saved_capacity = self.capacity
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.rows:
+                return None
+            self.rows.move_to_end(key)
+            return np.asarray(self.vectors[self.rows[key]], dtype=np.float32)
+
+    def touch(self, keys):
+        """
+        Marks the keys we have as most recently used, so adding others doesn't evict them.
+        """
+        with self.lock:
+            for key in keys:
+                if key in self.rows:
+                    self.rows.move_to_end(key)
+
+    def add(self, keys, vectors):
+        """
+        Stores a vector for each key, evicting the least recently used ones if we're full.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(keys) == 0:
+            return
+        vectors = vectors / np.maximum(
+            np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12
+        )
+
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Expected {self.dim} dimensional embeddings, got {vectors.shape[1]}"
+                )
+
+            for key, vector in zip(keys, vectors):
+                if key in self.rows:
+                    row = self.rows.pop(key)
+                elif len(self.rows) < self.max_entries:
+                    row = len(self.rows)
+                    if row >= self.capacity:
+                        # Grow by doubling, so most adds don't resize the file
+                        self._open(min(max(self.capacity * 2, 256), self.max_entries))
+                else:
+                    _, row = self.rows.popitem(last=False)
+                self.vectors[row] = vector
+                self.rows[key] = row
+
+            self._save(keys)
+
+    def search(self, vector, keys=None, top_k=10):
+        """
+        Cosine similarity between `vector` and the stored vectors for `keys` (or all of them), as one matmul.
+        Returns up to `top_k` (index into keys, score) pairs, best first. Keys we don't have are skipped.
+        """
+        with self.lock:
+            if keys is None:
+                keys = list(self.rows)
+            stored = [i for i, key in enumerate(keys) if key in self.rows]
+            if not stored:
+                return []
+            rows = np.fromiter((self.rows[keys[i]] for i in stored), dtype=np.int64)
+            for i in stored:
+                self.rows.move_to_end(keys[i])
+            matrix = self.vectors[rows]
+
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / max(np.linalg.norm(vector), 1e-12)
+        scores = matrix.astype(np.float32) @ vector
+
+        best = np.argsort(-scores)[:top_k]
+        return [(stored[i], float(scores[i])) for i in best]
+
+    def clear(self):
+        with self.lock:
+            self.rows.clear()
+            if self.vectors is not None:
+                self._compact()
@@ -0,0 +1,96 @@
+import threading
+
+from ...utils.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+
+def changed_tiles(before, after, tile_size, threshold):
+    """
+    One boolean per tile_size x tile_size tile: whether any pixel in it changed by more than
+    `threshold` (0-255) between two frames of the same shape. Frames are 2D, or 3D with channels last.
+    """
+    diff = np.maximum(before, after) - np.minimum(before, after)
+
+    # Channels side by side, so a tile is tile_size pixels wide in every channel
+    height, width = diff.shape[:2]
+    diff = diff.reshape(height, -1)
+    tile_width = tile_size * (diff.shape[1] // width)
+
+    # reduceat takes the max of each run of rows, then columns (a ragged last tile is fine)
+    rows = np.maximum.reduceat(diff, np.arange(0, height, tile_size), axis=0)
+    tiles = np.maximum.reduceat(rows, np.arange(0, diff.shape[1], tile_width), axis=1)
+    return tiles > threshold
+
+
+def changed_box(changed, tile_pixels, width, height, margin=1):
+    """
+    The box (left, top, right, bottom) around every changed tile, `margin` tiles bigger on each side
+    and clipped to width x height. `tile_pixels` is how many pixels a tile covers. None if nothing changed.
+    """
+    if not changed.any():
+        return None
+
+    changed_rows = np.flatnonzero(changed.any(axis=1))
+    changed_cols = np.flatnonzero(changed.any(axis=0))
+
+    left = max(int(changed_cols[0] - margin) * tile_pixels, 0)
+    top = max(int(changed_rows[0] - margin) * tile_pixels, 0)
+    right = min(int(changed_cols[-1] + 1 + margin) * tile_pixels, width)
+    bottom = min(int(changed_rows[-1] + 1 + margin) * tile_pixels, height)
+    return left, top, right, bottom
+
+
+class FrameDiff:
+    """
+    Remembers the last frame, so the next one can be described as "nothing changed",
+    "this region changed", or "everything changed".
+    """
+
+    def __init__(self, tile_size=32, threshold=16, max_changed=0.5, margin=1):
+        self.tile_size = tile_size
+        # How much a pixel has to change (0-255) to count. Ignores dithering and compression noise
+        self.threshold = threshold
+        # Past this fraction of the frame, just use the whole frame
+        self.max_changed = max_changed
+        # Tiles of context around the change
+        self.margin = margin
+        self.previous = None
+        self.lock = threading.Lock()
+
+    def update(self, img):
+        """
+        Compares `img` (a PIL image) with the last frame, and makes it the last frame.
+
+        Returns {"change": "none" | "region" | "full", "region": (left, top, right, bottom) or None,
+        "image": what to look at — None, a crop of the changed region, or `img` itself}.
+        """
+        frame = np.asarray(img if img.mode == "RGB" else img.convert("RGB"))
+        with self.lock:
+            previous, self.previous = self.previous, frame
+
+        width, height = img.size
+        if previous is None or previous.shape != frame.shape:
+            return {"change": "full", "region": (0, 0, width, height), "image": img}
+
+        if np.array_equal(previous, frame):
+            return {"change": "none", "region": None, "image": None}
+
+        region = changed_box(
+            changed_tiles(previous, frame, self.tile_size, self.threshold),
+            self.tile_size,
+            width,
+            height,
+            self.margin,
+        )
+        if region is None:
+            return {"change": "none", "region": None, "image": None}
+
+        left, top, right, bottom = region
+        if (right - left) * (bottom - top) > self.max_changed * width * height:
+            return {"change": "full", "region": (0, 0, width, height), "image": img}
+        return {"change": "region", "region": region, "image": img.crop(region)}
+
+    def reset(self):
+        with self.lock:
+            self.previous = None
@@ -0,0 +1,366 @@
+import atexit
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from ...utils.lazy_import import lazy_import
+
+websocket = lazy_import("websocket")
+
+# Resolves once the page (with its scripts, styles and images) has loaded, or after %d ms
+WAIT_FOR_LOAD = """new Promise((resolve) => {
+    if (document.readyState === "complete") resolve();
+    window.addEventListener("load", () => resolve());
+    setTimeout(resolve, %d);
+})"""
+
+
+# Checked first, in this order. The same variables html2image reads
+CHROME_ENV_VARS = [
+    "HTML2IMAGE_CHROME_BIN",
+    "HTML2IMAGE_CHROME_EXE",
+    "CHROME_BIN",
+    "CHROME_EXE",
+]
+
+CHROME_COMMANDS = [
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "chrome",
+    "msedge",
+]
+
+CHROME_PATHS = {
+    "Darwin": [
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+        "/Applications/Chromium.app/Contents/MacOS/Chromium",
+        "/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge",
+    ],
+    "Windows": [
+        os.path.join(
+            os.environ.get(variable, ""),
+            "Google",
+            "Chrome",
+            "Application",
+            "chrome.exe",
+        )
+        for variable in ["PROGRAMFILES", "PROGRAMFILES(X86)", "LOCALAPPDATA"]
+    ]
+    + [
+        os.path.join(
+            os.environ.get(variable, ""),
+            "Microsoft",
+            "Edge",
+            "Application",
+            "msedge.exe",
+        )
+        for variable in ["PROGRAMFILES", "PROGRAMFILES(X86)"]
+    ],
+}
+
+
+def find_chrome():
+    """
+    A Chrome (or Chromium, or Edge) executable. Raises FileNotFoundError if there isn't one.
+    """
+    for name in CHROME_ENV_VARS:
+        if os.environ.get(name):
+            return os.environ[name]
+    for command in CHROME_COMMANDS:
+        path = shutil.which(command)
+        if path:
+            return path
+    for path in CHROME_PATHS.get(platform.system(), []):
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError("Couldn't find Chrome. Set CHROME_BIN to its path.")
+
+
+class DevTools:
+    """
+    A connection to Chrome's DevTools protocol. Commands can be sent from any thread.
+    One reader thread hands each reply to the command that's waiting for it.
+    """
+
+    def __init__(self, url, timeout=30):
+        self.socket = websocket.create_connection(url, suppress_origin=True)
+        self.timeout = timeout
+        self.ids = itertools.count(1)
+        self.send_lock = threading.Lock()
+        # id -> {"done" (threading.Event), "reply"}
+        self.waiting = {}
+        self.closed = False
+        threading.Thread(target=self.read, daemon=True).start()
+
+    def read(self):
+        try:
+            while True:
+                message = json.loads(self.socket.recv())
+                # Events (no id) aren't used
+                waiter = self.waiting.pop(message.get("id"), None)
+                if waiter:
+                    waiter["reply"] = message
+                    waiter["done"].set()
+        except Exception:
+            pass
+        self.closed = True
+        for waiter in list(self.waiting.values()):
+            waiter["done"].set()
+
+    def send(self, method, session=None, **params):
+        if self.closed:
+            raise ConnectionError("The connection to Chrome is closed.")
+        id = next(self.ids)
+        waiter = {"done": threading.Event(), "reply": None}
+        self.waiting[id] = waiter
+        message = {"id": id, "method": method, "params": params}
+        if session:
+            message["sessionId"] = session
+        with self.send_lock:
+            self.socket.send(json.dumps(message))
+
+        if not waiter["done"].wait(self.timeout):
+            self.waiting.pop(id, None)
+            raise TimeoutError(f"Chrome didn't answer {method}.")
+        reply = waiter["reply"]
+        if reply is None:
+            raise ConnectionError(f"Chrome closed the connection during {method}.")
+        if "error" in reply:
+            raise RuntimeError(f"{method}: {reply['error'].get('message')}")
+        return reply["result"]
+
+    def close(self):
+        self.closed = True
+        try:
+            self.socket.close()
+        except Exception:
+            pass
+
+
+class HtmlRenderer:
+    """
+    Screenshots HTML with one headless Chrome that stays open between renders, instead of launching
+    Chrome (and writing the PNG to disk, then reading it back) for every one.
+
+    Chrome starts on the first render, or on `start()`. Its pages (tabs) are pooled: a render takes
+    a free one (or opens one, up to `pages`), resets it to about:blank, writes the HTML into it,
+    waits for it to load and gets the PNG from Chrome as base64. Renders on different threads use
+    different pages. If Chrome dies, the next render starts a new one.
+    """
+
+    def __init__(self, width=960, height=540, pages=2, load_timeout=10):
+        self.width = width
+        self.height = height
+        self.max_pages = pages
+        # Seconds to wait for a page's scripts and images before taking the screenshot anyway
+        self.load_timeout = load_timeout
+
+        self.lock = threading.Lock()
+        self.page_returned = threading.Condition(self.lock)
+        self.process = None
+        self.devtools = None
+        self.profile_dir = None
+        self.free_pages = []
+        self.open_pages = 0
+        self._quit_at_exit = False
+
+        self.stats = {
+            "starts": 0,
+            "start_seconds": None,
+            "renders": 0,
+            "render_seconds": None,
+        }
+
+    def start(self):
+        """
+        Starts Chrome now, so the first render doesn't wait for it.
+        """
+        with self.lock:
+            self.browser()
+
+    def browser(self):
+        """
+        The DevTools connection, starting Chrome if it isn't running. Call with the lock held.
+        """
+        if (
+            self.devtools is not None
+            and not self.devtools.closed
+            and self.process.poll() is None
+        ):
+            return self.devtools
+        self._quit()
+
+        start = time.perf_counter()
+        executable = find_chrome()
+        self.profile_dir = tempfile.mkdtemp(prefix="open-interpreter-chrome-")
+        command = [
+            executable,
+            "--headless=new",
+            "--remote-debugging-port=0",
+            f"--user-data-dir={self.profile_dir}",
+            # Like html2image: transparent where the page doesn't paint, and no scrollbars
+            "--default-background-color=00000000",
+            "--hide-scrollbars",
+            "--no-first-run",
+            "--no-default-browser-check",
+        ]
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            # Chrome won't run as root with its sandbox on (like in most containers)
+            command.append("--no-sandbox")
+        command.append("about:blank")
+        self.process = subprocess.Popen(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        # Chrome writes the port it picked, and the browser's path, here once it's listening
+        port_file = os.path.join(self.profile_dir, "DevToolsActivePort")
+        deadline = time.time() + 30
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(
+                    f"Chrome exited with code {self.process.returncode} while starting."
+                )
+            if time.time() > deadline:
+                self._quit()
+                raise TimeoutError("Chrome took too long to start.")
+            try:
+                with open(port_file) as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    break
+            except FileNotFoundError:
+                pass
+            time.sleep(0.02)
+
+        self.devtools = DevTools(f"ws://127.0.0.1:{lines[0]}{lines[1]}")
+        if not self._quit_at_exit:
+            self._quit_at_exit = True
+            atexit.register(self.quit)
+        self.stats["starts"] += 1
+        self.stats["start_seconds"] = time.perf_counter() - start
+        return self.devtools
+
+    def take_page(self):
+        with self.lock:
+            devtools = self.browser()
+            while not self.free_pages and self.open_pages >= self.max_pages:
+                self.page_returned.wait()
+                devtools = self.browser()
+            if self.free_pages:
+                return self.free_pages.pop()
+            self.open_pages += 1
+
+        try:
+            target = devtools.send("Target.createTarget", url="about:blank")
+            session = devtools.send(
+                "Target.attachToTarget", targetId=target["targetId"], flatten=True
+            )["sessionId"]
+            devtools.send(
+                "Emulation.setDeviceMetricsOverride",
+                session,
+                width=self.width,
+                height=self.height,
+                deviceScaleFactor=1,
+                mobile=False,
+            )
+            devtools.send(
+                "Emulation.setDefaultBackgroundColorOverride",
+                session,
+                color={"r": 0, "g": 0, "b": 0, "a": 0},
+            )
+        except Exception:
+            self.give_back({"devtools": devtools}, keep=False)
+            raise
+        return {
+            "devtools": devtools,
+            "session": session,
+            "target": target["targetId"],
+        }
+
+    def give_back(self, page, keep=True):
+        with self.lock:
+            # Pages of a Chrome that has since been replaced aren't counted anymore
+            if page["devtools"] is self.devtools:
+                if keep:
+                    self.free_pages.append(page)
+                else:
+                    self.open_pages -= 1
+            self.page_returned.notify()
+
+        if not keep and "target" in page and not page["devtools"].closed:
+            try:
+                page["devtools"].send("Target.closeTarget", targetId=page["target"])
+            except Exception:
+                pass
+
+    def capture(self, page, html):
+        devtools, session = page["devtools"], page["session"]
+        # A new document, so nothing (like the last page's globals) carries over
+        devtools.send("Page.navigate", session, url="about:blank")
+        frame = devtools.send("Page.getFrameTree", session)["frameTree"]["frame"]
+        devtools.send(
+            "Page.setDocumentContent", session, frameId=frame["id"], html=html
+        )
+        devtools.send(
+            "Runtime.evaluate",
+            session,
+            expression=WAIT_FOR_LOAD % (self.load_timeout * 1000),
+            awaitPromise=True,
+        )
+        return devtools.send("Page.captureScreenshot", session, format="png")["data"]
+
+    def screenshot_base64(self, html):
+        """
+        A PNG of `html`, `width` by `height`, as base64.
+        """
+        start = time.perf_counter()
+        for attempt in range(2):
+            page = self.take_page()
+            try:
+                screenshot = self.capture(page, html)
+            except Exception:
+                self.give_back(page, keep=False)
+                if attempt == 0 and page["devtools"].closed:
+                    # Chrome went away. Try again with a new one
+                    continue
+                raise
+            self.give_back(page)
+            break
+
+        self.stats["renders"] += 1
+        self.stats["render_seconds"] = time.perf_counter() - start
+        return screenshot
+
+    def quit(self):
+        with self.lock:
+            self._quit()
+
+    def _quit(self):
+        if self.devtools is not None:
+            self.devtools.close()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.profile_dir is not None:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+        self.process = None
+        self.devtools = None
+        self.profile_dir = None
+        self.free_pages = []
+        self.open_pages = 0
+        self.page_returned.notify_all()
+
+
+# Shared by the HTML and React languages
+renderer = HtmlRenderer()
@@ -3,16 +3,24 @@ import os
 import random
 import string
 
-from html2image import Html2Image
-
 from ....core.utils.lazy_import import lazy_import
 
 html2image = lazy_import("html2image")
 
 from ....terminal_interface.utils.local_storage_path import get_storage_path
+from .html_renderer import renderer
 
 
 def html_to_png_base64(code):
+    try:
+        # One Chrome, kept open between renders
+        return renderer.screenshot_base64(code)
+    except Exception:
+        # We couldn't start or drive Chrome. html2image launches it its own way, once per render
+        return html2image_png_base64(code)
+
+
+def html2image_png_base64(code):
     # Convert the HTML into an image using html2image
     hti = html2image.Html2Image()
 
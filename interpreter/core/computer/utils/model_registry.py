@@ -0,0 +1,158 @@
+import gc
+import sys
+import threading
+import time
+
+from ...utils.lazy_import import lazy_import
+
+psutil = lazy_import("psutil")
+
+NOT_LOADED = object()
+
+
+def resident_memory():
+    """
+    This process's resident memory in bytes, or None if we can't tell.
+    """
+    try:
+        return psutil.Process().memory_info().rss
+    except:
+        return None
+
+
+class ModelRegistry:
+    """
+    Loads models the first time they're used, instead of when their module is imported.
+
+    Register a loader with `register(name, loader)`, then `get(name)` it. Models that aren't used
+    for `idle_timeout` seconds are unloaded (and loaded again if they're needed later). `warmup()`
+    loads them in a background thread, so the first real use doesn't wait.
+    """
+
+    def __init__(self, idle_timeout=600):
+        # None to keep models loaded for as long as the process runs
+        self.idle_timeout = idle_timeout
+        self.loaders = {}
+        self.models = {}
+        self.info = {}
+        self.lock = threading.Lock()
+        self._load_locks = {}
+        self._reaper = None
+
+    def register(self, name, loader):
+        with self.lock:
+            self.loaders[name] = loader
+            self._load_locks[name] = threading.Lock()
+            self.info[name] = {
+                "loaded": False,
+                "loads": 0,
+                "load_time": None,
+                "memory": None,
+                "last_used": None,
+                "error": None,
+            }
+
+    def get(self, name):
+        with self.lock:
+            model = self.models.get(name, NOT_LOADED)
+        if model is NOT_LOADED:
+            # One load at a time per model, so warmup and a real call don't both load it
+            with self._load_locks[name]:
+                # The reaper may have unloaded it since we looked, or another call loaded it
+                with self.lock:
+                    model = self.models.get(name, NOT_LOADED)
+                if model is NOT_LOADED:
+                    model = self._load(name)
+        self.info[name]["last_used"] = time.time()
+        return model
+
+    def _load(self, name):
+        info = self.info[name]
+        memory_before = resident_memory()
+        start = time.perf_counter()
+        try:
+            model = self.loaders[name]()
+        except Exception as e:
+            info["error"] = repr(e)
+            raise
+        info["load_time"] = time.perf_counter() - start
+        memory_after = resident_memory()
+        if memory_before is not None and memory_after is not None:
+            info["memory"] = max(memory_after - memory_before, 0)
+        info["loads"] += 1
+        info["loaded"] = True
+        info["error"] = None
+
+        with self.lock:
+            self.models[name] = model
+            info["last_used"] = time.time()
+            self._start_reaper()
+        return model
+
+    def unload(self, name):
+        with self._load_locks[name]:
+            with self.lock:
+                model = self.models.pop(name, None)
+            self.info[name]["loaded"] = False
+        if model is None:
+            return False
+
+        del model
+        gc.collect()
+        # Give back GPU memory too, if torch is the one holding it
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return True
+
+    def unload_idle(self):
+        """
+        Unloads every model that hasn't been used for `idle_timeout` seconds. Returns their names.
+        """
+        if self.idle_timeout is None:
+            return []
+        now = time.time()
+        idle = [
+            name
+            for name in list(self.models)
+            if now - self.info[name]["last_used"] > self.idle_timeout
+        ]
+        return [name for name in idle if self.unload(name)]
+
+    def _start_reaper(self):
+        if self.idle_timeout is None or self._reaper is not None:
+            return
+
+        def reap():
+            while True:
+                time.sleep(min(max(self.idle_timeout / 2, 1), 60))
+                self.unload_idle()
+
+        self._reaper = threading.Thread(target=reap, daemon=True)
+        self._reaper.start()
+
+    def warmup(self, names=None):
+        """
+        Loads models (all of them by default) in a background thread. Errors end up in `stats()`.
+        """
+
+        def load():
+            for name in names or list(self.loaders):
+                try:
+                    self.get(name)
+                except Exception:
+                    pass
+
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        now = time.time()
+        models = {}
+        for name, info in self.info.items():
+            models[name] = dict(info)
+            models[name]["idle"] = (
+                now - info["last_used"] if info["last_used"] is not None else None
+            )
+        return {"resident_memory": resident_memory(), "models": models}
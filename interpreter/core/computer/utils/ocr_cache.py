@@ -0,0 +1,182 @@
+import hashlib
+import threading
+from collections import deque
+
+from ...utils.lazy_import import lazy_import
+from ...utils.lru_cache import LRUCache
+from .frame_diff import changed_box, changed_tiles
+
+np = lazy_import("numpy")
+
+
+def image_hash(img):
+    """
+    Exact fingerprint of an image's pixels. Hashing is much faster than OCR, even for a 4K screenshot.
+    """
+    digest = hashlib.blake2b(img.tobytes(), digest_size=16).hexdigest()
+    return f"{img.mode}:{img.size[0]}x{img.size[1]}:{digest}"
+
+
+def copy_data(data):
+    return {key: list(values) for key, values in data.items()}
+
+
+class OcrCache:
+    """
+    OCR results by screenshot, so everything that looks for text on the same pixels shares one OCR pass.
+
+    Results are word/box data in pytesseract's `image_to_data` layout (a dict of equal-length lists,
+    with at least text, left, top, width and height). Identical images hit the cache by hash.
+    An image that differs from a recent one of the same size is compared on a downscaled grid,
+    and only the region that changed is OCR'd again and merged in.
+
+    Nothing here needs the text, so any detector that returns boxes in this layout can be cached
+    the same way (point.py does this for icon boxes).
+    """
+
+    def __init__(
+        self, max_entries=16, scale=4, tile_size=8, threshold=8, max_changed=0.5
+    ):
+        self.results = LRUCache(max_entries)
+        # Downscaled copies of recent images, to diff new ones against
+        self.recent = deque(maxlen=max_entries)
+        # Downscale factor, and tile size in downscaled pixels
+        self.scale = scale
+        self.tile_size = tile_size
+        # How much a tile's pixels have to change (0-255) to count
+        self.threshold = threshold
+        # Past this fraction of the screen, OCR everything again
+        self.max_changed = max_changed
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "partial": 0, "misses": 0}
+
+    def thumbnail(self, img):
+        return np.asarray(img.convert("L").reduce(self.scale), dtype=np.int16)
+
+    def changed_region(self, before, after):
+        """
+        The box (left, top, right, bottom), in full size pixels, around every tile that changed.
+        None if nothing visibly changed.
+        """
+        height, width = after.shape
+        changed = changed_tiles(before, after, self.tile_size, self.threshold)
+        # One tile of margin, so words cut by the edge of the change are read whole
+        return changed_box(
+            changed,
+            self.tile_size * self.scale,
+            width * self.scale,
+            height * self.scale,
+        )
+
+    def merge(self, data, region, region_data):
+        """
+        Swaps the words inside `region` for the words found by OCR-ing just that region.
+        """
+        left, top, right, bottom = region
+        merged = {key: [] for key in data}
+
+        for i in range(len(data["left"])):
+            inside = (
+                data["left"][i] < right
+                and data["left"][i] + data["width"][i] > left
+                and data["top"][i] < bottom
+                and data["top"][i] + data["height"][i] > top
+            )
+            if not inside:
+                for key in data:
+                    merged[key].append(data[key][i])
+
+        # Keep the new region's blocks separate from the old ones
+        block_offset = max(data.get("block_num") or [0]) + 1
+        for i in range(len(region_data["left"])):
+            for key in merged:
+                value = region_data[key][i]
+                if key == "left":
+                    value += left
+                elif key == "top":
+                    value += top
+                elif key == "block_num":
+                    value += block_offset
+                merged[key].append(value)
+
+        return self.reading_order(merged)
+
+    def reading_order(self, data):
+        """
+        Sorts the rows top to bottom, then left to right, a line at a time (words stay with their line),
+        so the region's words end up where a full OCR would have them instead of at the end.
+        """
+        count = len(data["left"])
+        if all(key in data for key in ("block_num", "par_num", "line_num")):
+            line_of = [
+                (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+                for i in range(count)
+            ]
+        else:
+            line_of = list(range(count))
+
+        # Where each line starts
+        starts = {}
+        for i in range(count):
+            start = (data["top"][i], data["left"][i])
+            starts[line_of[i]] = min(starts.get(line_of[i], start), start)
+
+        order = sorted(
+            range(count),
+            key=lambda i: (starts[line_of[i]], line_of[i], data["left"][i]),
+        )
+        return {key: [values[i] for i in order] for key, values in data.items()}
+
+    def get(self, img, engine, ocr, key=None):
+        """
+        Returns `ocr(img)` for this image, running as little OCR as possible.
+        `engine` names the OCR, since results from different engines can't be mixed.
+        Pass `key` if you already have the image's image_hash.
+        """
+        key = (engine, key or image_hash(img))
+        data = self.results.get(key)
+        if data is not None:
+            self.stats["hits"] += 1
+            return copy_data(data)
+
+        thumbnail = self.thumbnail(img)
+
+        # Find the most similar recent image of the same size
+        best = None
+        with self.lock:
+            candidates = list(self.recent)
+        for recent_engine, recent_key, recent_thumbnail in candidates:
+            if recent_engine != engine or recent_thumbnail.shape != thumbnail.shape:
+                continue
+            recent_data = self.results.get(recent_key)
+            if recent_data is None:
+                continue
+            region = self.changed_region(recent_thumbnail, thumbnail)
+            area = (
+                0
+                if region is None
+                else (region[2] - region[0]) * (region[3] - region[1])
+            )
+            if best is None or area < best[0]:
+                best = (area, region, recent_data)
+
+        if best is not None and best[0] <= self.max_changed * img.size[0] * img.size[1]:
+            _, region, recent_data = best
+            if region is None:
+                data = recent_data
+            else:
+                data = self.merge(recent_data, region, ocr(img.crop(region)))
+            self.stats["partial"] += 1
+        else:
+            data = ocr(img)
+            self.stats["misses"] += 1
+
+        self.results.set(key, data)
+        with self.lock:
+            self.recent.append((engine, key, thumbnail))
+        return copy_data(data)
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.recent.clear()
@@ -0,0 +1,168 @@
+import difflib
+import re
+
+from ...utils.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+
+def normalize(word):
+    """
+    Lowercase, with punctuation removed, so "Submit," matches "submit".
+    """
+    return "".join(character for character in word.lower() if character.isalnum())
+
+
+class TextLayout:
+    """
+    One OCR result (pytesseract's image_to_data layout), indexed for searching.
+
+    Box geometry is kept as NumPy columns, every box's lowercased text is joined into one string
+    so a substring search is a single regex pass, and normalized words map to their boxes in an
+    inverted index for phrase and fuzzy search. Build it once per OCR result, then search it as often as you like.
+    """
+
+    def __init__(self, data):
+        self.texts = list(data["text"])
+        self.lowered = [text.lower() for text in self.texts]
+        self.tokens = np.array([normalize(text) for text in self.texts], dtype=object)
+
+        self.left = np.asarray(data["left"], dtype=np.int64)
+        self.top = np.asarray(data["top"], dtype=np.int64)
+        self.width = np.asarray(data["width"], dtype=np.int64)
+        self.height = np.asarray(data["height"], dtype=np.int64)
+        self.lengths = np.array([len(text) for text in self.texts], dtype=np.int64)
+
+        # Which line each box is on. Without line numbers, every box is its own line
+        if "line_num" in data:
+            line_keys = list(zip(data["block_num"], data["par_num"], data["line_num"]))
+        else:
+            line_keys = list(range(len(self.texts)))
+        line_ids = {}
+        self.line = np.array(
+            [line_ids.setdefault(key, len(line_ids)) for key in line_keys],
+            dtype=np.int64,
+        )
+
+        # "\0" can't be in a query, so a match never spans two boxes
+        self.joined = "\0".join(self.lowered)
+        self.starts = np.zeros(len(self.texts), dtype=np.int64)
+        if len(self.texts) > 1:
+            self.starts[1:] = np.cumsum(self.lengths[:-1] + 1)
+
+        self.index = {}
+        for i, token in enumerate(self.tokens):
+            if token:
+                self.index.setdefault(token, []).append(i)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def centers(self, indices=None):
+        if indices is None:
+            indices = slice(None)
+        return np.stack(
+            [
+                self.left[indices] + self.width[indices] / 2,
+                self.top[indices] + self.height[indices] / 2,
+            ],
+            axis=-1,
+        ).reshape(-1, 2)
+
+    def find_substring(self, text):
+        """
+        Boxes whose text contains `text` (case-insensitive), and where in each box it starts.
+        """
+        text = text.lower()
+        if not text or "\0" in text or not len(self):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+
+        positions = np.array(
+            [match.start() for match in re.finditer(re.escape(text), self.joined)],
+            dtype=np.int64,
+        )
+        if not len(positions):
+            return positions, positions
+
+        boxes = np.searchsorted(self.starts, positions, side="right") - 1
+        # Only the first match in each box
+        boxes, first = np.unique(boxes, return_index=True)
+        return boxes, positions[first] - self.starts[boxes]
+
+    def match_boxes(self, text):
+        """
+        (left, top, width, height) of each match, narrowed from the whole box to the matching part.
+        """
+        boxes, offsets = self.find_substring(text)
+        lengths = self.lengths[boxes]
+        left = self.left[boxes] + (self.width[boxes] * offsets / lengths).astype(
+            np.int64
+        )
+        width = (self.width[boxes] * len(text) / lengths).astype(np.int64)
+        return left, self.top[boxes], width, self.height[boxes]
+
+    def find_phrase(self, options):
+        """
+        Runs of adjacent words on one line where the nth word is one of `options[n]` (a set of tokens).
+        Returns the index of each run's first word.
+        """
+        first = set(options[0])
+        starts = np.array(
+            sorted(i for token in first for i in self.index.get(token, [])),
+            dtype=np.int64,
+        )
+        for offset, allowed in enumerate(options[1:], 1):
+            following = starts + offset
+            starts = starts[following < len(self)]
+            following = following[following < len(self)]
+            keep = (self.line[following] == self.line[starts]) & np.isin(
+                self.tokens[following], list(allowed)
+            )
+            starts = starts[keep]
+        return starts
+
+    def phrase_boxes(self, starts, count):
+        """
+        (left, top, width, height) around each run of `count` words.
+        """
+        runs = starts[:, None] + np.arange(count)
+        left = self.left[runs].min(axis=1)
+        top = self.top[runs].min(axis=1)
+        right = (self.left[runs] + self.width[runs]).max(axis=1)
+        bottom = (self.top[runs] + self.height[runs]).max(axis=1)
+        return left, top, right - left, bottom - top
+
+    def find_text(self, text, fuzzy=0.8):
+        """
+        (left, top, width, height) for every place `text` appears. Tries, in order:
+        the text inside a single box, the words of a phrase on adjacent boxes,
+        and then (unless fuzzy is None) words within `fuzzy` similarity of each query word.
+        """
+        left, top, width, height = self.match_boxes(text)
+        if len(left):
+            return left, top, width, height
+
+        tokens = [
+            token for token in (normalize(word) for word in text.split()) if token
+        ]
+        if not tokens:
+            return left, top, width, height
+
+        if len(tokens) > 1:
+            starts = self.find_phrase([{token} for token in tokens])
+            if len(starts):
+                return self.phrase_boxes(starts, len(tokens))
+
+        if fuzzy is not None:
+            vocabulary = list(self.index)
+            options = [
+                set(difflib.get_close_matches(token, vocabulary, n=5, cutoff=fuzzy))
+                for token in tokens
+            ]
+            if all(options):
+                starts = self.find_phrase(options)
+                if len(starts):
+                    return self.phrase_boxes(starts, len(tokens))
+
+        return left, top, width, height
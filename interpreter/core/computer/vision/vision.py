@@ -1,13 +1,18 @@
 import base64
 import contextlib
+import hashlib
 import io
 import os
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 from PIL import Image
 
 from ...utils.lazy_import import lazy_import
-from ..utils.computer_vision import pytesseract_get_text
+from ...utils.lru_cache import LRUCache
+from ..utils.computer_vision import ocr_cache
+from ..utils.ocr_cache import image_hash
+
+np = lazy_import("numpy")
 
 # transformers = lazy_import("transformers") # Doesn't work for some reason! We import it later.
 
@@ -19,6 +24,9 @@ class Vision:
         self.tokenizer = None  # Will load upon first use
         self.easyocr = None
 
+        # (query, image hash) -> (description, OCR'd text)
+        self.descriptions = LRUCache(256)
+
     def load(self, load_moondream=True, load_easyocr=True):
         # print("Loading vision models (Moondream, EasyOCR)...\n")
 
@@ -67,51 +75,12 @@ class Vision:
         Gets OCR of image.
         """
 
-        if lmc:
-            if "base64" in lmc["format"]:
-                # # Extract the extension from the format, default to 'png' if not specified
-                # if "." in lmc["format"]:
-                #     extension = lmc["format"].split(".")[-1]
-                # else:
-                #     extension = "png"
-                # Save the base64 content as a temporary file
-                img_data = base64.b64decode(lmc["content"])
-                with tempfile.NamedTemporaryFile(
-                    delete=False, suffix=".png"
-                ) as temp_file:
-                    temp_file.write(img_data)
-                    temp_file_path = temp_file.name
-
-                # Set path to the path of the temporary file
-                path = temp_file_path
-
-            elif lmc["format"] == "path":
-                # Convert to base64
-                path = lmc["content"]
-        elif base_64:
-            # Save the base64 content as a temporary file
-            img_data = base64.b64decode(base_64)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                temp_file.write(img_data)
-                temp_file_path = temp_file.name
-
-            # Set path to the path of the temporary file
-            path = temp_file_path
-        elif path:
-            pass
-        elif pil_image:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                pil_image.save(temp_file, format="PNG")
-                temp_file_path = temp_file.name
-
-            # Set path to the path of the temporary file
-            path = temp_file_path
-
         try:
-            if not self.easyocr:
-                self.load(load_moondream=False)
-            result = self.easyocr.readtext(path)
-            text = " ".join([item[1] for item in result])
+            img = self.load_image(base_64, path, lmc, pil_image)
+
+            # Cached by the image's pixels, so OCR-ing the same image again is free
+            data = ocr_cache.get(img, "easyocr", self.easyocr_data)
+            text = " ".join(data["text"])
             return text.strip()
         except ImportError:
             print(
@@ -119,6 +88,32 @@ class Vision:
             )
             return ""
 
+    def easyocr_data(self, img):
+        """
+        EasyOCR's words and boxes, in the same layout as pytesseract's image_to_data.
+        """
+        if not self.easyocr:
+            self.load(load_moondream=False)
+
+        data = {
+            "text": [],
+            "left": [],
+            "top": [],
+            "width": [],
+            "height": [],
+            "conf": [],
+        }
+        for box, text, conf in self.easyocr.readtext(np.array(img.convert("RGB"))):
+            xs = [int(point[0]) for point in box]
+            ys = [int(point[1]) for point in box]
+            data["text"].append(text)
+            data["left"].append(min(xs))
+            data["top"].append(min(ys))
+            data["width"].append(max(xs) - min(xs))
+            data["height"].append(max(ys) - min(ys))
+            data["conf"].append(float(conf))
+        return data
+
     def query(
         self,
         query="Describe this image. Also tell me what text is in the image, if any.",
@@ -142,29 +137,7 @@ class Vision:
             if not success:
                 return ""
 
-        if lmc:
-            if "base64" in lmc["format"]:
-                # # Extract the extension from the format, default to 'png' if not specified
-                # if "." in lmc["format"]:
-                #     extension = lmc["format"].split(".")[-1]
-                # else:
-                #     extension = "png"
-
-                # Decode the base64 image
-                img_data = base64.b64decode(lmc["content"])
-                img = Image.open(io.BytesIO(img_data))
-
-            elif lmc["format"] == "path":
-                # Convert to base64
-                image_path = lmc["content"]
-                img = Image.open(image_path)
-        elif base_64:
-            img_data = base64.b64decode(base_64)
-            img = Image.open(io.BytesIO(img_data))
-        elif path:
-            img = Image.open(path)
-        elif pil_image:
-            img = pil_image
+        img = self.load_image(base_64, path, lmc, pil_image)
 
         with contextlib.redirect_stdout(open(os.devnull, "w")):
             enc_image = self.model.encode_image(img)
@@ -173,3 +146,78 @@ class Vision:
             )
 
         return answer
+
+    def describe(
+        self,
+        query="Describe this image. Also tell me what text is in the image, if any.",
+        base_64=None,
+        path=None,
+        lmc=None,
+        pil_image=None,
+    ):
+        """
+        Returns (Moondream's answer to query, OCR'd text) for an image. The image is decoded once,
+        and both run at the same time. Results are remembered per image, so describing an image
+        we've seen before (like when the conversation is replayed to the LLM) costs nothing.
+        """
+        key = (query, self.image_key(base_64, path, lmc, pil_image))
+        result = self.descriptions.get(key)
+        if result is not None:
+            return result
+
+        img = self.load_image(base_64, path, lmc, pil_image)
+
+        try:
+            # Load both models first. Loading silences stdout, which isn't safe to do from two threads at once
+            self.load()
+        except ImportError:
+            # One of them is missing. query and ocr each handle that on their own, one after the other
+            return self.query(query, pil_image=img), self.ocr(pil_image=img)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            description = executor.submit(self.query, query, pil_image=img)
+            text = executor.submit(self.ocr, pil_image=img)
+            result = (description.result(), text.result())
+
+        self.descriptions.set(key, result)
+        return result
+
+    def load_image(self, base_64=None, path=None, lmc=None, pil_image=None):
+        """
+        Decodes an image (a base64, path, lmc message or PIL image) in memory. No temporary files.
+        """
+        if lmc:
+            if "base64" in lmc["format"]:
+                base_64 = lmc["content"]
+            elif lmc["format"] == "path":
+                path = lmc["content"]
+
+        if base_64:
+            img = Image.open(io.BytesIO(base64.b64decode(base_64)))
+        elif path:
+            img = Image.open(path)
+        elif pil_image is not None:
+            img = pil_image
+        else:
+            raise ValueError("No image was given.")
+
+        # Decode now, so threads sharing the image don't race to do it
+        img.load()
+        return img
+
+    def image_key(self, base_64=None, path=None, lmc=None, pil_image=None):
+        """
+        A hash of the image's bytes, computed without decoding it.
+        """
+        if lmc:
+            if "base64" in lmc["format"]:
+                base_64 = lmc["content"]
+            elif lmc["format"] == "path":
+                path = lmc["content"]
+
+        if base_64:
+            return hashlib.sha256(base_64.encode()).hexdigest()
+        if path:
+            with open(path, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        return image_hash(pil_image)
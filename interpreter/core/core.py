@@ -2,23 +2,22 @@
 This file defines the Interpreter class.
 It's the main file. `from interpreter import interpreter` will import an instance of this class.
 """
-import json
 import os
 import threading
 import time
 from datetime import datetime
 
-from ..terminal_interface.local_setup import local_setup
-from ..terminal_interface.terminal_interface import terminal_interface
-from ..terminal_interface.utils.display_markdown_message import display_markdown_message
 from ..terminal_interface.utils.local_storage_path import get_storage_path
 from ..terminal_interface.utils.oi_dir import oi_dir
 from .computer.computer import Computer
 from .default_system_message import default_system_message
 from .llm.llm import Llm
+from .render_message import RenderCache
 from .respond import respond
+from .utils.conversation_index import open_index
+from .utils.conversation_journal import ConversationJournal
+from .utils.message_store import MessageStore
 from .utils.telemetry import send_telemetry
-from .utils.truncate_output import truncate_output
 
 
 class OpenInterpreter:
@@ -82,9 +81,12 @@ class OpenInterpreter:
         plain_text_display=False,
     ):
         # State
+        self._message_store = MessageStore()
         self.messages = [] if messages is None else messages
         self.responding = False
         self.last_messages_count = 0
+        # Output of {{ }} blocks in the system message
+        self.render_cache = RenderCache()
 
         # Settings
         self.offline = offline
@@ -110,6 +112,7 @@ class OpenInterpreter:
         self.conversation_history = conversation_history
         self.conversation_filename = conversation_filename
         self.conversation_history_path = conversation_history_path
+        self._journal = None
 
         # OS control mode related attributes
         self.os = os
@@ -138,10 +141,23 @@ class OpenInterpreter:
         self.empty_code_output_template = empty_code_output_template
         self.code_output_sender = code_output_sender
 
+    @property
+    def messages(self):
+        # Streamed content is buffered while we respond. Anyone reading messages gets it written back first.
+        self._message_store.flush()
+        return self._messages
+
+    @messages.setter
+    def messages(self, value):
+        self._message_store.flush()
+        self._messages = value
+
     def local_setup(self):
         """
         Opens a wizard that lets terminal users pick a local model.
         """
+        from ..terminal_interface.local_setup import local_setup
+
         self = local_setup(self)
 
     def wait(self):
@@ -220,6 +236,9 @@ class OpenInterpreter:
         # wraps the vanilla .chat(display=False) generator in a display.
         # Quite different from the plain generator stuff. So redirect to that
         if display:
+            # Imported here, so using OI as a library doesn't load the terminal UI
+            from ..terminal_interface.terminal_interface import terminal_interface
+
             yield from terminal_interface(self, message)
             return
 
@@ -274,20 +293,41 @@ class OpenInterpreter:
 
                     date = datetime.now().strftime("%B_%d_%Y_%H-%M-%S")
                     self.conversation_filename = (
-                        "__".join([first_few_words, date]) + ".json"
+                        "__".join([first_few_words, date]) + ".jsonl"
                     )
 
                 # Check if the directory exists, if not, create it
                 if not os.path.exists(self.conversation_history_path):
                     os.makedirs(self.conversation_history_path)
-                # Write or overwrite the file
-                with open(
-                    os.path.join(
+
+                # Conversations used to be saved as one .json file. Resumed ones carry on as a journal
+                old_path = None
+                if self.conversation_filename.endswith(".json"):
+                    old_path = os.path.join(
                         self.conversation_history_path, self.conversation_filename
-                    ),
-                    "w",
-                ) as f:
-                    json.dump(self.messages, f)
+                    )
+                    self.conversation_filename += "l"
+
+                # Append what's new, instead of rewriting the whole conversation
+                path = os.path.join(
+                    self.conversation_history_path, self.conversation_filename
+                )
+                if self._journal is None or self._journal.path != path:
+                    self._journal = ConversationJournal(path)
+                if self._journal.save(self.messages):
+                    # Keep the conversation list and search up to date, for --conversations
+                    try:
+                        open_index(self.conversation_history_path).update(
+                            self.conversation_filename,
+                            self.messages,
+                            start=self._journal.kept,
+                            model=self.llm.model,
+                        )
+                    except Exception:
+                        pass  # The index catches up on its next sync
+
+                if old_path and os.path.exists(old_path):
+                    os.remove(old_path)
             return
 
         raise Exception(
@@ -312,6 +352,20 @@ class OpenInterpreter:
                 return True
             return False
 
+        def buffer_options(message):
+            """
+            How a message's content is buffered. Console output only keeps its (truncated) tail.
+            """
+            if message.get("type") == "console" and message.get("format") == "output":
+                return {
+                    "max_output_chars": self.max_output,
+                    "add_scrollbars": self.computer.import_computer_api,  # I consider scrollbars to be a computer API thing
+                }
+            return {}
+
+        def open_message(message):
+            self._message_store.open(message, **buffer_options(message))
+
         last_flag_base = None
 
         try:
@@ -382,17 +436,22 @@ class OpenInterpreter:
                     if not is_ephemeral(chunk):
                         if any(
                             [
-                                (property in self.messages[-1])
+                                (property in self._messages[-1])
                                 and (
-                                    self.messages[-1].get(property)
+                                    self._messages[-1].get(property)
                                     != chunk.get(property)
                                 )
                                 for property in ["role", "type", "format"]
                             ]
                         ):
-                            self.messages.append(chunk)
+                            self._messages.append(chunk)
+                            open_message(chunk)
                         else:
-                            self.messages[-1]["content"] += chunk["content"]
+                            # Buffered, not concatenated. It's written back lazily (see the `messages` property)
+                            message = self._messages[-1]
+                            self._message_store.append_to(
+                                message, chunk["content"], **buffer_options(message)
+                            )
                 else:
                     # If they don't match, yield a end message for the last message type and a start message for the new one
                     if last_flag_base:
@@ -408,28 +467,25 @@ class OpenInterpreter:
 
                     # Add the chunk as a new message
                     if not is_ephemeral(chunk):
-                        self.messages.append(chunk)
+                        self._messages.append(chunk)
+                        open_message(chunk)
 
                 # Yield the chunk itself
                 yield chunk
 
-                # Truncate output if it's console output
-                if chunk["type"] == "console" and chunk["format"] == "output":
-                    self.messages[-1]["content"] = truncate_output(
-                        self.messages[-1]["content"],
-                        self.max_output,
-                        add_scrollbars=self.computer.import_computer_api,  # I consider scrollbars to be a computer API thing
-                    )
-
             # Yield a final end flag
             if last_flag_base:
                 yield {**last_flag_base, "end": True}
         except GeneratorExit:
             raise  # gotta pass this up!
+        finally:
+            self._message_store.flush()
 
     def reset(self):
-        self.computer.terminate()  # Terminates all languages
+        # Terminates all languages. Spares are kept, so the next run starts right away
+        self.computer.terminal.terminate(keep_warm=True)
         self.computer._has_imported_computer_api = False  # Flag reset
+        self.render_cache.clear()  # Fresh kernel, fresh renders
         self.messages = []
         self.last_messages_count = 0
 
@@ -438,6 +494,10 @@ class OpenInterpreter:
         if self.plain_text_display:
             print(markdown)
         else:
+            from ..terminal_interface.utils.display_markdown_message import (
+                display_markdown_message,
+            )
+
             display_markdown_message(markdown)
 
     def get_oi_dir(self):
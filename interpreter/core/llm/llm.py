@@ -3,25 +3,28 @@ import os
 os.environ["LITELLM_LOCAL_MODEL_COST_MAP"] = "True"
 import sys
 
-import litellm
+from ..utils.lazy_import import lazy_import
 
-litellm.suppress_debug_info = True
-litellm.REPEATED_STREAMING_CHUNK_LIMIT = 99999999
+# litellm (and requests) take seconds to import, so they're loaded the first time we call into them
+litellm = lazy_import("litellm", optional=False)
+requests = lazy_import("requests", optional=False)
 
 import json
 import logging
 import subprocess
+import threading
 import time
 import uuid
 
-import requests
-import tokentrim as tt
-
 from .run_text_llm import run_text_llm
 
 # from .run_function_calling_llm import run_function_calling_llm
 from .run_tool_calling_llm import run_tool_calling_llm
-from .utils.convert_to_openai_messages import convert_to_openai_messages
+from .utils.context_manager import ContextManager
+from .utils.convert_to_openai_messages import (
+    ConversionCache,
+    convert_to_openai_messages,
+)
 
 # Create or get the logger
 logger = logging.getLogger("LiteLLM")
@@ -56,7 +59,7 @@ class Llm:
 
         self.supports_vision = None  # Will try to auto-detect
         self.vision_renderer = (
-            self.interpreter.computer.vision.query
+            self.query_vision
         )  # Will only use if supports_vision is False
 
         self.supports_functions = None  # Will try to auto-detect
@@ -69,10 +72,28 @@ class Llm:
         self.api_key = None
         self.api_version = None
         self._is_loaded = False
+        # computer.ai calls resolve_model from many threads at once. Reentrant, since loading pings the model
+        self._resolve_lock = threading.RLock()
 
         # Budget manager powered by LiteLLM
         self.max_budget = None
 
+        # Converted messages from the last call, so we only convert what's new
+        self.conversion_cache = ConversionCache()
+
+        # Keeps messages inside the context window, counting only what's new each call
+        self.context_manager = ContextManager()
+
+        # Running totals, counted with the context manager's tokenizer
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0}
+
+    def query_vision(self, *args, **kwargs):
+        """
+        The default vision_renderer. Looks up computer.vision when it's called,
+        so creating an Llm doesn't import the vision stack.
+        """
+        return self.interpreter.computer.vision.query(*args, **kwargs)
+
     def run(self, messages):
         """
         We're responsible for formatting the call into the llm.completions object,
@@ -82,8 +103,9 @@ class Llm:
         And then processing its output, whether it's a function or non function calling model, into LMC format.
         """
 
-        if not self._is_loaded:
-            self.load()
+        configure_litellm()
+
+        model = self.resolve_model()
 
         if (
             self.max_tokens is not None
@@ -104,25 +126,6 @@ class Llm:
                 msg["role"] != "system"
             ), "No message after the first can have the role 'system'"
 
-        model = self.model
-        if model in [
-            "claude-3.5",
-            "claude-3-5",
-            "claude-3.5-sonnet",
-            "claude-3-5-sonnet",
-        ]:
-            model = "claude-3-5-sonnet-20240620"
-            self.model = "claude-3-5-sonnet-20240620"
-        # Setup our model endpoint
-        if model == "i":
-            model = "openai/i"
-            if not hasattr(self.interpreter, "conversation_id"):  # Only do this once
-                self.context_window = 7000
-                self.api_key = "x"
-                self.max_tokens = 1000
-                self.api_base = "https://api.openinterpreter.com/v0"
-                self.interpreter.conversation_id = str(uuid.uuid4())
-
         # Detect function support
         if self.supports_functions == None:
             try:
@@ -177,8 +180,13 @@ class Llm:
                         postcursor = ""
 
                     try:
-                        image_description = self.vision_renderer(lmc=img_msg)
-                        ocr = self.interpreter.computer.vision.ocr(lmc=img_msg)
+                        vision = self.interpreter.computer.vision
+                        if self.vision_renderer == self.query_vision:
+                            # Describes and OCRs the image at once, and remembers images it has seen
+                            image_description, ocr = vision.describe(lmc=img_msg)
+                        else:
+                            image_description = self.vision_renderer(lmc=img_msg)
+                            ocr = vision.ocr(lmc=img_msg)
 
                         # It would be nice to format this as a message to the user and display it like: "I see: image_description"
 
@@ -206,49 +214,39 @@ class Llm:
             vision=self.supports_vision,
             shrink_images=self.interpreter.shrink_images,
             interpreter=self.interpreter,
+            cache=self.conversion_cache,
         )
 
         system_message = messages[0]["content"]
         messages = messages[1:]
 
         # Trim messages
-        try:
-            if self.context_window and self.max_tokens:
-                trim_to_be_this_many_tokens = (
-                    self.context_window - self.max_tokens - 25
-                )  # arbitrary buffer
-                messages = tt.trim(
-                    messages,
-                    system_message=system_message,
-                    max_tokens=trim_to_be_this_many_tokens,
-                )
-            elif self.context_window and not self.max_tokens:
-                # Just trim to the context window if max_tokens not set
-                messages = tt.trim(
-                    messages,
-                    system_message=system_message,
-                    max_tokens=self.context_window,
-                )
-            else:
-                try:
-                    messages = tt.trim(
-                        messages, system_message=system_message, model=model
-                    )
-                except:
-                    if len(messages) == 1:
-                        if self.interpreter.in_terminal_interface:
-                            self.interpreter.display_message(
-                                """
+        from tokentrim.model_map import MODEL_MAX_TOKENS
+
+        if self.context_window and self.max_tokens:
+            trim_to_be_this_many_tokens = (
+                self.context_window - self.max_tokens - 25
+            )  # arbitrary buffer
+        elif self.context_window and not self.max_tokens:
+            # Just trim to the context window if max_tokens not set
+            trim_to_be_this_many_tokens = self.context_window
+        elif model in MODEL_MAX_TOKENS:
+            trim_to_be_this_many_tokens = int(MODEL_MAX_TOKENS[model] * 0.75)
+        else:
+            if len(messages) == 1:
+                if self.interpreter.in_terminal_interface:
+                    self.interpreter.display_message(
+                        """
 **We were unable to determine the context window of this model.** Defaulting to 8000.
 
 If your model can handle more, run `interpreter --context_window {token limit} --max_tokens {max tokens per response}`.
 
 Continuing...
-                            """
-                            )
-                        else:
-                            self.interpreter.display_message(
-                                """
+                    """
+                    )
+                else:
+                    self.interpreter.display_message(
+                        """
 **We were unable to determine the context window of this model.** Defaulting to 8000.
 
 If your model can handle more, run `self.context_window = {token limit}`.
@@ -256,20 +254,21 @@ If your model can handle more, run `self.context_window = {token limit}`.
 Also please set `self.max_tokens = {max tokens per response}`.
 
 Continuing...
-                            """
-                            )
-                    messages = tt.trim(
-                        messages, system_message=system_message, max_tokens=8000
+                    """
                     )
-        except:
-            # If we're trimming messages, this won't work.
-            # If we're trimming from a model we don't know, this won't work.
-            # Better not to fail until `messages` is too big, just for frustrations sake, I suppose.
+            trim_to_be_this_many_tokens = 8000
 
-            # Reunite system message with messages
-            messages = [{"role": "system", "content": system_message}] + messages
+        messages = self.context_manager.trim(
+            messages,
+            system_message=system_message,
+            max_tokens=trim_to_be_this_many_tokens,
+            model=model,
+        )
 
-            pass
+        if self.context_manager.last_trim["dropped"] and self.interpreter.verbose:
+            print(
+                f"Dropped {len(self.context_manager.last_trim['dropped'])} messages to fit in {trim_to_be_this_many_tokens} tokens."
+            )
 
         # If there should be a system message, there should be a system message!
         # Empty system messages appear to be deleted :(
@@ -319,9 +318,22 @@ Continuing...
 
         if self.supports_functions:
             # yield from run_function_calling_llm(self, params)
-            yield from run_tool_calling_llm(self, params)
+            chunks = run_tool_calling_llm(self, params)
         else:
-            yield from run_text_llm(self, params)
+            chunks = run_text_llm(self, params)
+
+        # Count tokens in and out, for anyone reporting usage (like the OpenAI-compatible server)
+        self.usage["prompt_tokens"] += self.context_manager.total
+        completion = []
+        try:
+            for chunk in chunks:
+                if isinstance(chunk.get("content"), str):
+                    completion.append(chunk["content"])
+                yield chunk
+        finally:
+            self.usage[
+                "completion_tokens"
+            ] += self.context_manager.get_tokenizer().count("".join(completion))
 
     # If you change model, set _is_loaded to false
     @property
@@ -333,6 +345,37 @@ Continuing...
         self._model = value
         self._is_loaded = False
 
+    def resolve_model(self):
+        """
+        Loads the model if it needs loading, and returns the name to send to llm.completions,
+        setting up the endpoint for models that have their own. run() and computer.ai both use it.
+        """
+        with self._resolve_lock:
+            if not self._is_loaded:
+                self.load()
+
+            model = self.model
+            if model in [
+                "claude-3.5",
+                "claude-3-5",
+                "claude-3.5-sonnet",
+                "claude-3-5-sonnet",
+            ]:
+                model = "claude-3-5-sonnet-20240620"
+                self.model = "claude-3-5-sonnet-20240620"
+            # Setup our model endpoint
+            if model == "i":
+                model = "openai/i"
+                if not hasattr(
+                    self.interpreter, "conversation_id"
+                ):  # Only do this once
+                    self.context_window = 7000
+                    self.api_key = "x"
+                    self.max_tokens = 1000
+                    self.api_base = "https://api.openinterpreter.com/v0"
+                    self.interpreter.conversation_id = str(uuid.uuid4())
+            return model
+
     def load(self):
         if self._is_loaded:
             return
@@ -402,6 +445,7 @@ Continuing...
         # Validate LLM should be moved here!!
 
         if self.context_window == None:
+            configure_litellm()
             try:
                 model_info = litellm.get_model_info(model=self.model)
                 self.context_window = model_info["max_input_tokens"]
@@ -413,12 +457,22 @@ Continuing...
                 pass
 
 
+def configure_litellm():
+    """
+    Setting these imports litellm, so we do it right before we use it, rather than at import time.
+    """
+    litellm.suppress_debug_info = True
+    litellm.REPEATED_STREAMING_CHUNK_LIMIT = 99999999
+
+
 def fixed_litellm_completions(**params):
     """
     Just uses a dummy API key, since we use litellm without an API key sometimes.
     Hopefully they will fix this!
     """
 
+    configure_litellm()
+
     if "local" in params.get("model"):
         # Kinda hacky, but this helps sometimes
         params["stop"] = ["<|assistant|>", "<|end|>", "<|eot_id|>"]
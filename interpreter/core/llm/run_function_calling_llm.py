@@ -1,5 +1,5 @@
-from .utils.merge_deltas import merge_deltas
-from .utils.parse_partial_json import parse_partial_json
+from .utils.merge_deltas import merge_deltas, split_arguments
+from .utils.parse_partial_json import PartialJSONParser
 
 function_schema = {
     "name": "execute",
@@ -38,8 +38,8 @@ def run_function_calling_llm(llm, request_params):
     ## Convert output to LMC format
 
     accumulated_deltas = {}
+    arguments = PartialJSONParser()
     language = None
-    code = ""
     function_call_detected = False
 
     accumulated_review = ""
@@ -51,8 +51,10 @@ def run_function_calling_llm(llm, request_params):
             continue
 
         delta = chunk["choices"][0]["delta"]
-        # Accumulate deltas
+        # Accumulate deltas. Arguments go straight into the parser
+        delta, arguments_delta = split_arguments(delta)
         accumulated_deltas = merge_deltas(accumulated_deltas, delta)
+        arguments.feed(arguments_delta)
 
         if "content" in delta and delta["content"]:
             if function_call_detected:
@@ -90,35 +92,20 @@ def run_function_calling_llm(llm, request_params):
             else:
                 yield {"type": "message", "content": delta["content"]}
 
-        if (
-            accumulated_deltas.get("function_call")
-            and "arguments" in accumulated_deltas["function_call"]
-            and accumulated_deltas["function_call"]["arguments"]
-        ):
+        if "function_call" in accumulated_deltas and arguments.length:
             function_call_detected = True
             if (
                 "name" in accumulated_deltas["function_call"]
                 and accumulated_deltas["function_call"]["name"] == "execute"
             ):
-                arguments = accumulated_deltas["function_call"]["arguments"]
-                arguments = parse_partial_json(arguments)
-
-                if arguments:
-                    if (
-                        language is None
-                        and "language" in arguments
-                        and "code"
-                        in arguments  # <- This ensures we're *finished* typing language, as opposed to partially done
-                        and arguments["language"]
-                    ):
-                        language = arguments["language"]
-
-                    if language is not None and "code" in arguments:
-                        # Calculate the delta (new characters only)
-                        code_delta = arguments["code"][len(code) :]
-                        # Update the code
-                        code = arguments["code"]
-                        # Yield the delta
+                if not arguments.failed:
+                    # Language is only in values once we're *finished* typing it, as opposed to partially done
+                    if language is None and arguments.values.get("language"):
+                        language = arguments.values["language"]
+
+                    if language is not None:
+                        # The new characters of the code string, decoded
+                        code_delta = arguments.read("code")
                         if code_delta:
                             yield {
                                 "type": "code",
@@ -140,13 +127,8 @@ def run_function_calling_llm(llm, request_params):
                     language = "python"
 
                 if language is not None:
-                    # Pull the code string straight out of the "arguments" string
-                    code_delta = accumulated_deltas["function_call"]["arguments"][
-                        len(code) :
-                    ]
-                    # Update the code
-                    code = accumulated_deltas["function_call"]["arguments"]
-                    # Yield the delta
+                    # The "arguments" string is the code itself
+                    code_delta = arguments.read_raw()
                     if code_delta:
                         yield {
                             "type": "code",
@@ -1,8 +1,8 @@
 import os
 import re
 
-from .utils.merge_deltas import merge_deltas
-from .utils.parse_partial_json import parse_partial_json
+from .utils.merge_deltas import merge_deltas, split_arguments
+from .utils.parse_partial_json import PartialJSONParser
 
 tool_schema = {
     "type": "function",
@@ -168,8 +168,8 @@ def run_tool_calling_llm(llm, request_params):
     ## Convert output to LMC format
 
     accumulated_deltas = {}
+    arguments = PartialJSONParser()
     language = None
-    code = ""
     function_call_detected = False
     accumulated_review = ""
     review_category = None
@@ -196,8 +196,10 @@ def run_tool_calling_llm(llm, request_params):
                     }
                 }
 
-        # Accumulate deltas
+        # Accumulate deltas. Arguments go straight into the parser
+        delta, arguments_delta = split_arguments(delta)
         accumulated_deltas = merge_deltas(accumulated_deltas, delta)
+        arguments.feed(arguments_delta)
 
         if "content" in delta and delta["content"]:
             if function_call_detected:
@@ -258,11 +260,8 @@ def run_tool_calling_llm(llm, request_params):
             if language is None:
                 language = "python"
 
-            # Pull the code string straight out of the "arguments" string
-            code_delta = accumulated_deltas["function_call"]["arguments"][len(code) :]
-            # Update the code
-            code = accumulated_deltas["function_call"]["arguments"]
-            # Yield the delta
+            # The "arguments" string is the code itself
+            code_delta = arguments.read_raw()
             if code_delta:
                 yield {
                     "type": "code",
@@ -270,40 +269,24 @@ def run_tool_calling_llm(llm, request_params):
                     "content": code_delta,
                 }
 
-        if (
-            accumulated_deltas.get("function_call")
-            and "arguments" in accumulated_deltas["function_call"]
-            and accumulated_deltas["function_call"]["arguments"]
-        ):
-            if "arguments" in accumulated_deltas["function_call"]:
-                arguments = accumulated_deltas["function_call"]["arguments"]
-                arguments = parse_partial_json(arguments)
-
-                if arguments:
-                    if (
-                        language is None
-                        and "language" in arguments
-                        and "code"
-                        in arguments  # <- This ensures we're *finished* typing language, as opposed to partially done
-                        and arguments["language"]
-                    ):
-                        language = arguments["language"]
-
-                    if language is not None and "code" in arguments:
-                        # Calculate the delta (new characters only)
-                        code_delta = arguments["code"][len(code) :]
-                        # Update the code
-                        code = arguments["code"]
-                        # Yield the delta
-                        if code_delta:
-                            yield {
-                                "type": "code",
-                                "format": language,
-                                "content": code_delta,
-                            }
-                else:
-                    if llm.interpreter.verbose:
-                        print("Arguments not a dict.")
+        if "function_call" in accumulated_deltas and arguments.length:
+            if not arguments.failed:
+                # Language is only in values once we're *finished* typing it, as opposed to partially done
+                if language is None and arguments.values.get("language"):
+                    language = arguments.values["language"]
+
+                if language is not None:
+                    # The new characters of the code string, decoded
+                    code_delta = arguments.read("code")
+                    if code_delta:
+                        yield {
+                            "type": "code",
+                            "format": language,
+                            "content": code_delta,
+                        }
+            else:
+                if llm.interpreter.verbose:
+                    print("Arguments not a dict.")
 
     if os.getenv("INTERPRETER_REQUIRE_AUTHENTICATION", "False").lower() == "true":
         print("function_call_detected", function_call_detected)
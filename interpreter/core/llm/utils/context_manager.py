@@ -0,0 +1,211 @@
+from .tokenizers import get_tokenizer
+
+# Same accounting tokentrim used: a few tokens of overhead per message, and a few to prime the reply
+TOKENS_PER_MESSAGE = 4
+TOKENS_FOR_REPLY = 3
+
+# Images are billed by size, not by the length of their base64. This is a 1024x1024 "high" detail image
+TOKENS_PER_IMAGE = 765
+
+
+def value_key(value):
+    """
+    A hashable stand-in for a message value. Python caches string hashes,
+    so this is cheap for messages we've already seen, however long they are.
+    """
+    if isinstance(value, dict):
+        return tuple((key, value_key(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(value_key(item) for item in value)
+    return value
+
+
+class ContextManager:
+    """
+    Keeps OpenAI-style messages inside a token budget.
+
+    Token counts are cached per message by content, so each call only tokenizes what's new.
+    Messages are kept newest-first until the budget runs out. The one on the boundary is shortened
+    from the middle if it can be, and everything older is dropped. With a `summarizer`, the boundary
+    message and everything older are replaced by a summary instead.
+
+    `last_trim` reports exactly what happened on the last call.
+    """
+
+    def __init__(self, tokenizer=None, summarizer=None):
+        # See get_tokenizer for the options
+        self.tokenizer = tokenizer
+        # Optional. Called with the dropped messages, returns a str
+        self.summarizer = summarizer
+        self.model = None
+
+        self.counts = {}
+        self._seen = self.counts
+        self.summaries = {}
+        self.total = 0
+        self.last_trim = None
+        self._tokenizer = None
+        self._tokenizer_for = None
+
+    def get_tokenizer(self):
+        setting = (
+            self.tokenizer if isinstance(self.tokenizer, str) else id(self.tokenizer),
+            self.model,
+        )
+        if self._tokenizer is None or self._tokenizer_for != setting:
+            self._tokenizer = get_tokenizer(self.tokenizer, self.model)
+            self._tokenizer_for = setting
+            self.counts = self._seen = {}
+        return self._tokenizer
+
+    def count_message(self, message):
+        """
+        Tokens in one message, from the cache if we've seen its content before.
+        """
+        key = value_key(message)
+        tokens = self.counts.get(key)
+        if tokens is None:
+            tokens = self._count_message(message)
+        self._seen[key] = tokens
+        return tokens
+
+    def _count_message(self, message):
+        tokenizer = self.get_tokenizer()
+        tokens = TOKENS_PER_MESSAGE
+        for key, value in message.items():
+            tokens += tokenizer.count(key)
+            if key == "content" and isinstance(value, list):
+                for part in value:
+                    if part.get("type") == "image_url":
+                        tokens += TOKENS_PER_IMAGE
+                    else:
+                        tokens += tokenizer.count(str(part.get("text", "")))
+            elif value is not None:
+                tokens += tokenizer.count(
+                    value if isinstance(value, str) else str(value)
+                )
+        return tokens
+
+    def shorten(self, message, max_tokens):
+        """
+        Cuts the middle out of a message's text so the whole message fits in `max_tokens`.
+        Returns None if that isn't possible.
+        """
+        content = message.get("content")
+        if not isinstance(content, str) or "function_call" in message:
+            return None
+
+        tokenizer = self.get_tokenizer()
+        overhead = self.count_message(message) - tokenizer.count(content)
+        target = max_tokens - overhead
+
+        # Decoding can merge tokens across the cut, so check and tighten a couple of times
+        for _ in range(3):
+            if target <= 0:
+                return None
+            shortened = {
+                **message,
+                "content": tokenizer.truncate_middle(content, target),
+            }
+            tokens = self.count_message(shortened)
+            if tokens <= max_tokens:
+                return shortened
+            target -= tokens - max_tokens
+
+        return None
+
+    def summarize(self, dropped):
+        if not self.summarizer or not dropped:
+            return None
+
+        key = tuple(value_key(message) for message in dropped)
+        if key not in self.summaries:
+            self.summaries = {key: self.summarizer(dropped)}
+
+        return {
+            "role": "user",
+            "content": "Summary of the earlier conversation, which no longer fits:\n\n"
+            + self.summaries[key],
+        }
+
+    def trim(self, messages, system_message=None, max_tokens=8000, model=None):
+        """
+        Returns the messages (with the system message first, if there is one) that fit in `max_tokens`.
+        """
+        if model is not None:
+            self.model = model
+        self.get_tokenizer()
+
+        # Only keep counts for messages we saw this time, so the cache can't grow forever
+        self._seen = {}
+
+        try:
+            budget = max_tokens - TOKENS_FOR_REPLY
+
+            system_event = None
+            if system_message:
+                system_event = {"role": "system", "content": system_message}
+                system_tokens = self.count_message(system_event)
+                if system_tokens > budget:
+                    system_event = self.shorten(system_event, budget) or system_event
+                    system_tokens = self.count_message(system_event)
+                budget -= system_tokens
+
+            kept = []
+            used = 0
+            truncated = None
+            first_kept = len(messages)
+
+            for i in range(len(messages) - 1, -1, -1):
+                tokens = self.count_message(messages[i])
+                if used + tokens <= budget:
+                    kept.append(messages[i])
+                    used += tokens
+                    first_kept = i
+                    continue
+
+                # With a summarizer, the boundary message goes into the summary instead
+                shortened = None
+                if not self.summarizer:
+                    shortened = self.shorten(messages[i], budget - used)
+                if shortened is not None:
+                    kept.append(shortened)
+                    used += self.count_message(shortened)
+                    truncated = messages[i]
+                    first_kept = i
+                break
+
+            kept.reverse()
+            dropped = messages[:first_kept]
+
+            summary = self.summarize(dropped)
+            if summary is not None:
+                summary_tokens = self.count_message(summary)
+                if used + summary_tokens <= budget:
+                    kept.insert(0, summary)
+                    used += summary_tokens
+                else:
+                    summary = None
+
+            if system_event is not None:
+                kept.insert(0, system_event)
+                used += system_tokens
+
+            self.total = used + TOKENS_FOR_REPLY
+            self.last_trim = {
+                "max_tokens": max_tokens,
+                "tokens": self.total,
+                "dropped": dropped,
+                "truncated": truncated,
+                "summary": summary["content"] if summary else None,
+            }
+            return kept
+
+        finally:
+            self.counts = self._seen
+
+    def clear(self):
+        self.counts = self._seen = {}
+        self.summaries = {}
+        self.total = 0
+        self.last_trim = None
@@ -1,9 +1,33 @@
 import base64
+import copy
 import io
 import json
+import os
 import sys
 
-from PIL import Image
+from ...utils.lru_cache import LRUCache
+
+
+class ConversionCache:
+    """
+    Remembers converted messages between calls, so each turn only converts messages that are new or changed.
+
+    Messages are matched by identity and a hash of their content. Encoded (and shrunk) images are kept
+    in a size-bounded LRU, so we don't re-read, re-encode or re-shrink them either.
+    """
+
+    def __init__(self, max_image_bytes=64 * 1024 * 1024):
+        self.messages = {}
+        self.images = LRUCache(max_image_bytes, sizeof=len)
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.messages = {}
+        self.images.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "images": self.images.stats()}
 
 
 def convert_to_openai_messages(
@@ -12,6 +36,7 @@ def convert_to_openai_messages(
     vision=False,
     shrink_images=True,
     interpreter=None,
+    cache=None,
 ):
     """
     Converts LMC messages into OpenAI messages
@@ -31,224 +56,71 @@ def convert_to_openai_messages(
 
     #     messages = [message for message in messages if message.get("type") != "code"]
 
+    # Only the last user message gets the template (unless always_apply_user_message_template)
+    last_user_message = next(
+        (message for message in reversed(messages) if message["role"] == "user"), None
+    )
+
+    # Entries for messages that aren't in this call are dropped, so the cache never outgrows the conversation
+    if cache is not None:
+        previous_entries, cache.messages = cache.messages, {}
+
     for message in messages:
         # Is this for thine eyes?
         if "recipient" in message and message["recipient"] != "assistant":
             continue
 
-        new_message = {}
-
-        if message["type"] == "message":
-            new_message["role"] = message[
-                "role"
-            ]  # This should never be `computer`, right?
-
-            if message["role"] == "user" and (
-                message == [m for m in messages if m["role"] == "user"][-1]
+        apply_user_message_template = (
+            message["type"] == "message"
+            and message["role"] == "user"
+            and (
+                message == last_user_message
                 or interpreter.always_apply_user_message_template
-            ):
-                # Only add the template for the last message?
-                new_message["content"] = interpreter.user_message_template.replace(
-                    "{content}", message["content"]
-                )
-            else:
-                new_message["content"] = message["content"]
-
-        elif message["type"] == "code":
-            new_message["role"] = "assistant"
-            if function_calling:
-                new_message["function_call"] = {
-                    "name": "execute",
-                    "arguments": json.dumps(
-                        {"language": message["format"], "code": message["content"]}
-                    ),
-                    # parsed_arguments isn't actually an OpenAI thing, it's an OI thing.
-                    # but it's soo useful!
-                    # "parsed_arguments": {
-                    #     "language": message["format"],
-                    #     "code": message["content"],
-                    # },
-                }
-                # Add empty content to avoid error "openai.error.InvalidRequestError: 'content' is a required property - 'messages.*'"
-                # especially for the OpenAI service hosted on Azure
-                new_message["content"] = ""
-            else:
-                new_message[
-                    "content"
-                ] = f"""```{message["format"]}\n{message["content"]}\n```"""
-
-        elif message["type"] == "console" and message["format"] == "output":
-            if function_calling:
-                new_message["role"] = "function"
-                new_message["name"] = "execute"
-                if "content" not in message:
-                    print("What is this??", content)
-                if type(message["content"]) != str:
-                    if interpreter.debug:
-                        print("\n\n\nStrange chunk found:", message, "\n\n\n")
-                    message["content"] = str(message["content"])
-                if message["content"].strip() == "":
-                    new_message[
-                        "content"
-                    ] = "No output"  # I think it's best to be explicit, but we should test this.
-                else:
-                    new_message["content"] = message["content"]
-
-            else:
-                # This should be experimented with.
-                if interpreter.code_output_sender == "user":
-                    if message["content"].strip() == "":
-                        content = interpreter.empty_code_output_template
-                    else:
-                        content = interpreter.code_output_template.replace(
-                            "{content}", message["content"]
-                        )
-
-                    new_message["role"] = "user"
-                    new_message["content"] = content
-                elif interpreter.code_output_sender == "assistant":
-                    new_message["role"] = "assistant"
-                    new_message["content"] = (
-                        "\n```output\n" + message["content"] + "\n```"
-                    )
-
-        elif message["type"] == "image":
-            if message.get("format") == "description":
-                new_message["role"] = message["role"]
-                new_message["content"] = message["content"]
+            )
+        )
+
+        if cache is None:
+            new_message = convert_message(
+                message,
+                function_calling,
+                vision,
+                shrink_images,
+                interpreter,
+                apply_user_message_template,
+            )
+        else:
+            key = (
+                fingerprint(message),
+                conversion_settings(
+                    function_calling,
+                    vision,
+                    shrink_images,
+                    interpreter,
+                    apply_user_message_template,
+                ),
+            )
+            entry = previous_entries.get(id(message))
+            if entry is not None and entry[0] is message and entry[1] == key:
+                cache.hits += 1
+                new_message = entry[2]
             else:
-                if vision == False:
-                    # If no vision, we only support the format of "description"
-                    continue
-
-                if "base64" in message["format"]:
-                    # Extract the extension from the format, default to 'png' if not specified
-                    if "." in message["format"]:
-                        extension = message["format"].split(".")[-1]
-                    else:
-                        extension = "png"
-
-                    encoded_string = message["content"]
-
-                elif message["format"] == "path":
-                    # Convert to base64
-                    image_path = message["content"]
-                    extension = image_path.split(".")[-1]
-
-                    with open(image_path, "rb") as image_file:
-                        encoded_string = base64.b64encode(image_file.read()).decode(
-                            "utf-8"
-                        )
-
-                else:
-                    # Probably would be better to move this to a validation pass
-                    # Near core, through the whole messages object
-                    if "format" not in message:
-                        raise Exception("Format of the image is not specified.")
-                    else:
-                        raise Exception(
-                            f"Unrecognized image format: {message['format']}"
-                        )
-
-                content = f"data:image/{extension};base64,{encoded_string}"
-
-                if shrink_images:
-                    # Shrink to less than 5mb
-
-                    # Calculate size
-                    content_size_bytes = sys.getsizeof(str(content))
-
-                    # Convert the size to MB
-                    content_size_mb = content_size_bytes / (1024 * 1024)
-
-                    # If the content size is greater than 5 MB, resize the image
-                    if content_size_mb > 5:
-                        # Decode the base64 image
-                        img_data = base64.b64decode(encoded_string)
-                        img = Image.open(io.BytesIO(img_data))
-
-                        # Run in a loop to make SURE it's less than 5mb
-                        for _ in range(10):
-                            # Calculate the scale factor needed to reduce the image size to 4.9 MB
-                            scale_factor = (4.9 / content_size_mb) ** 0.5
-
-                            # Calculate the new dimensions
-                            new_width = int(img.width * scale_factor)
-                            new_height = int(img.height * scale_factor)
-
-                            # Resize the image
-                            img = img.resize((new_width, new_height))
-
-                            # Convert the image back to base64
-                            buffered = io.BytesIO()
-                            img.save(buffered, format=extension)
-                            encoded_string = base64.b64encode(
-                                buffered.getvalue()
-                            ).decode("utf-8")
-
-                            # Set the content
-                            content = f"data:image/{extension};base64,{encoded_string}"
-
-                            # Recalculate the size of the content in bytes
-                            content_size_bytes = sys.getsizeof(str(content))
-
-                            # Convert the size to MB
-                            content_size_mb = content_size_bytes / (1024 * 1024)
-
-                            if content_size_mb < 5:
-                                break
-                        else:
-                            print(
-                                "Attempted to shrink the image but failed. Sending to the LLM anyway."
-                            )
+                cache.misses += 1
+                new_message = convert_message(
+                    message,
+                    function_calling,
+                    vision,
+                    shrink_images,
+                    interpreter,
+                    apply_user_message_template,
+                    images=cache.images,
+                )
+            cache.messages[id(message)] = (message, key, new_message)
 
-                new_message = {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": content, "detail": "low"},
-                        }
-                    ],
-                }
+            # Whoever we hand this to might edit it (e.g. function_call -> tool_calls)
+            new_message = copy.deepcopy(new_message)
 
-                if message["role"] == "computer":
-                    new_message["content"].append(
-                        {
-                            "type": "text",
-                            "text": "This image is the result of the last tool output. What does it mean / are we done?",
-                        }
-                    )
-                if message.get("format") == "path":
-                    if any(
-                        content.get("type") == "text"
-                        for content in new_message["content"]
-                    ):
-                        for content in new_message["content"]:
-                            if content.get("type") == "text":
-                                content["text"] += (
-                                    "\nThis image is at this path: "
-                                    + message["content"]
-                                )
-                    else:
-                        new_message["content"].append(
-                            {
-                                "type": "text",
-                                "text": "This image is at this path: "
-                                + message["content"],
-                            }
-                        )
-
-        elif message["type"] == "file":
-            new_message = {"role": "user", "content": message["content"]}
-        elif message["type"] == "error":
-            print("Ignoring 'type' == 'error' messages.")
+        if new_message is None:
             continue
-        else:
-            raise Exception(f"Unable to convert this message type: {message}")
-
-        if isinstance(new_message["content"], str):
-            new_message["content"] = new_message["content"].strip()
 
         new_messages.append(new_message)
 
@@ -287,3 +159,285 @@ def convert_to_openai_messages(
         new_messages = combined_messages
 
     return new_messages
+
+
+def convert_message(
+    message,
+    function_calling,
+    vision,
+    shrink_images,
+    interpreter,
+    apply_user_message_template,
+    images=None,
+):
+    """
+    Converts one LMC message into an OpenAI message, or None if the LLM shouldn't see it.
+    """
+    new_message = {}
+
+    if message["type"] == "message":
+        new_message["role"] = message["role"]  # This should never be `computer`, right?
+
+        if apply_user_message_template:
+            # Only add the template for the last message?
+            new_message["content"] = interpreter.user_message_template.replace(
+                "{content}", message["content"]
+            )
+        else:
+            new_message["content"] = message["content"]
+
+    elif message["type"] == "code":
+        new_message["role"] = "assistant"
+        if function_calling:
+            new_message["function_call"] = {
+                "name": "execute",
+                "arguments": json.dumps(
+                    {"language": message["format"], "code": message["content"]}
+                ),
+                # parsed_arguments isn't actually an OpenAI thing, it's an OI thing.
+                # but it's soo useful!
+                # "parsed_arguments": {
+                #     "language": message["format"],
+                #     "code": message["content"],
+                # },
+            }
+            # Add empty content to avoid error "openai.error.InvalidRequestError: 'content' is a required property - 'messages.*'"
+            # especially for the OpenAI service hosted on Azure
+            new_message["content"] = ""
+        else:
+            new_message[
+                "content"
+            ] = f"""```{message["format"]}\n{message["content"]}\n```"""
+
+    elif message["type"] == "console" and message["format"] == "output":
+        if function_calling:
+            new_message["role"] = "function"
+            new_message["name"] = "execute"
+            if "content" not in message:
+                print("What is this??", content)
+            if type(message["content"]) != str:
+                if interpreter.debug:
+                    print("\n\n\nStrange chunk found:", message, "\n\n\n")
+                message["content"] = str(message["content"])
+            if message["content"].strip() == "":
+                new_message[
+                    "content"
+                ] = "No output"  # I think it's best to be explicit, but we should test this.
+            else:
+                new_message["content"] = message["content"]
+
+        else:
+            # This should be experimented with.
+            if interpreter.code_output_sender == "user":
+                if message["content"].strip() == "":
+                    content = interpreter.empty_code_output_template
+                else:
+                    content = interpreter.code_output_template.replace(
+                        "{content}", message["content"]
+                    )
+
+                new_message["role"] = "user"
+                new_message["content"] = content
+            elif interpreter.code_output_sender == "assistant":
+                new_message["role"] = "assistant"
+                new_message["content"] = "\n```output\n" + message["content"] + "\n```"
+
+    elif message["type"] == "image":
+        if message.get("format") == "description":
+            new_message["role"] = message["role"]
+            new_message["content"] = message["content"]
+        else:
+            if vision == False:
+                # If no vision, we only support the format of "description"
+                return None
+
+            content = encode_image(message, shrink_images, images)
+
+            new_message = {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": content, "detail": "low"},
+                    }
+                ],
+            }
+
+            if message["role"] == "computer":
+                new_message["content"].append(
+                    {
+                        "type": "text",
+                        "text": "This image is the result of the last tool output. What does it mean / are we done?",
+                    }
+                )
+            if message.get("format") == "path":
+                if any(
+                    content.get("type") == "text" for content in new_message["content"]
+                ):
+                    for content in new_message["content"]:
+                        if content.get("type") == "text":
+                            content["text"] += (
+                                "\nThis image is at this path: " + message["content"]
+                            )
+                else:
+                    new_message["content"].append(
+                        {
+                            "type": "text",
+                            "text": "This image is at this path: " + message["content"],
+                        }
+                    )
+
+    elif message["type"] == "file":
+        new_message = {"role": "user", "content": message["content"]}
+    elif message["type"] == "error":
+        print("Ignoring 'type' == 'error' messages.")
+        return None
+    else:
+        raise Exception(f"Unable to convert this message type: {message}")
+
+    if isinstance(new_message["content"], str):
+        new_message["content"] = new_message["content"].strip()
+
+    return new_message
+
+
+def encode_image(message, shrink_images, images=None):
+    """
+    Returns an image message as a data URL, shrunk to less than 5mb if shrink_images is set.
+    """
+    key = None
+    if images is not None:
+        key = (fingerprint(message), shrink_images)
+        content = images.get(key)
+        if content is not None:
+            return content
+
+    if "base64" in message["format"]:
+        # Extract the extension from the format, default to 'png' if not specified
+        if "." in message["format"]:
+            extension = message["format"].split(".")[-1]
+        else:
+            extension = "png"
+
+        encoded_string = message["content"]
+
+    elif message["format"] == "path":
+        # Convert to base64
+        image_path = message["content"]
+        extension = image_path.split(".")[-1]
+
+        with open(image_path, "rb") as image_file:
+            encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
+
+    else:
+        # Probably would be better to move this to a validation pass
+        # Near core, through the whole messages object
+        if "format" not in message:
+            raise Exception("Format of the image is not specified.")
+        else:
+            raise Exception(f"Unrecognized image format: {message['format']}")
+
+    content = f"data:image/{extension};base64,{encoded_string}"
+
+    if shrink_images:
+        # Shrink to less than 5mb
+
+        # Calculate size
+        content_size_bytes = sys.getsizeof(str(content))
+
+        # Convert the size to MB
+        content_size_mb = content_size_bytes / (1024 * 1024)
+
+        # If the content size is greater than 5 MB, resize the image
+        if content_size_mb > 5:
+            from PIL import Image
+
+            # Decode the base64 image
+            img_data = base64.b64decode(encoded_string)
+            img = Image.open(io.BytesIO(img_data))
+
+            # Run in a loop to make SURE it's less than 5mb
+            for _ in range(10):
+                # Calculate the scale factor needed to reduce the image size to 4.9 MB
+                scale_factor = (4.9 / content_size_mb) ** 0.5
+
+                # Calculate the new dimensions
+                new_width = int(img.width * scale_factor)
+                new_height = int(img.height * scale_factor)
+
+                # Resize the image
+                img = img.resize((new_width, new_height))
+
+                # Convert the image back to base64
+                buffered = io.BytesIO()
+                img.save(buffered, format=extension)
+                encoded_string = base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+                # Set the content
+                content = f"data:image/{extension};base64,{encoded_string}"
+
+                # Recalculate the size of the content in bytes
+                content_size_bytes = sys.getsizeof(str(content))
+
+                # Convert the size to MB
+                content_size_mb = content_size_bytes / (1024 * 1024)
+
+                if content_size_mb < 5:
+                    break
+            else:
+                print(
+                    "Attempted to shrink the image but failed. Sending to the LLM anyway."
+                )
+
+    if images is not None:
+        images.set(key, content)
+
+    return content
+
+
+def fingerprint(message):
+    """
+    Cheap to recompute: Python caches the hash of a str, so unchanged content isn't rehashed.
+    """
+    content = message.get("content")
+    try:
+        hash(content)
+    except TypeError:
+        content = repr(content)
+
+    # Images on disk can change under the same path
+    modified = None
+    if message.get("type") == "image" and message.get("format") == "path":
+        try:
+            stat = os.stat(content)
+            modified = (stat.st_mtime_ns, stat.st_size)
+        except (OSError, TypeError, ValueError):
+            pass
+
+    return hash(
+        (
+            message.get("role"),
+            message.get("type"),
+            message.get("format"),
+            message.get("recipient"),
+            content,
+            modified,
+        )
+    )
+
+
+def conversion_settings(
+    function_calling, vision, shrink_images, interpreter, apply_user_message_template
+):
+    """
+    Everything besides the message itself that convert_message's output depends on.
+    """
+    settings = (function_calling, vision, shrink_images, apply_user_message_template)
+    if interpreter is not None:
+        settings += (
+            interpreter.user_message_template if apply_user_message_template else None,
+            interpreter.code_output_sender,
+            interpreter.code_output_template,
+            interpreter.empty_code_output_template,
+        )
+    return settings
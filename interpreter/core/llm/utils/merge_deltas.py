@@ -20,3 +20,21 @@ def merge_deltas(original, delta):
                     merge_deltas(original[key], value)
 
     return original
+
+
+def split_arguments(delta):
+    """
+    Takes the function call arguments out of a delta, returning (delta, arguments).
+
+    Arguments can be huge (they hold the code), so they're streamed into a PartialJSONParser
+    instead of being concatenated onto the accumulated deltas every chunk.
+    """
+    delta = dict(delta)
+    function_call = delta.get("function_call")
+    if not function_call:
+        return delta, ""
+
+    function_call = dict(function_call)
+    arguments = function_call.pop("arguments", None) or ""
+    delta["function_call"] = function_call
+    return delta, arguments
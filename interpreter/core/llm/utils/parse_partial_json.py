@@ -58,3 +58,244 @@ def parse_partial_json(s):
     except:
         # If we still can't parse the string as JSON, return None to indicate failure.
         return None
+
+
+# Characters that end a run of plain string content
+STRING_SPECIAL = re.compile(r'["\\]')
+
+ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class PartialJSONParser:
+    """
+    Parses a JSON object as it streams in, one delta at a time.
+
+    Unlike `parse_partial_json`, it keeps its place between calls to `feed`, so each character
+    is only looked at once. Completed top-level values end up in `values`. String values can be
+    read while they're still being written with `read(key)`, which returns only what's new.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.strings = {}  # Decoded pieces of each top-level string value
+        self.read_positions = {}
+        self.text = []  # Everything fed so far, undecoded
+        self.text_read = 0
+        self.length = 0
+        self.failed = False
+
+        self.state = "start"
+        self.pending = ""  # An escape sequence that was split across deltas
+        self.key_pieces = []
+        self.key = None
+        self.raw = []  # Raw text of a non-string value
+        self.raw_depth = 0
+        self.raw_in_string = False
+        self.raw_escaped = False
+
+    def feed(self, delta):
+        if not delta:
+            return
+        self.text.append(delta)
+        self.length += len(delta)
+        if self.failed or self.state == "done":
+            return
+
+        data = self.pending + delta
+        self.pending = ""
+        i = 0
+        n = len(data)
+
+        while i < n:
+            state = self.state
+
+            if state == "key":
+                i, closed = self._scan_string(data, i, self.key_pieces)
+                if closed:
+                    self.key = "".join(self.key_pieces)
+                    self.key_pieces = []
+                    self.state = "colon"
+                continue
+
+            if state == "string":
+                i, closed = self._scan_string(data, i, self.strings[self.key])
+                if closed:
+                    self.values[self.key] = "".join(self.strings[self.key])
+                    self.state = "comma"
+                continue
+
+            if state == "raw":
+                i = self._scan_raw(data, i)
+                continue
+
+            char = data[i]
+            i += 1
+            if char in " \t\r\n":
+                continue
+
+            if state == "start":
+                if char != "{":
+                    return self._fail()
+                self.state = "key_or_end"
+            elif state == "key_or_end":
+                if char == '"':
+                    self.state = "key"
+                elif char == "}":
+                    self.state = "done"
+                    return
+                else:
+                    return self._fail()
+            elif state == "colon":
+                if char != ":":
+                    return self._fail()
+                self.state = "value"
+            elif state == "value":
+                if char == '"':
+                    self.strings[self.key] = []
+                    self.state = "string"
+                else:
+                    self.raw = [char]
+                    self.raw_depth = 1 if char in "{[" else 0
+                    self.raw_in_string = False
+                    self.raw_escaped = False
+                    self.state = "raw"
+            elif state == "comma":
+                if char == ",":
+                    self.state = "key_or_end"
+                elif char == "}":
+                    self.state = "done"
+                    return
+                else:
+                    return self._fail()
+
+    def _scan_string(self, data, i, pieces):
+        """
+        Decodes string content into `pieces` until the closing quote. Returns (position, closed).
+        """
+        n = len(data)
+        while True:
+            match = STRING_SPECIAL.search(data, i)
+            if match is None:
+                if i < n:
+                    pieces.append(data[i:])
+                return n, False
+
+            j = match.start()
+            if j > i:
+                pieces.append(data[i:j])
+            if data[j] == '"':
+                return j + 1, True
+
+            # An escape. Wait for the rest of it if it was cut off
+            if j + 1 >= n:
+                self.pending = data[j:]
+                return n, False
+
+            char = data[j + 1]
+            if char != "u":
+                pieces.append(ESCAPES.get(char, char))
+                i = j + 2
+                continue
+
+            if j + 6 > n:
+                self.pending = data[j:]
+                return n, False
+            try:
+                code = int(data[j + 2 : j + 6], 16)
+            except ValueError:
+                self._fail()
+                return n, False
+            i = j + 6
+
+            # Surrogate pairs (emoji, for example) come as two escapes, \ud83d\ude00
+            if 0xD800 <= code < 0xDC00:
+                if j + 12 > n and data.startswith("\\u"[: n - i], i):
+                    self.pending = data[j:]
+                    return n, False
+                if data.startswith("\\u", i):
+                    try:
+                        low = int(data[i + 2 : i + 6], 16)
+                    except ValueError:
+                        low = 0
+                    if 0xDC00 <= low < 0xE000:
+                        code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                        i += 6
+            pieces.append(chr(code))
+
+    def _scan_raw(self, data, i):
+        """
+        Collects a number, literal, array or object until the comma or brace that ends it.
+        """
+        n = len(data)
+        start = i
+        while i < n:
+            char = data[i]
+            if self.raw_in_string:
+                if self.raw_escaped:
+                    self.raw_escaped = False
+                elif char == "\\":
+                    self.raw_escaped = True
+                elif char == '"':
+                    self.raw_in_string = False
+            elif char == '"':
+                self.raw_in_string = True
+            elif char in "{[":
+                self.raw_depth += 1
+            elif char in "}]" and self.raw_depth > 0:
+                self.raw_depth -= 1
+            elif char in ",}" and self.raw_depth == 0:
+                self.raw.append(data[start:i])
+                try:
+                    self.values[self.key] = json.loads("".join(self.raw))
+                except:
+                    self._fail()
+                    return n
+                self.raw = []
+                self.state = "comma"
+                return i
+            i += 1
+
+        self.raw.append(data[start:])
+        return n
+
+    def _fail(self):
+        self.failed = True
+        self.state = "failed"
+
+    def read(self, key):
+        """
+        Returns the part of a string value that arrived since the last `read(key)`.
+        """
+        pieces = self.strings.get(key)
+        if not pieces:
+            return ""
+        position = self.read_positions.get(key, 0)
+        self.read_positions[key] = len(pieces)
+        return "".join(pieces[position:])
+
+    def read_raw(self):
+        """
+        Returns the text fed since the last `read_raw()`, as is. For when it turns out not to be JSON.
+        """
+        position = self.text_read
+        self.text_read = len(self.text)
+        return "".join(self.text[position:])
+
+    def get(self, key, default=None):
+        """
+        A top-level value, even if it's a string that hasn't finished streaming yet.
+        """
+        if key in self.values:
+            return self.values[key]
+        if key in self.strings:
+            return "".join(self.strings[key])
+        return default
@@ -0,0 +1,120 @@
+"""
+Tokenizers for counting (and shortening) text against a model's context window.
+
+Anything with `count(text)` and `truncate_middle(text, max_tokens)` will work,
+so you can pass your own to `interpreter.llm.context_manager.tokenizer`.
+"""
+
+
+class EstimateTokenizer:
+    """
+    Roughly 4 characters per token. Never exact, but needs nothing installed and no network.
+    """
+
+    name = "estimate"
+    chars_per_token = 4
+
+    def count(self, text):
+        return -(-len(text) // self.chars_per_token)
+
+    def truncate_middle(self, text, max_tokens):
+        keep = max(max_tokens - 1, 0) * self.chars_per_token // 2
+        if keep == 0:
+            return "..."
+        return text[:keep] + "..." + text[-keep:]
+
+
+class EncodingTokenizer:
+    """
+    Shared logic for tokenizers that can encode and decode.
+    """
+
+    def encode(self, text):
+        raise NotImplementedError
+
+    def decode(self, tokens):
+        raise NotImplementedError
+
+    def count(self, text):
+        return len(self.encode(text))
+
+    def truncate_middle(self, text, max_tokens):
+        tokens = self.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        keep = max(max_tokens - 1, 0) // 2
+        if keep == 0:
+            return "..."
+        return self.decode(tokens[:keep]) + "..." + self.decode(tokens[-keep:])
+
+
+class TiktokenTokenizer(EncodingTokenizer):
+    """
+    OpenAI's tiktoken. Falls back to cl100k_base for models it doesn't know, like tokentrim did.
+    """
+
+    name = "tiktoken"
+
+    def __init__(self, model=None):
+        import tiktoken
+
+        if model and "/" in model:
+            model = model.split("/")[-1]
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def encode(self, text):
+        return self.encoding.encode(text, disallowed_special=())
+
+    def decode(self, tokens):
+        return self.encoding.decode(tokens)
+
+
+class HuggingFaceTokenizer(EncodingTokenizer):
+    """
+    Any tokenizer from the Hugging Face Hub, for local models that tiktoken knows nothing about.
+    """
+
+    name = "huggingface"
+
+    def __init__(self, tokenizer):
+        if isinstance(tokenizer, str):
+            from transformers import AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(tokenizer)
+        self.tokenizer = tokenizer
+
+    def encode(self, text):
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def decode(self, tokens):
+        return self.tokenizer.decode(tokens)
+
+
+def get_tokenizer(tokenizer=None, model=None):
+    """
+    Resolves a tokenizer setting into a tokenizer.
+
+    `tokenizer` can be None (tiktoken, or the estimate if tiktoken can't load), "tiktoken",
+    "estimate", "huggingface/<repo id>", or an object that already has `count` and `truncate_middle`.
+    """
+    if tokenizer is not None and not isinstance(tokenizer, str):
+        return tokenizer
+
+    if tokenizer == "estimate":
+        return EstimateTokenizer()
+
+    if tokenizer and tokenizer.startswith("huggingface/"):
+        return HuggingFaceTokenizer(tokenizer[len("huggingface/") :])
+
+    try:
+        tiktoken_tokenizer = TiktokenTokenizer(model)
+        # Encodings are downloaded on first use, so make sure this one actually loaded
+        tiktoken_tokenizer.count("")
+        return tiktoken_tokenizer
+    except:
+        if tokenizer == "tiktoken":
+            raise
+        return EstimateTokenizer()
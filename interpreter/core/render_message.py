@@ -1,4 +1,107 @@
 import re
+import time
+
+CACHE_DIRECTIVE = re.compile(r"^\s*#\s*cache:\s*(.+?)\s*$", re.MULTILINE)
+DEPENDS_DIRECTIVE = re.compile(r"^\s*#\s*depends:\s*(.+?)\s*$", re.MULTILINE)
+TTL = re.compile(r"^(?:every\s+)?(\d+(?:\.\d+)?)\s*(?:s|secs?|seconds?)$")
+
+
+class RenderCache:
+    """
+    Remembers the output of {{ }} blocks, so we only run them in the kernel when they might have changed.
+
+    A block says how long its output stays good with a comment inside it:
+
+        # cache: static      <- render once
+        # cache: per-turn    <- render once per user message
+        # cache: 30s         <- render at most every 30 seconds
+        # depends: os, computer.import_computer_api   <- also re-render when these interpreter attributes change
+
+    Blocks without a `# cache:` comment run every time, like they always have.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.turn = 0
+        self.hits = 0
+        self.misses = 0
+        self._policies = {}
+
+    def new_turn(self):
+        self.turn += 1
+
+    def clear(self):
+        self.entries = {}
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+    def policy(self, code):
+        """
+        Returns (cache, depends) as declared by the block.
+        """
+        if code not in self._policies:
+            cache = CACHE_DIRECTIVE.search(code)
+            cache = cache.group(1).lower() if cache else "always"
+            ttl = TTL.match(cache)
+            if ttl:
+                cache = float(ttl.group(1))
+            elif cache not in ["static", "per-turn", "always"]:
+                print(
+                    f"Unknown `# cache: {cache}` in system message. Rendering every time."
+                )
+                cache = "always"
+
+            depends = DEPENDS_DIRECTIVE.search(code)
+            depends = (
+                [name.strip() for name in depends.group(1).split(",") if name.strip()]
+                if depends
+                else []
+            )
+
+            self._policies[code] = (cache, depends)
+        return self._policies[code]
+
+    def get(self, interpreter, code):
+        """
+        Returns the cached output of a block, or None if it needs to be (re)rendered.
+        """
+        cache, depends = self.policy(code)
+        entry = self.entries.get(code)
+
+        if (
+            entry is None
+            or cache == "always"
+            or entry["dependencies"] != dependency_values(interpreter, depends)
+            or (cache == "per-turn" and entry["turn"] != self.turn)
+            or (isinstance(cache, float) and time.time() - entry["time"] >= cache)
+        ):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry["output"]
+
+    def set(self, interpreter, code, output):
+        cache, depends = self.policy(code)
+        if cache == "always":
+            return
+        self.entries[code] = {
+            "output": output,
+            "time": time.time(),
+            "turn": self.turn,
+            "dependencies": dependency_values(interpreter, depends),
+        }
+
+
+def dependency_values(interpreter, depends):
+    values = []
+    for name in depends:
+        value = interpreter
+        for attribute in name.split("."):
+            value = getattr(value, attribute, None)
+        values.append(repr(value))
+    return values
 
 
 def render_message(interpreter, message):
@@ -15,9 +118,17 @@ def render_message(interpreter, message):
     for i, part in enumerate(parts):
         # If the part is enclosed in {{ and }}
         if part.startswith("{{") and part.endswith("}}"):
+            code = part[2:-2].strip()
+
+            # Reuse the last output if the block says it's still good
+            cached_output = interpreter.render_cache.get(interpreter, code)
+            if cached_output is not None:
+                parts[i] = cached_output
+                continue
+
             # Run the code inside the brackets
             output = interpreter.computer.run(
-                "python", part[2:-2].strip(), display=interpreter.verbose
+                "python", code, display=interpreter.verbose
             )
 
             # Extract the output content
@@ -30,6 +141,7 @@ def render_message(interpreter, message):
 
             # Replace the part with the output
             parts[i] = "\n".join(outputs)
+            interpreter.render_cache.set(interpreter, code, parts[i])
 
     # Join the parts back into the message
     rendered_message = "".join(parts).strip()
@@ -5,9 +5,11 @@ import time
 import traceback
 
 os.environ["LITELLM_LOCAL_MODEL_COST_MAP"] = "True"
-import litellm
 
 from .render_message import render_message
+from .utils.lazy_import import lazy_import
+
+litellm = lazy_import("litellm", optional=False)
 
 
 def respond(interpreter):
@@ -19,6 +21,12 @@ def respond(interpreter):
     last_unsupported_code = ""
     insert_loop_message = False
 
+    # `# cache: per-turn` blocks in the system message are rendered once per call to respond()
+    interpreter.render_cache.new_turn()
+
+    # Start the usual languages while the LLM thinks
+    interpreter.computer.terminal.warm()
+
     while True:
         ## RENDER SYSTEM MESSAGE ##
 
@@ -84,6 +92,9 @@ def respond(interpreter):
         ):  # If it is, we should run the code (we do below)
             try:
                 for chunk in interpreter.llm.run(messages_for_llm):
+                    if chunk["type"] == "code" and chunk.get("format"):
+                        # We know what it'll run, so that can start while the code streams in
+                        interpreter.computer.terminal.warm(chunk["format"])
                     yield {"role": "assistant", **chunk}
 
             except litellm.exceptions.BudgetExceededError:
@@ -326,22 +337,8 @@ def respond(interpreter):
                 interpreter.computer.emit_images = interpreter.llm.supports_vision
                 interpreter.computer.max_output = interpreter.max_output
 
-                # sync up the interpreter's computer with your computer
-                try:
-                    if interpreter.sync_computer and language == "python":
-                        computer_dict = interpreter.computer.to_dict()
-                        if "_hashes" in computer_dict:
-                            computer_dict.pop("_hashes")
-                        if "system_message" in computer_dict:
-                            computer_dict.pop("system_message")
-                        computer_json = json.dumps(computer_dict)
-                        sync_code = f"""import json\ncomputer.load_dict(json.loads('''{computer_json}'''))"""
-                        interpreter.computer.run("python", sync_code)
-                except Exception as e:
-                    if interpreter.debug:
-                        raise
-                    print(str(e))
-                    print("Failed to sync iComputer with your Computer. Continuing...")
+                # With interpreter.sync_computer on, the computer's changes go to the kernel
+                # (and its changes come back) around every Python execution. See computer_sync.py
 
                 ## ↓ CODE IS RUN HERE
 
@@ -350,32 +347,6 @@ def respond(interpreter):
 
                 ## ↑ CODE IS RUN HERE
 
-                # sync up your computer with the interpreter's computer
-                try:
-                    if interpreter.sync_computer and language == "python":
-                        # sync up the interpreter's computer with your computer
-                        result = interpreter.computer.run(
-                            "python",
-                            """
-                            import json
-                            computer_dict = computer.to_dict()
-                            if '_hashes' in computer_dict:
-                                computer_dict.pop('_hashes')
-                            if "system_message" in computer_dict:
-                                computer_dict.pop("system_message")
-                            print(json.dumps(computer_dict))
-                            """,
-                        )
-                        result = result[-1]["content"]
-                        interpreter.computer.load_dict(
-                            json.loads(result.strip('"').strip("'"))
-                        )
-                except Exception as e:
-                    if interpreter.debug:
-                        raise
-                    print(str(e))
-                    print("Failed to sync your Computer with iComputer. Continuing.")
-
                 # yield final "active_line" message, as if to say, no more code is running. unlightlight active lines
                 # (is this a good idea? is this our responsibility? i think so — we're saying what line of code is running! ...?)
                 yield {
@@ -0,0 +1,323 @@
+import os
+import sqlite3
+import threading
+import time
+
+from ..llm.utils.context_manager import TOKENS_PER_IMAGE, TOKENS_PER_MESSAGE
+from ..llm.utils.tokenizers import EstimateTokenizer
+from .conversation_journal import collect_blobs, load_conversation
+
+CONVERSATION_EXTENSIONS = (".json", ".jsonl")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    filename TEXT PRIMARY KEY,
+    title TEXT,
+    created REAL,
+    updated REAL,
+    message_count INTEGER,
+    token_count INTEGER,
+    model TEXT,
+    size INTEGER,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS conversations_by_updated ON conversations (updated);
+CREATE TABLE IF NOT EXISTS messages (
+    filename TEXT,
+    position INTEGER,
+    tokens INTEGER,
+    text_id INTEGER,
+    PRIMARY KEY (filename, position)
+);
+"""
+
+
+def title_from_filename(filename):
+    """
+    "First_few_words__October_18_2026_10-30-00.jsonl" -> "First few words... (October 18 2026 10-30-00)"
+    """
+    name = os.path.splitext(filename)[0]
+    return name.replace("__", "... (").replace("_", " ") + ")"
+
+
+def searchable_text(message):
+    """
+    What a message contributes to search. Images and file paths aren't worth searching.
+    """
+    content = message.get("content")
+    if message.get("type") == "image" or not isinstance(content, str):
+        return ""
+    return content
+
+
+class ConversationIndex:
+    """
+    A SQLite index of the saved conversations in a folder, so listing and searching them
+    doesn't mean opening every file.
+
+    Each conversation has a row (title, timestamps, message and token counts, model, size),
+    and each message's text goes into a full-text index. `update()` is called on every save with
+    where the conversation changed, so only new messages are indexed. `sync()` catches up with files
+    that were added, changed or deleted by something else.
+    """
+
+    def __init__(self, directory, filename="index.sqlite3"):
+        self.directory = directory
+        # sync() deletes unreferenced blobs older than this, in seconds
+        self.blob_min_age = 3600
+        self.blobs_collected = None
+        self.path = os.path.join(directory, filename)
+        self.tokenizer = EstimateTokenizer()
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            try:
+                self.connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS message_text USING fts5(text)"
+                )
+                self.full_text = True
+            except sqlite3.OperationalError:
+                # SQLite without FTS5. Search falls back to LIKE
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS message_text (text TEXT)"
+                )
+                self.full_text = False
+
+    def close(self):
+        self.connection.close()
+
+    def count_tokens(self, message):
+        if message.get("type") == "image":
+            return TOKENS_PER_MESSAGE + TOKENS_PER_IMAGE
+        return TOKENS_PER_MESSAGE + self.tokenizer.count(searchable_text(message))
+
+    def _add_text(self, filename, position, text, tokens):
+        text_id = None
+        if text:
+            text_id = self.connection.execute(
+                "INSERT INTO message_text (text) VALUES (?)", (text,)
+            ).lastrowid
+        self.connection.execute(
+            "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)",
+            (filename, position, tokens, text_id),
+        )
+
+    def _delete_messages(self, filename, start=0):
+        self.connection.execute(
+            "DELETE FROM message_text WHERE rowid IN"
+            " (SELECT text_id FROM messages WHERE filename = ? AND position >= ?)",
+            (filename, start),
+        )
+        self.connection.execute(
+            "DELETE FROM messages WHERE filename = ? AND position >= ?",
+            (filename, start),
+        )
+
+    def update(self, filename, messages, start=0, model=None):
+        """
+        Indexes `messages` as the conversation saved in `filename`, where everything from `start` on
+        is new or changed. Messages before `start` must already be indexed.
+        """
+        path = os.path.join(self.directory, filename)
+        stat = os.stat(path) if os.path.exists(path) else None
+        now = time.time()
+
+        with self.lock, self.connection:
+            existing = self.connection.execute(
+                "SELECT created FROM conversations WHERE filename = ?", (filename,)
+            ).fetchone()
+            if existing is None:
+                start = 0
+                self._delete_messages(filename, -1)
+                # The title is searchable too, as position -1
+                self._add_text(filename, -1, title_from_filename(filename), 0)
+            else:
+                self._delete_messages(filename, start)
+
+            for position in range(start, len(messages)):
+                message = messages[position]
+                self._add_text(
+                    filename,
+                    position,
+                    searchable_text(message),
+                    self.count_tokens(message),
+                )
+
+            token_count = self.connection.execute(
+                "SELECT COALESCE(SUM(tokens), 0) FROM messages WHERE filename = ?",
+                (filename,),
+            ).fetchone()[0]
+
+            self.connection.execute(
+                """
+                INSERT INTO conversations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (filename) DO UPDATE SET
+                    updated = excluded.updated,
+                    message_count = excluded.message_count,
+                    token_count = excluded.token_count,
+                    model = COALESCE(excluded.model, model),
+                    size = excluded.size,
+                    mtime = excluded.mtime
+                """,
+                (
+                    filename,
+                    title_from_filename(filename),
+                    stat.st_mtime if stat else now,
+                    stat.st_mtime if stat else now,
+                    len(messages),
+                    token_count,
+                    model,
+                    stat.st_size if stat else 0,
+                    stat.st_mtime if stat else None,
+                ),
+            )
+
+    def remove(self, filename):
+        with self.lock, self.connection:
+            self._delete_messages(filename, -1)
+            self.connection.execute(
+                "DELETE FROM conversations WHERE filename = ?", (filename,)
+            )
+
+    def sync(self):
+        """
+        Brings the index up to date with the folder. Only files whose size or modification time
+        differ from what's indexed are read, one at a time.
+
+        Blobs nothing refers to anymore are deleted too, if any file changed or was deleted, or we
+        haven't looked in a while (our own saves compact journals without changing anything here).
+        """
+        with self.lock:
+            indexed = {
+                row["filename"]: (row["size"], row["mtime"])
+                for row in self.connection.execute(
+                    "SELECT filename, size, mtime FROM conversations"
+                )
+            }
+
+        on_disk = set()
+        changed = False
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or not entry.name.endswith(CONVERSATION_EXTENSIONS):
+                continue
+            on_disk.add(entry.name)
+            stat = entry.stat()
+            if indexed.get(entry.name) == (stat.st_size, stat.st_mtime):
+                continue
+            try:
+                messages = load_conversation(entry.path)
+            except Exception:
+                # Unreadable (or half-written by someone else). Try again next time
+                continue
+            self.remove(entry.name)
+            self.update(entry.name, messages)
+            changed = True
+
+        for filename in set(indexed) - on_disk:
+            self.remove(filename)
+            changed = True
+
+        if (
+            changed
+            or self.blobs_collected is None
+            or time.time() - self.blobs_collected > self.blob_min_age
+        ):
+            collect_blobs(self.directory, self.blob_min_age)
+            self.blobs_collected = time.time()
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM conversations"
+            ).fetchone()[0]
+
+    def page(self, offset=0, limit=50):
+        """
+        Conversations, most recently updated first, as dicts.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT * FROM conversations ORDER BY updated DESC LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, query, offset=0, limit=50):
+        """
+        Conversations with a message (or a title) that contains every word in `query`, best matches first.
+        Each dict has the conversation's fields plus `snippet`, some matching text.
+        """
+        words = query.split()
+        if not words:
+            return []
+
+        if self.full_text:
+            # Every word as a quoted string, so punctuation in the query can't be read as FTS syntax
+            match = " ".join('"' + word.replace('"', '""') + '"' for word in words)
+            # The LIMIT stops SQLite flattening this into the join below, where bm25() can't run
+            matches = """
+                SELECT rowid, bm25(message_text) AS score,
+                    snippet(message_text, 0, '[', ']', '...', 12) AS snippet
+                FROM message_text WHERE message_text MATCH ?
+                LIMIT -1
+            """
+            parameters = [match]
+        else:
+            matches = (
+                "SELECT rowid, 0 AS score, substr(text, 1, 120) AS snippet FROM message_text WHERE "
+                + " AND ".join("text LIKE ?" for _ in words)
+            )
+            parameters = [f"%{word}%" for word in words]
+
+        with self.lock:
+            rows = self.connection.execute(
+                f"""
+                SELECT conversations.*, matches.snippet, MIN(matches.score) AS score
+                FROM ({matches}) AS matches
+                JOIN messages ON messages.text_id = matches.rowid
+                JOIN conversations ON conversations.filename = messages.filename
+                GROUP BY conversations.filename
+                ORDER BY score, conversations.updated DESC
+                LIMIT ? OFFSET ?
+                """,
+                parameters + [-1 if limit is None else limit, offset],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+indexes = {}
+indexes_lock = threading.Lock()
+
+
+def open_index(directory):
+    """
+    The ConversationIndex for a folder, shared by everything in this process that uses it.
+    """
+    directory = os.path.abspath(directory)
+    with indexes_lock:
+        if directory not in indexes:
+            indexes[directory] = ConversationIndex(directory)
+        return indexes[directory]
+
+
+def conversation_paths(directory):
+    """
+    Paths of the saved conversations in a folder, in name order.
+    """
+    if not os.path.exists(directory):
+        return
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if entry.is_file() and entry.name.endswith(CONVERSATION_EXTENSIONS):
+            yield entry.path
+
+
+def iter_conversations(directory):
+    """
+    Yields every saved conversation's messages, one conversation at a time.
+    """
+    for path in conversation_paths(directory):
+        yield load_conversation(path)
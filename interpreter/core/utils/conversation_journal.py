@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Key for journal lines that aren't messages. "Keep only the first n messages", after an undo or an edit
+TRUNCATE = "_truncate"
+# Key a message's content is swapped for, when the content lives in the blob store
+BLOB = "_blob"
+
+
+def fsync_directory(path):
+    """
+    Makes a rename or a new file in `path` durable. Not possible (or needed) on Windows.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class BlobStore:
+    """
+    Large message contents (base64 images, mostly), stored once per distinct content under its sha256.
+    Conversations in the same folder share one store, so a screenshot that appears twice is stored once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def blob_path(self, digest):
+        return os.path.join(self.path, digest[:2], digest)
+
+    def put(self, content, fsync=True):
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if os.path.exists(path):
+            try:
+                # Fresh again, so collect_blobs leaves it alone while the save that wants it finishes
+                os.utime(path)
+                return digest
+            except OSError:
+                pass  # Collected just now. Write it again
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a blob is either missing or complete
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        if fsync:
+            fsync_directory(os.path.dirname(path))
+        return digest
+
+    def get(self, digest):
+        with open(self.blob_path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+
+def blob_store_for(path):
+    return BlobStore(os.path.join(os.path.dirname(os.path.abspath(path)), "blobs"))
+
+
+def collect_blobs(directory, min_age=3600):
+    """
+    Deletes the blobs that no journal in `directory` refers to anymore, because a compaction dropped
+    their messages or their conversation was deleted. Returns how many were deleted.
+
+    Blobs written (or reused) in the last `min_age` seconds are kept, since a save might be about
+    to refer to them.
+    """
+    blobs = BlobStore(os.path.join(directory, "blobs"))
+    if not os.path.isdir(blobs.path):
+        return 0
+
+    # Mark. Superseded lines count too, they're still read until the journal is compacted
+    live = set()
+    for entry in os.scandir(directory):
+        if not entry.is_file() or not entry.name.endswith(".jsonl"):
+            continue
+        try:
+            for message in read_lines(entry.path):
+                if BLOB in message:
+                    live.add(message[BLOB])
+        except (OSError, ValueError):
+            return 0  # We can't tell what it refers to, so we can't delete anything
+
+    # Sweep. Leftover temp files from a crashed write go too
+    cutoff = time.time() - min_age
+    deleted = 0
+    for prefix in os.scandir(blobs.path):
+        if not prefix.is_dir():
+            continue
+        for entry in os.scandir(prefix.path):
+            if entry.name in live:
+                continue
+            try:
+                if entry.stat().st_mtime > cutoff:
+                    continue
+                os.remove(entry.path)
+                deleted += 1
+            except OSError:
+                pass
+    return deleted
+
+
+def signature(message):
+    """
+    Cheap fingerprint of a message, to tell which messages changed since they were written.
+    Python caches string hashes, so big contents that didn't change cost nothing to hash again.
+    """
+    return hash(
+        tuple(
+            (
+                key,
+                value if isinstance(value, str) else json.dumps(value, sort_keys=True),
+            )
+            for key, value in sorted(message.items())
+        )
+    )
+
+
+def read_journal(path, blobs=None):
+    """
+    Yields the conversation in a journal, reading each blob only when its message is reached.
+    """
+    blobs = blobs or blob_store_for(path)
+    pending = []
+    for message in read_lines(path):
+        if TRUNCATE in message:
+            del pending[message[TRUNCATE] :]
+        else:
+            pending.append(message)
+
+    # Truncations are only settled once we've read to the end, so blobs wait until then
+    contents = {}
+    for message in pending:
+        if BLOB in message:
+            digest = message[BLOB]
+            if digest not in contents:
+                contents[digest] = blobs.get(digest)
+            message = {
+                ("content" if key == BLOB else key): (
+                    contents[digest] if key == BLOB else value
+                )
+                for key, value in message.items()
+            }
+        yield message
+
+
+def read_lines(path):
+    """
+    The journal's lines, parsed. Lines are written whole with their newline, so a last line
+    without one was torn by a crash mid-write, and is skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                return
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_conversation(path):
+    """
+    A saved conversation's messages, from a journal (.jsonl) or an old whole-file .json save.
+    """
+    if path.endswith(".jsonl"):
+        return list(read_journal(path))
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ConversationJournal:
+    """
+    Saves a conversation by appending to a JSONL file, one LMC message per line, instead of rewriting it.
+
+    `save(messages)` compares `messages` with what's already on disk and appends only the messages
+    that are new or changed (changed ones after a truncation record). Image contents over `blob_threshold`
+    characters go to a BlobStore next to the journal. Once the journal is mostly superseded lines,
+    it's compacted into a fresh file. Every save is fsynced before it returns.
+    """
+
+    def __init__(self, path, blob_threshold=4096, compact_ratio=2, fsync=True):
+        self.path = path
+        self.blobs = blob_store_for(path)
+        self.blob_threshold = blob_threshold
+        # Compact once the journal has this many lines per live message
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+        self.lock = threading.Lock()
+
+        # Signatures of the messages the journal currently holds, and how many lines it has
+        self.signatures = []
+        self.lines = 0
+        # How many messages at the start the last save left as they were
+        self.kept = 0
+        if os.path.exists(path):
+            self._recover()
+
+    def _recover(self):
+        """
+        Catches up with a journal that's already on disk, dropping a torn last line if there is one.
+        """
+        size = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                size += len(line)
+        if size != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(size)
+
+        for message in read_journal(self.path, self.blobs):
+            self.signatures.append(signature(message))
+        self.lines = sum(1 for _ in read_lines(self.path))
+
+    def encode(self, message):
+        content = message.get("content")
+        if (
+            message.get("type") == "image"
+            and isinstance(content, str)
+            and len(content) > self.blob_threshold
+        ):
+            digest = self.blobs.put(content, fsync=self.fsync)
+            message = {
+                (BLOB if key == "content" else key): (
+                    digest if key == "content" else value
+                )
+                for key, value in message.items()
+            }
+        return json.dumps(message)
+
+    def save(self, messages):
+        """
+        Brings the journal up to date with `messages`. Returns how many lines were appended.
+        """
+        with self.lock:
+            signatures = [signature(message) for message in messages]
+
+            # How many messages at the start are already on disk as they are
+            kept = 0
+            for old, new in zip(self.signatures, signatures):
+                if old != new:
+                    break
+                kept += 1
+            self.kept = kept
+
+            lines = []
+            if kept < len(self.signatures):
+                lines.append(json.dumps({TRUNCATE: kept}))
+            lines.extend(self.encode(message) for message in messages[kept:])
+
+            if not lines:
+                return 0
+
+            if self.lines + len(lines) > self.compact_ratio * max(len(messages), 1):
+                self._compact(messages)
+            else:
+                self._append(lines)
+                self.lines += len(lines)
+            self.signatures = signatures
+            return len(lines)
+
+    def _append(self, lines):
+        new = not os.path.exists(self.path)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        if new and self.fsync:
+            fsync_directory(os.path.dirname(os.path.abspath(self.path)))
+
+    def _compact(self, messages):
+        """
+        Rewrites the journal as just `messages`, atomically.
+        """
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for message in messages:
+                f.write(self.encode(message) + "\n")
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        if self.fsync:
+            fsync_directory(os.path.dirname(os.path.abspath(self.path)))
+        self.lines = len(messages)
+
+    def compact(self, messages=None):
+        """
+        Rewrites the journal without superseded lines. Uses what's on disk unless you pass `messages`.
+        """
+        with self.lock:
+            if messages is None:
+                messages = list(read_journal(self.path, self.blobs))
+            self._compact(messages)
+            self.signatures = [signature(message) for message in messages]
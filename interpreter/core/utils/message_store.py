@@ -0,0 +1,138 @@
+import threading
+from collections import deque
+
+from .truncate_output import get_truncation_message
+
+
+class ChunkBuffer:
+    """
+    Holds the streamed pieces of one message as a list, and only joins them when asked to.
+    Appending is O(1), so a long reply costs linear time instead of one string copy per token.
+    """
+
+    def __init__(self, initial=""):
+        self.pieces = [initial] if initial else []
+
+    def append(self, content):
+        self.pieces.append(content)
+
+    def materialize(self):
+        if len(self.pieces) > 1:
+            self.pieces = ["".join(self.pieces)]
+        return self.pieces[0] if self.pieces else ""
+
+
+class OutputRingBuffer:
+    """
+    Keeps only the tail of a console output stream, so truncation is O(1) per chunk.
+
+    Materializes to exactly what running `truncate_output` after every chunk would produce.
+    """
+
+    def __init__(self, max_output_chars=2800, add_scrollbars=False, initial=""):
+        self.max_output_chars = max_output_chars
+        self.message = get_truncation_message(max_output_chars, add_scrollbars)
+        self.pieces = deque()
+        self.size = 0
+        self.truncated = False
+
+        # Content that was already truncated keeps its flag, like truncate_output does
+        if initial.startswith(self.message):
+            initial = initial[len(self.message) :]
+            self.truncated = True
+        self.append(initial)
+
+    def append(self, content):
+        if not content:
+            return
+
+        self.pieces.append(content)
+        self.size += len(content)
+
+        if self.size <= self.max_output_chars:
+            return
+
+        self.truncated = True
+
+        # Drop whole pieces we'll never show again
+        while self.size - len(self.pieces[0]) >= self.max_output_chars:
+            self.size -= len(self.pieces.popleft())
+
+        # Then trim the oldest remaining piece, so we never hold more than max_output_chars
+        excess = self.size - self.max_output_chars
+        if excess > 0:
+            self.pieces[0] = self.pieces[0][excess:]
+            self.size -= excess
+
+    def materialize(self):
+        data = "".join(self.pieces)
+        if len(self.pieces) > 1:
+            self.pieces = deque([data])
+        if self.truncated:
+            return self.message + data
+        return data
+
+
+class MessageStore:
+    """
+    Accumulates streamed chunks onto the message that's currently being written.
+
+    Only one message is "open" at a time. Its content lives in a buffer until `flush()`,
+    which writes it back into the message dict, so everything else sees normal LMC messages.
+
+    The thread streaming a reply appends while others (the server, reading `interpreter.messages`)
+    flush, so everything happens under a lock.
+    """
+
+    def __init__(self):
+        self.message = None
+        self.buffer = None
+        self.lock = threading.RLock()
+
+    def open(self, message, max_output_chars=None, add_scrollbars=False):
+        """
+        Starts buffering `message`. Pass `max_output_chars` to keep only the tail of its content.
+        """
+        with self.lock:
+            self._open(message, max_output_chars, add_scrollbars)
+
+    def _open(self, message, max_output_chars, add_scrollbars):
+        if message is self.message:
+            return
+
+        self.flush()
+
+        content = message.get("content") or ""
+        if max_output_chars is None:
+            self.buffer = ChunkBuffer(content)
+        else:
+            self.buffer = OutputRingBuffer(
+                max_output_chars, add_scrollbars=add_scrollbars, initial=content
+            )
+        self.message = message
+
+    def append(self, content):
+        with self.lock:
+            self.buffer.append(content)
+
+    def append_to(self, message, content, max_output_chars=None, add_scrollbars=False):
+        """
+        Appends to `message`, opening it first if it isn't open (say, another thread flushed it).
+        """
+        with self.lock:
+            self._open(message, max_output_chars, add_scrollbars)
+            self.buffer.append(content)
+
+    def is_open(self, message):
+        with self.lock:
+            return self.message is not None and self.message is message
+
+    def flush(self):
+        """
+        Writes the buffered content back into the open message and closes it.
+        """
+        with self.lock:
+            if self.message is not None:
+                self.message["content"] = self.buffer.materialize()
+            self.message = None
+            self.buffer = None
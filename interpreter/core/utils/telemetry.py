@@ -15,9 +15,6 @@ import os
 import threading
 import uuid
 
-import pkg_resources
-import requests
-
 
 def get_or_create_uuid():
     try:
@@ -45,6 +42,10 @@ user_id = get_or_create_uuid()
 
 
 def send_telemetry(event_name, properties=None):
+    # These are slow to import, and most sessions only send a couple of events
+    import pkg_resources
+    import requests
+
     if properties is None:
         properties = {}
     properties["oi_version"] = pkg_resources.get_distribution(
@@ -1,9 +1,4 @@
-def truncate_output(data, max_output_chars=2800, add_scrollbars=False):
-    # if "@@@DO_NOT_TRUNCATE@@@" in data:
-    #     return data
-
-    needs_truncation = False
-
+def get_truncation_message(max_output_chars=2800, add_scrollbars=False):
     message = f"Output truncated. Showing the last {max_output_chars} characters.\n\n"
 
     # This won't work because truncated code is stored in interpreter.messages :/
@@ -15,6 +10,17 @@ def truncate_output(data, max_output_chars=2800, add_scrollbars=False):
         )
     # Then we have code in `terminal.py` which makes that function work. It should be a computer tool though to just access messages IMO. Or like, self.messages.
 
+    return message
+
+
+def truncate_output(data, max_output_chars=2800, add_scrollbars=False):
+    # if "@@@DO_NOT_TRUNCATE@@@" in data:
+    #     return data
+
+    needs_truncation = False
+
+    message = get_truncation_message(max_output_chars, add_scrollbars)
+
     # Remove previous truncation message if it exists
     if data.startswith(message):
         data = data[len(message) :]
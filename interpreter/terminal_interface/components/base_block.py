@@ -1,24 +1,115 @@
+import os
+import threading
+import time
+
 from rich.console import Console
 from rich.live import Live
+from rich.segment import Segment
 
 
 class BaseBlock:
     """
     a visual "block" on the terminal.
+
+    `refresh()` is called for every streamed chunk, but the block is only redrawn `max_fps` times a second.
+    Chunks that arrive in between are drawn together by the next redraw, which a timer makes sure happens.
+    Subclasses draw themselves in `render()`.
     """
 
+    # 0 redraws on every refresh()
+    max_fps = float(os.getenv("OI_MAX_FPS", "30"))
+
     def __init__(self):
         self.live = Live(
             auto_refresh=False, console=Console(), vertical_overflow="visible"
         )
         self.live.start()
 
+        self.lock = threading.RLock()
+        self.last_render = 0
+        self.pending_cursor = None  # Set when there's a refresh that hasn't been drawn
+        self.timer = None
+
     def update_from_message(self, message):
         raise NotImplementedError("Subclasses must implement this method")
 
     def end(self):
-        self.refresh(cursor=False)
-        self.live.stop()
+        with self.lock:
+            self.cancel_timer()
+            self.pending_cursor = None
+            self.render(cursor=False)
+            self.live.stop()
 
     def refresh(self, cursor=True):
+        with self.lock:
+            self.pending_cursor = cursor
+            wait = (
+                self.last_render + 1 / self.max_fps - time.perf_counter()
+                if self.max_fps
+                else 0
+            )
+            if wait <= 0:
+                self.flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(wait, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """
+        Draws the latest refresh, if it hasn't been drawn yet.
+        """
+        with self.lock:
+            self.cancel_timer()
+            if self.pending_cursor is None:
+                return
+            cursor, self.pending_cursor = self.pending_cursor, None
+            self.last_render = time.perf_counter()
+            self.render(cursor=cursor)
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def render(self, cursor=True):
         raise NotImplementedError("Subclasses must implement this method")
+
+
+class RenderedLines:
+    """
+    Wraps a renderable that's done changing, and draws it once per width instead of every frame.
+
+    With a `style`, it's drawn in that style and padded to the full width, like a table row.
+
+    If it's given a RenderedLines it's drawn `after`, the renderable must start by drawing the same thing,
+    and those lines are left out. That's for renderables whose top depends on what came before (see MessageBlock).
+    """
+
+    def __init__(self, renderable, style=None, after=None):
+        self.renderable = renderable
+        self.style = style
+        self.after = after
+        self.width = None
+        self.lines = []
+
+    def render_lines(self, console, options):
+        if options.max_width != self.width:
+            options = options.update(height=None)
+            self.lines = console.render_lines(
+                self.renderable,
+                options,
+                style=self.style and console.get_style(self.style),
+                pad=self.style is not None,
+            )
+            if self.after is not None:
+                self.lines = self.lines[
+                    len(self.after.render_lines(console, options)) :
+                ]
+            self.width = options.max_width
+        return self.lines
+
+    def __rich_console__(self, console, options):
+        for line in self.render_lines(console, options):
+            yield from line
+            yield Segment.line()
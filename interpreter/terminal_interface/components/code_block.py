@@ -2,9 +2,8 @@ from rich.box import MINIMAL
 from rich.console import Group
 from rich.panel import Panel
 from rich.syntax import Syntax
-from rich.table import Table
 
-from .base_block import BaseBlock
+from .base_block import BaseBlock, RenderedLines
 
 
 class CodeBlock(BaseBlock):
@@ -27,58 +26,64 @@ class CodeBlock(BaseBlock):
         self.active_line = None
         self.margin_top = True
 
+        # (line, language, active) -> drawn line, for the lines on screen
+        self.highlighted = {}
+
     def end(self):
         self.active_line = None
-        self.refresh(cursor=False)
         super().end()
 
-    def refresh(self, cursor=True):
+    def highlight(self, line, active):
+        """
+        The line, syntax highlighted and drawn. Lines that haven't changed since the last render are reused.
+        """
+        key = (line, self.language, active)
+        row = self.highlighted.get(key)
+        if row is None:
+            if active:
+                # This is the active line, print it with a white background
+                syntax = Syntax(line, self.language, theme="bw", word_wrap=True)
+                style = "black on white"
+            else:
+                # This is not the active line, print it normally
+                syntax = Syntax(line, self.language, theme="monokai", word_wrap=True)
+                style = None
+            text = syntax.highlight(line)
+            if text.plain.endswith("\n"):
+                text.right_crop(1)
+            row = RenderedLines(text, style=style or text.style)
+        self.next_highlighted[key] = row
+        return row
+
+    def render(self, cursor=True):
         if not self.code and not self.output:
             return
 
         # Get code
         code = self.code
 
-        # Create a table for the code
-        code_table = Table(
-            show_header=False, show_footer=False, box=None, padding=0, expand=True
-        )
-        code_table.add_column()
-
-        # Add cursor only if active line highliting is true
-        if cursor and (
+        highlight_active_line = (
             self.highlight_active_line
             if self.highlight_active_line is not None
             else True
-        ):
+        )
+
+        # Add cursor only if active line highliting is true
+        if cursor and highlight_active_line:
             code += "●"
 
-        # Add each line of code to the table
+        # Add each line of code
+        self.next_highlighted = {}
         code_lines = code.strip().split("\n")
-        for i, line in enumerate(code_lines, start=1):
-            if i == self.active_line and (
-                self.highlight_active_line
-                if self.highlight_active_line is not None
-                else True
-            ):
-                # This is the active line, print it with a white background
-                syntax = Syntax(
-                    line, self.language, theme="bw", line_numbers=False, word_wrap=True
-                )
-                code_table.add_row(syntax, style="black on white")
-            else:
-                # This is not the active line, print it normally
-                syntax = Syntax(
-                    line,
-                    self.language,
-                    theme="monokai",
-                    line_numbers=False,
-                    word_wrap=True,
-                )
-                code_table.add_row(syntax)
+        rows = [
+            self.highlight(line, i == self.active_line and highlight_active_line)
+            for i, line in enumerate(code_lines, start=1)
+        ]
+        # Only keep the lines we just showed
+        self.highlighted = self.next_highlighted
 
         # Create a panel for the code
-        code_panel = Panel(code_table, box=MINIMAL, style="on #272722")
+        code_panel = Panel(Group(*rows), box=MINIMAL, style="on #272722")
 
         # Create a panel for the output (if there is any)
         if self.output == "" or self.output == "None":
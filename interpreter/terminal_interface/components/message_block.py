@@ -1,10 +1,11 @@
 import re
 
 from rich.box import MINIMAL
+from rich.console import Group
 from rich.markdown import Markdown
 from rich.panel import Panel
 
-from .base_block import BaseBlock
+from .base_block import BaseBlock, RenderedLines
 
 
 class MessageBlock(BaseBlock):
@@ -14,19 +15,67 @@ class MessageBlock(BaseBlock):
         self.type = "message"
         self.message = ""
 
-    def refresh(self, cursor=True):
+        # The start of the message, once markdown has moved past it, is drawn once and kept.
+        # Only the rest is parsed and drawn again as it streams in
+        self.finished = []
+        self.finished_length = 0
+        # The last finished block, which decides the spacing above whatever comes next
+        self.last_block = ""
+        self.last_block_lines = None
+
+    def render(self, cursor=True):
+        self.finish_blocks()
+
         # De-stylize any code blocks in markdown,
         # to differentiate from our Code Blocks
-        content = textify_markdown_code_blocks(self.message)
+        content = textify_markdown_code_blocks(
+            self.last_block + self.unfinished_message()
+        )
 
         if cursor:
             content += "●"
 
-        markdown = Markdown(content.strip())
-        panel = Panel(markdown, box=MINIMAL)
+        markdown = Markdown(content.rstrip())
+        if self.last_block_lines:
+            markdown = RenderedLines(markdown, after=self.last_block_lines)
+        panel = Panel(Group(*self.finished, markdown), box=MINIMAL)
         self.live.update(panel)
         self.live.refresh()
 
+    def unfinished_message(self):
+        return self.message.lstrip()[self.finished_length :]
+
+    def finish_blocks(self):
+        """
+        Moves the top-level markdown blocks that can't change anymore (every one followed by another block)
+        from the unfinished part of the message into `self.finished`.
+        """
+        unfinished = self.unfinished_message()
+        blocks = [
+            token
+            for token in Markdown(textify_markdown_code_blocks(unfinished)).parsed
+            if token.level == 0 and token.nesting in (0, 1) and token.map
+        ]
+        if len(blocks) < 2:
+            return
+
+        # Everything before the last block is finished, and its code blocks are closed.
+        # It's drawn after the block before it, then cut, so the spacing between them comes out the same
+        lines = unfinished.split("\n")
+        finished = "\n".join(lines[: blocks[-1].map[0]]) + "\n"
+        self.finished.append(
+            RenderedLines(
+                Markdown(textify_markdown_code_blocks(self.last_block + finished)),
+                after=self.last_block_lines,
+            )
+        )
+        self.finished_length += len(finished)
+
+        self.last_block = "\n".join(lines[blocks[-2].map[0] : blocks[-1].map[0]]) + "\n"
+        self.last_block_lines = RenderedLines(
+            Markdown(textify_markdown_code_blocks(self.last_block))
+        )
+
 
 def textify_markdown_code_blocks(text):
     """
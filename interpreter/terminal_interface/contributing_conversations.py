@@ -6,6 +6,10 @@ from typing import List, TypedDict
 import pkg_resources
 import requests
 
+from interpreter.core.utils.conversation_index import (
+    conversation_paths,
+    iter_conversations,
+)
 from interpreter.terminal_interface.profiles.profiles import write_key_to_profile
 from interpreter.terminal_interface.utils.display_markdown_message import (
     display_markdown_message,
@@ -39,8 +43,7 @@ def display_contributing_current_message():
 
 
 def send_past_conversations(interpreter):
-    past_conversations = get_all_conversations(interpreter)
-    if len(past_conversations) > 0:
+    if any(True for _ in conversation_paths(interpreter.conversation_history_path)):
         print()
         print(
             "We are about to send all previous conversations to Open Interpreter for training an open-source language model. Please make sure these don't contain any private information. Run `interpreter --conversations` to browse them."
@@ -53,7 +56,16 @@ def send_past_conversations(interpreter):
         print()
         if uh == "y":
             print("Sending all previous conversations to OpenInterpreter...")
-            contribute_conversations(past_conversations)
+            # A few at a time, so we never hold every conversation in memory
+            batch = []
+            for conversation in iter_conversations(
+                interpreter.conversation_history_path
+            ):
+                batch.append(conversation)
+                if len(batch) == 20:
+                    contribute_conversations(batch)
+                    batch = []
+            contribute_conversations(batch)
             print()
 
 
@@ -143,23 +155,7 @@ def write_to_contribution_cache(contribution_cache: ContributionCache):
 
 
 def get_all_conversations(interpreter) -> List[List]:
-    def is_conversation_path(path: str):
-        _, ext = os.path.splitext(path)
-        return ext == ".json"
-
-    history_path = interpreter.conversation_history_path
-    all_conversations: List[List] = []
-    conversation_files = (
-        os.listdir(history_path) if os.path.exists(history_path) else []
-    )
-    for mpath in conversation_files:
-        if not is_conversation_path(mpath):
-            continue
-        full_path = os.path.join(history_path, mpath)
-        with open(full_path, "r") as cfile:
-            conversation = json.load(cfile)
-            all_conversations.append(conversation)
-    return all_conversations
+    return list(iter_conversations(interpreter.conversation_history_path))
 
 
 def is_list_of_lists(l):
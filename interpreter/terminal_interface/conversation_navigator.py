@@ -2,13 +2,14 @@
 This file handles conversations.
 """
 
-import json
 import os
 import platform
 import subprocess
 
 import inquirer
 
+from ..core.utils.conversation_index import open_index
+from ..core.utils.conversation_journal import load_conversation
 from .render_past_conversation import render_past_conversation
 from .utils.local_storage_path import get_storage_path
 
@@ -30,55 +31,71 @@ def conversation_navigator(interpreter):
         print(f"No conversations found in {conversations_dir}")
         return None
 
-    # Get list of all JSON files in the directory and sort them by modification time, newest first
-    json_files = sorted(
-        [f for f in os.listdir(conversations_dir) if f.endswith(".json")],
-        key=lambda x: os.path.getmtime(os.path.join(conversations_dir, x)),
-        reverse=True,
-    )
-
-    # Make a dict that maps reformatted "First few words... (September 23rd)" -> "First_few_words__September_23rd.json" (original file name)
-    readable_names_and_filenames = {}
-    for filename in json_files:
-        name = (
-            filename.replace(".json", "")
-            .replace(".JSON", "")
-            .replace("__", "... (")
-            .replace("_", " ")
-            + ")"
-        )
-        readable_names_and_filenames[name] = filename
-
-    # Add the option to open the folder. This doesn't map to a filename, we'll catch it
-    readable_names_and_filenames_list = list(readable_names_and_filenames.keys())
-    readable_names_and_filenames_list = [
-        "Open Folder →"
-    ] + readable_names_and_filenames_list
-
-    # Use inquirer to let the user select a file
-    questions = [
-        inquirer.List(
-            "name",
-            message="",
-            choices=readable_names_and_filenames_list,
-        ),
-    ]
-    answers = inquirer.prompt(questions)
-
-    # User chose to exit
-    if not answers:
-        return
-
-    # If the user selected to open the folder, do so and return
-    if answers["name"] == "Open Folder →":
-        open_folder(conversations_dir)
-        return
-
-    selected_filename = readable_names_and_filenames[answers["name"]]
+    # The index knows every conversation's title and age, so we don't open or stat each file
+    index = open_index(conversations_dir)
+    index.sync()
+
+    page_size = 100
+    offset = 0
+    query = None
+
+    while True:
+        if query:
+            conversations = index.search(query, offset=offset, limit=page_size + 1)
+        else:
+            conversations = index.page(offset=offset, limit=page_size + 1)
+        more = len(conversations) > page_size
+
+        # Make a dict that maps "First few words... (September 23rd)" -> "First_few_words__September_23rd.jsonl" (original file name)
+        readable_names_and_filenames = {}
+        for conversation in conversations[:page_size]:
+            name = conversation["title"]
+            if query:
+                name += f'  "{conversation["snippet"]}"'
+            readable_names_and_filenames[name] = conversation["filename"]
+
+        # Add the options to open the folder, search, and see more. These don't map to a filename, we'll catch them
+        readable_names_and_filenames_list = [
+            "Open Folder →",
+            "Search →",
+        ] + list(readable_names_and_filenames.keys())
+        if more:
+            readable_names_and_filenames_list.append("More →")
+
+        # Use inquirer to let the user select a file
+        questions = [
+            inquirer.List(
+                "name",
+                message="",
+                choices=readable_names_and_filenames_list,
+            ),
+        ]
+        answers = inquirer.prompt(questions)
+
+        # User chose to exit
+        if not answers:
+            return
+
+        # If the user selected to open the folder, do so and return
+        if answers["name"] == "Open Folder →":
+            open_folder(conversations_dir)
+            return
+
+        if answers["name"] == "Search →":
+            answers = inquirer.prompt([inquirer.Text("query", message="Search")])
+            query = answers["query"].strip() if answers else None
+            offset = 0
+            continue
+
+        if answers["name"] == "More →":
+            offset += page_size
+            continue
+
+        selected_filename = readable_names_and_filenames[answers["name"]]
+        break
 
     # Open the selected file and load the JSON data
-    with open(os.path.join(conversations_dir, selected_filename), "r") as f:
-        messages = json.load(f)
+    messages = load_conversation(os.path.join(conversations_dir, selected_filename))
 
     # Pass the data into render_past_conversation
     render_past_conversation(messages)
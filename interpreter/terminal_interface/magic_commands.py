@@ -305,7 +305,8 @@ def markdown(self, export_path: str):
 
     # If user doesn't specify the export path, then save the exported PDF in '~/Downloads'
     if not export_path:
-        export_path = get_downloads_path() + f"/{self.conversation_filename[:-4]}md"
+        name = os.path.splitext(self.conversation_filename)[0]
+        export_path = get_downloads_path() + f"/{name}.md"
 
     export_to_markdown(self.messages, export_path)
 
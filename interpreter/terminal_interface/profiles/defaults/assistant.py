@@ -92,6 +92,7 @@ If you want to search specific sites like amazon or youtube, use query parameter
 
 ---
 {{
+# cache: per-turn
 skills = computer.skills.list()
 if skills:
     print('Try to use the following special functions (or "skills") to complete your goals whenever possible.
@@ -15,6 +15,8 @@ interpreter.llm.max_tokens = 4096
 interpreter.auto_run = True
 interpreter.loop = True
 interpreter.sync_computer = True
+# It views the screen after every step, and usually little has changed. Don't resend what it's already seen
+interpreter.computer.screenshot_changes_only = True
 
 interpreter.system_message = r"""
 
@@ -39,6 +41,7 @@ computer.browser.search(query) # Silently searches Google for the query, returns
 # Note: There are NO other browser functions — use regular `webbrowser` and `computer.display.view()` commands to view/control a real browser.
 
 computer.display.view() # Shows you what's on the screen (primary display by default), returns a `pil_image` `in case you need it (rarely). To get a specific display, use the parameter screen=DISPLAY_NUMBER (0 for primary monitor 1 and above for secondary monitors). **You almost always want to do this first!**
+# If the screen barely changed since your last view, you'll only be shown the part that changed (and where it is). Use computer.display.view(changes_only=False) to see the whole screen again.
 # NOTE: YOU MUST NEVER RUN image.show() AFTER computer.display.view. IT WILL AUTOMATICALLY SHOW YOU THE IMAGE. DO NOT RUN image.show().
 
 computer.keyboard.hotkey(" ", "command") # Opens spotlight (very useful)
@@ -59,6 +62,7 @@ computer.clipboard.view() # Returns contents of clipboard
 computer.os.get_selected_text() # Use frequently. If editing text, the user often wants this
 
 {{
+# cache: static
 import platform
 if platform.system() == 'Darwin':
         print('''
@@ -244,6 +248,9 @@ if not interpreter.auto_run:
 
 interpreter.auto_run = True
 
+# Load the icon models in the background, so the first click on an icon doesn't wait for them
+interpreter.computer.display.warm_up()
+
 interpreter.display_message(
     "**Warning:** In this mode, Open Interpreter will not require approval before performing actions. Be ready to close your terminal."
 )
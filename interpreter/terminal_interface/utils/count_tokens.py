@@ -1,16 +1,10 @@
-try:
-    import tiktoken
-    from litellm import cost_per_token
-except:
-    # Non-essential feature
-    pass
-
-
 def count_tokens(text="", model="gpt-4"):
     """
     Count the number of tokens in a string
     """
     try:
+        import tiktoken
+
         # Fix bug where models starting with openai/ for example can't find tokenizer
         if "/" in model:
             model = model.split("/")[-1]
@@ -36,6 +30,9 @@ def token_cost(tokens=0, model="gpt-4"):
     """
 
     try:
+        # Imported here, because litellm takes seconds to import
+        from litellm import cost_per_token
+
         (prompt_cost, _) = cost_per_token(model=model, prompt_tokens=tokens)
 
         return round(prompt_cost, 6)
@@ -0,0 +1,87 @@
+"""
+Measures what interpreter.sync_computer adds to each Python execution: off, the old way
+(a full to_dict() round trip before and after every execution), and deltas (computer_sync.py).
+
+Runs `x = 1` through a real Jupyter kernel with the computer API imported, so it needs ipykernel.
+
+    python tests/benchmarks/bench_computer_sync.py [runs]
+"""
+
+import json
+import statistics
+import sys
+import time
+
+from interpreter import OpenInterpreter
+
+
+def old_sync(computer, code):
+    # What respond.py used to do around every execution
+    computer_dict = computer.to_dict()
+    computer_dict.pop("_hashes", None)
+    computer_dict.pop("system_message", None)
+    computer.run(
+        "python",
+        f"""import json\ncomputer.load_dict(json.loads('''{json.dumps(computer_dict)}'''))""",
+    )
+    output = computer.run("python", code)
+    result = computer.run(
+        "python",
+        """
+import json
+computer_dict = computer.to_dict()
+computer_dict.pop('_hashes', None)
+computer_dict.pop("system_message", None)
+print(json.dumps(computer_dict))
+""",
+    )
+    computer.load_dict(json.loads(result[-1]["content"].strip().strip('"').strip("'")))
+    return output
+
+
+def time_runs(run, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main(runs=50):
+    interpreter = OpenInterpreter(import_computer_api=True)
+    computer = interpreter.computer
+    code = "x = 1"
+
+    # Starts the kernel and imports the computer API. Don't count it
+    computer.run("python", "pass")
+
+    interpreter.sync_computer = False
+    off = time_runs(lambda: computer.run("python", code), runs)
+    old = time_runs(lambda: old_sync(computer, code), runs)
+
+    interpreter.sync_computer = True
+
+    def changed():
+        # A realistic turn: something on our side changed since the last execution
+        computer.max_output += 1
+        computer.run("python", code)
+
+    delta_unchanged = time_runs(lambda: computer.run("python", code), runs)
+    delta_changed = time_runs(changed, runs)
+
+    computer.terminate()
+
+    print(f"`{code}` through the Python kernel, median of {runs} runs")
+    print(f"  sync off:                  {off:.2f} ms")
+    print(f"  full round trips (old):    {old:.2f} ms  (+{old - off:.2f})")
+    print(
+        f"  deltas, nothing changed:   {delta_unchanged:.2f} ms  (+{delta_unchanged - off:.2f})"
+    )
+    print(
+        f"  deltas, one change:        {delta_changed:.2f} ms  (+{delta_changed - off:.2f})"
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,125 @@
+"""
+Times the box bookkeeping in find_icon (merging overlapping boxes, and dropping boxes that sit on text)
+on synthetic boxes, comparing the old Python loops with the BoxGrid versions.
+
+Contour detection itself needs OpenCV and a real screenshot, so it isn't timed here.
+Set OI_POINT_DOWNSCALE and look at point.timings for that.
+
+    python tests/benchmarks/bench_element_boxes.py [icon boxes] [text boxes]
+"""
+
+import random
+import sys
+import time
+
+from interpreter.core.computer.utils.box_index import BoxGrid, merge_overlapping
+
+
+def random_boxes(count, max_size, seed):
+    random.seed(seed)
+    boxes = []
+    for _ in range(count):
+        left, top = random.randint(0, 3840), random.randint(0, 2160)
+        boxes.append(
+            {
+                "x": left,
+                "y": top,
+                "width": random.randint(10, max_size),
+                "height": random.randint(10, max_size),
+            }
+        )
+    return boxes
+
+
+def old_combine(icons_bounding_boxes):
+    """
+    combine_boxes from find_icon before BoxGrid. It computed a merged box's width from its
+    already-moved left edge, so boxes could shrink and it sometimes stopped with more boxes.
+    """
+    while True:
+        combined_boxes = []
+        for box in icons_bounding_boxes:
+            for combined_box in combined_boxes:
+                if (
+                    box["x"] < combined_box["x"] + combined_box["width"]
+                    and box["x"] + box["width"] > combined_box["x"]
+                    and box["y"] < combined_box["y"] + combined_box["height"]
+                    and box["y"] + box["height"] > combined_box["y"]
+                ):
+                    combined_box["x"] = min(box["x"], combined_box["x"])
+                    combined_box["y"] = min(box["y"], combined_box["y"])
+                    combined_box["width"] = (
+                        max(
+                            box["x"] + box["width"],
+                            combined_box["x"] + combined_box["width"],
+                        )
+                        - combined_box["x"]
+                    )
+                    combined_box["height"] = (
+                        max(
+                            box["y"] + box["height"],
+                            combined_box["y"] + combined_box["height"],
+                        )
+                        - combined_box["y"]
+                    )
+                    break
+            else:
+                combined_boxes.append(box.copy())
+        if len(combined_boxes) == len(icons_bounding_boxes):
+            break
+        else:
+            icons_bounding_boxes = combined_boxes
+    return combined_boxes
+
+
+def old_filter(icons, texts):
+    return [
+        box
+        for box in icons
+        if not any(
+            max(text["x"], box["x"])
+            < min(text["x"] + text["width"], box["x"] + box["width"])
+            and max(text["y"], box["y"])
+            < min(text["y"] + text["height"], box["y"] + box["height"])
+            for text in texts
+        )
+    ]
+
+
+def grid_filter(icons, texts):
+    grid = BoxGrid(map(corners, texts))
+    return [box for box in icons if not grid.any_overlapping(corners(box))]
+
+
+def corners(box):
+    return (box["x"], box["y"], box["x"] + box["width"], box["y"] + box["height"])
+
+
+def timed(function, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main(icon_count=4000, text_count=1500):
+    icons = random_boxes(icon_count, 60, seed=0)
+    texts = random_boxes(text_count, 120, seed=1)
+    print(f"{icon_count} icon boxes, {text_count} text boxes on a 4K screen")
+
+    old_ms, old = timed(lambda: old_filter(icons, texts), repeat=1)
+    new_ms, new = timed(lambda: grid_filter(icons, texts))
+    assert len(old) == len(new)
+    print(f"  filter text  old loop {old_ms:8.1f} ms   BoxGrid {new_ms:7.1f} ms")
+
+    old_ms, old = timed(lambda: old_combine(icons), repeat=1)
+    new_ms, new = timed(lambda: merge_overlapping(map(corners, icons)))
+    print(
+        f"  combine      old loop {old_ms:8.1f} ms   BoxGrid {new_ms:7.1f} ms   ({len(old)} / {len(new)} boxes)"
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
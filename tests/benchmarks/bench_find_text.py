@@ -0,0 +1,126 @@
+"""
+Times text search over a dense synthetic OCR result (a 4K screen full of small text), comparing
+the old per-box Python loop from find_text_in_image with TextLayout.
+
+The OCR result is generated rather than OCR'd, so this needs neither Tesseract nor a screen.
+
+    python tests/benchmarks/bench_find_text.py [lines] [words per line]
+"""
+
+import random
+import sys
+import time
+
+from interpreter.core.computer.utils.text_layout import TextLayout
+
+VOCABULARY = (
+    "the file edit view window help open save close new project settings search "
+    "results page next previous submit cancel sign in account profile messages "
+    "inbox sent drafts archive delete reply forward share download upload"
+).split()
+
+
+def dense_screen(lines, words_per_line):
+    random.seed(0)
+    data = {
+        key: []
+        for key in ["level", "text", "left", "top", "width", "height"]
+        + ["block_num", "par_num", "line_num"]
+    }
+    for line in range(lines):
+        # Tesseract puts a row for the line itself before its words
+        rows = [(4, "", 0, 3840)]
+        left = 0
+        for _ in range(words_per_line):
+            word = random.choice(VOCABULARY)
+            rows.append((5, word, left, len(word) * 9))
+            left += len(word) * 9 + 8
+        for level, text, x, width in rows:
+            data["level"].append(level)
+            data["text"].append(text)
+            data["left"].append(x)
+            data["top"].append(line * 18)
+            data["width"].append(width)
+            data["height"].append(14)
+            data["block_num"].append(1)
+            data["par_num"].append(1)
+            data["line_num"].append(line)
+    return data
+
+
+def old_find(d, text):
+    """
+    The matching part of find_text_in_image before TextLayout, without the drawing.
+    """
+    centers = []
+    for i in range(len(d["level"])):
+        if text.lower() in d["text"][i].lower():
+            start_index = d["text"][i].lower().find(text.lower())
+            start_percentage = start_index / len(d["text"][i])
+            left = d["left"][i] + int(d["width"][i] * start_percentage)
+            width = int(d["width"][i] * len(text) / len(d["text"][i]))
+            centers.append((left + width / 2, d["top"][i] + d["height"][i] / 2))
+
+    if not centers:
+        word_centers = []
+        for word in text.split():
+            for i in range(len(d["level"])):
+                if word.lower() in d["text"][i].lower():
+                    center = (
+                        d["left"][i] + d["width"][i] / 2,
+                        d["top"][i] + d["height"][i] / 2,
+                    )
+                    word_centers.append((center[0] / 2, center[1] / 2))
+
+        for center1 in word_centers:
+            for center2 in word_centers:
+                if (
+                    center1 != center2
+                    and (
+                        (center1[0] - center2[0]) ** 2 + (center1[1] - center2[1]) ** 2
+                    )
+                    ** 0.5
+                    <= 400
+                ):
+                    centers.append(
+                        ((center1[0] + center2[0]) / 2, (center1[1] + center2[1]) / 2)
+                    )
+                    break
+            if centers:
+                break
+    return centers
+
+
+def timed(function, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main(lines=200, words_per_line=40):
+    data = dense_screen(lines, words_per_line)
+    boxes = sum(1 for level in data["level"] if level == 5)
+    print(f"{boxes} word boxes on {lines} lines")
+
+    build_ms, layout = timed(lambda: TextLayout(data))
+    print(f"  build TextLayout: {build_ms:8.1f} ms (once per screenshot)")
+
+    queries = [
+        ("single word", "submit", None),
+        ("phrase", "sign in", None),
+        ("not on screen", "quarterly report", None),
+        ("OCR typo (fuzzy)", "setings", 0.8),
+    ]
+    for name, query, fuzzy in queries:
+        old_ms, _ = timed(lambda: old_find(data, query), repeat=1)
+        new_ms, found = timed(lambda: layout.find_text(query, fuzzy=fuzzy))
+        print(
+            f"  {name:18} old loop {old_ms:8.1f} ms   TextLayout {new_ms:7.2f} ms   ({len(found[0])} found)"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,64 @@
+"""
+Seconds per HTML and React screenshot: html2image (Chrome launched per render, PNG written to disk
+and read back) vs. the persistent renderer (one Chrome, pooled pages, PNG straight from Chrome).
+Needs Chrome. Set CHROME_BIN if it isn't on the PATH or in its usual place.
+
+    python tests/benchmarks/bench_html_renderer.py [renders]
+"""
+
+import sys
+import time
+
+from interpreter.core.computer.terminal.languages.react import (
+    screenshot_template,
+    template,
+)
+from interpreter.core.computer.utils.html_renderer import renderer
+from interpreter.core.computer.utils.html_to_png_base64 import html2image_png_base64
+
+HTML = "<h1>Sales</h1><table>" + "<tr><td>row</td><td>1</td></tr>" * 50 + "</table>"
+REACT = """
+function App() {
+    const [count] = React.useState(3);
+    return <ul>{[...Array(count)].map((_, i) => <li key={i}>Item {i}</li>)}</ul>;
+}
+ReactDOM.render(<App />, document.getElementById("root"));
+"""
+
+
+def timed(render, page, renders):
+    start = time.perf_counter()
+    for _ in range(renders):
+        render(page)
+    return (time.perf_counter() - start) / renders
+
+
+def main(renders=10):
+    start = time.perf_counter()
+    renderer.start()
+    print(f"starting Chrome: {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    local_template = screenshot_template()
+    print(f"React bundles (downloaded once): {time.perf_counter() - start:.2f} s")
+
+    pages = {
+        "HTML": (HTML, HTML),
+        "React": (
+            template.replace("{insert_react_code}", REACT),
+            local_template.replace("{insert_react_code}", REACT),
+        ),
+    }
+    print(f"seconds per screenshot, {renders} renders")
+    for name, (cdn_page, local_page) in pages.items():
+        old = timed(html2image_png_base64, cdn_page, renders)
+        new = timed(renderer.screenshot_base64, local_page, renders)
+        print(f"  {name}")
+        print(f"    html2image: {old:.3f}")
+        print(f"    renderer:   {new:.3f}")
+    print(renderer.stats)
+    renderer.quit()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
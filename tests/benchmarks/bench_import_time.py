@@ -0,0 +1,97 @@
+"""
+Times `from interpreter import interpreter` with `python -X importtime`, and fails if it goes over budget.
+
+Each run is a fresh interpreter process, so nothing is cached in sys.modules. We keep the fastest run,
+list the slowest modules it imported, and check that none of the heavy dependencies were really loaded.
+
+    python tests/benchmarks/bench_import_time.py [budget in ms] [runs]
+"""
+
+import subprocess
+import sys
+
+STATEMENT = "from interpreter import interpreter"
+
+# These should only be imported when they're used. Lazily imported modules are placeholders
+# in sys.modules until then, so check their type rather than whether they're there
+HEAVY = [
+    "litellm",
+    "openai",
+    "requests",
+    "jupyter_client",
+    "IPython",
+    "PIL.Image",
+    "selenium",
+    "matplotlib",
+    "fastapi",
+    "uvicorn",
+    "inquirer",
+    "psutil",
+    "pkg_resources",
+    "html2image",
+]
+
+CHECK_LOADED = f"""
+import sys
+{STATEMENT}
+print(",".join(
+    name for name in {HEAVY!r}
+    if name in sys.modules and type(sys.modules[name]).__name__ != "_LazyModule"
+))
+"""
+
+
+def import_times():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STATEMENT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main(budget_ms=400, runs=5):
+    fastest = None
+    for _ in range(runs):
+        times = import_times()
+        if fastest is None or times["interpreter"][1] < fastest["interpreter"][1]:
+            fastest = times
+
+    total_ms = fastest["interpreter"][1] / 1000
+    print(f"{STATEMENT}: {total_ms:.0f} ms (fastest of {runs}, budget {budget_ms} ms)")
+
+    print("  slowest modules (self time):")
+    slowest = sorted(fastest.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in slowest[:10]:
+        print(f"    {self_us / 1000:7.1f} ms  {name}")
+
+    loaded = subprocess.run(
+        [sys.executable, "-c", CHECK_LOADED],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+    failed = False
+    if loaded:
+        print(f"  FAIL: imported eagerly: {loaded}")
+        failed = True
+    if total_ms > budget_ms:
+        print(f"  FAIL: over budget by {total_ms - budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("  OK")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
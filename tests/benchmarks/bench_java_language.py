@@ -0,0 +1,78 @@
+"""
+Seconds per Java run: javac and a new JVM for every run (what Java.run used to do) vs. the warm runner,
+for the first run, the same code again (compiled classes cached by hash), and changed code.
+Needs a JDK.
+
+    python tests/benchmarks/bench_java_language.py [runs]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from interpreter.core.computer.terminal.languages.java import Java
+
+CODE = """public class Main {
+    public static void main(String[] args) {
+        long total = 0;
+        for (int i = 0; i < %d; i++) {
+            total += i;
+        }
+        System.out.println(total);
+    }
+}"""
+
+
+def javac_and_java(code):
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "Main.java"), "w") as f:
+            f.write(code)
+        subprocess.run(["javac", "Main.java"], cwd=directory, check=True)
+        return subprocess.run(
+            ["java", "Main"], cwd=directory, capture_output=True, text=True
+        ).stdout
+
+
+def runner(java, code):
+    return "".join(
+        str(chunk["content"])
+        for chunk in java.run(code)
+        if chunk.get("format") == "output"
+    )
+
+
+def timed(run, runs, code_for_run):
+    start = time.perf_counter()
+    for i in range(runs):
+        output = run(code_for_run(i))
+    return (time.perf_counter() - start) / runs, output.strip()
+
+
+def main(runs=5):
+    java = Java()
+    java.cache_dir = tempfile.mkdtemp()
+
+    start = time.perf_counter()
+    java.warm()
+    print(
+        f"starting the runner (compiles it the first time): {time.perf_counter() - start:.2f} s"
+    )
+
+    print(f"seconds per run, {runs} runs")
+    old, output = timed(javac_and_java, runs, lambda i: CODE % 1000)
+    print(f"  javac + java:           {old:.3f}  ({output})")
+    first, output = timed(lambda code: runner(java, code), 1, lambda i: CODE % 1000)
+    print(f"  runner, first run:      {first:.3f}  ({output})")
+    same, output = timed(lambda code: runner(java, code), runs, lambda i: CODE % 1000)
+    print(f"  runner, same code:      {same:.3f}  ({output})")
+    changed, output = timed(
+        lambda code: runner(java, code), runs, lambda i: CODE % (2000 + i)
+    )
+    print(f"  runner, changed code:   {changed:.3f}  ({output})")
+    java.terminate()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,138 @@
+"""
+Load-tests the OpenAI-compatible streaming endpoint with a local stub LLM (no API key, no network).
+
+Opens several streams at once, each in its own session, while pinging /heartbeat.
+If streams run concurrently, the wall time is close to a single stream's, and the
+heartbeat stays fast even though the stub LLM blocks between tokens.
+
+    python tests/benchmarks/bench_openai_server.py [streams] [tokens per stream]
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+import httpx
+
+from interpreter import AsyncInterpreter
+
+TOKEN_DELAY = 0.02
+
+
+def stub_completions(tokens):
+    def completions(**params):
+        for i in range(tokens):
+            # Blocks, like a real LLM client does while it waits on the network
+            time.sleep(TOKEN_DELAY)
+            yield {"choices": [{"delta": {"content": f"word{i} "}}]}
+
+    return completions
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def stream(client, session_id):
+    start = time.perf_counter()
+    chunks = []
+    usage = None
+    async with client.stream(
+        "POST",
+        "/openai/chat/completions",
+        headers={"X-Session-ID": session_id},
+        json={"messages": [{"role": "user", "content": "hi"}], "stream": True},
+    ) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            chunk = json.loads(line[len("data: ") :])
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+            elif chunk["choices"][0]["delta"].get("content"):
+                chunks.append(time.perf_counter() - start)
+    return chunks, usage
+
+
+async def heartbeat(client, stop):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/heartbeat")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+async def load_test(port, streams):
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", timeout=60
+    ) as client:
+        stop = asyncio.Event()
+        pinger = asyncio.create_task(heartbeat(client, stop))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *[stream(client, f"session-{i}") for i in range(streams)]
+        )
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        return elapsed, results, await pinger
+
+
+def main(streams=8, tokens=50):
+    interpreter = AsyncInterpreter()
+    interpreter.llm.completions = stub_completions(tokens)
+    interpreter.llm.model = "stub"
+    interpreter.llm.supports_functions = False
+    interpreter.llm.supports_vision = False
+    interpreter.llm.context_window = 8000
+    interpreter.llm.max_tokens = 1000
+    interpreter.context_mode = False
+    interpreter.conversation_history = False
+    interpreter.disable_telemetry = True
+
+    # Enough workers that every stream can respond at once
+    os.environ["INTERPRETER_MAX_WORKERS"] = str(streams)
+
+    port = free_port()
+    server = interpreter.server
+    server.port = port
+    logging.getLogger("uvicorn.access").disabled = True
+    threading.Thread(target=server.uvicorn_server.run, daemon=True).start()
+    while not server.uvicorn_server.started:
+        time.sleep(0.05)
+
+    # The server displays what it streams. Keep that out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed, results, latencies = asyncio.run(load_test(port, streams))
+
+    single = tokens * TOKEN_DELAY
+    print(f"{streams} streams of {tokens} tokens ({single:.2f} s each if run alone)")
+    print(
+        f"  wall time:        {elapsed:.2f} s (serial would be {single * streams:.2f} s)"
+    )
+    for i, (chunks, usage) in enumerate(results):
+        print(
+            f"  stream {i}: {len(chunks)} chunks, first at {chunks[0]:.2f} s, last at {chunks[-1]:.2f} s, usage {usage}"
+        )
+    print(
+        f"  heartbeat:        {len(latencies)} pings, max {max(latencies) * 1000:.1f} ms"
+    )
+
+    server.uvicorn_server.should_exit = True
+    server.sessions.shutdown()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,63 @@
+"""
+Compares streaming tool call arguments through `parse_partial_json` (re-parsing everything
+on every delta, like the LLM runners used to) against `PartialJSONParser`.
+
+    python tests/benchmarks/bench_parse_partial_json.py [lines of code]
+"""
+
+import json
+import sys
+import time
+
+from interpreter.core.llm.utils.parse_partial_json import (
+    PartialJSONParser,
+    parse_partial_json,
+)
+
+
+def make_deltas(lines):
+    code = "\n".join(
+        f'print("line {i}", {{"value": {i}}})  # \\ "quoted"' for i in range(lines)
+    )
+    arguments = json.dumps({"language": "python", "code": code})
+    # LLMs stream a few characters at a time
+    return code, [arguments[i : i + 4] for i in range(0, len(arguments), 4)]
+
+
+def reparse(deltas):
+    accumulated = ""
+    code = ""
+    for delta in deltas:
+        accumulated += delta
+        arguments = parse_partial_json(accumulated)
+        if arguments and "code" in arguments:
+            code = arguments["code"]
+    return code
+
+
+def incremental(deltas):
+    parser = PartialJSONParser()
+    pieces = []
+    for delta in deltas:
+        parser.feed(delta)
+        pieces.append(parser.read("code"))
+    return "".join(pieces)
+
+
+def main(lines=300):
+    code, deltas = make_deltas(lines)
+    print(f"{lines} lines of code, {len(deltas)} deltas")
+
+    for name, function in [
+        ("parse_partial_json", reparse),
+        ("PartialJSONParser", incremental),
+    ]:
+        start = time.perf_counter()
+        result = function(deltas)
+        elapsed = time.perf_counter() - start
+        assert result == code, name
+        print(f"  {name:<20} {elapsed * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
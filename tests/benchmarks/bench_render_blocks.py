@@ -0,0 +1,132 @@
+"""
+Streams a long script into a CodeBlock and a long answer into a MessageBlock a few characters
+at a time, one chunk a millisecond, the way terminal_interface does with a fast model.
+Reports the CPU time spent drawing, for the old refresh (everything rebuilt and drawn on every chunk),
+the cached render on every chunk, and the cached render at max_fps.
+
+Output goes to an in-memory terminal, so this times building and drawing, not the terminal.
+The old refresh is quadratic, so a 500-line script takes minutes.
+
+    python tests/benchmarks/bench_render_blocks.py [lines] [max fps]
+"""
+
+import io
+import sys
+import time
+
+from rich.box import MINIMAL
+from rich.console import Console, Group
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.panel import Panel
+from rich.syntax import Syntax
+from rich.table import Table
+
+from interpreter.terminal_interface.components.base_block import BaseBlock
+from interpreter.terminal_interface.components.code_block import CodeBlock
+from interpreter.terminal_interface.components.message_block import (
+    MessageBlock,
+    textify_markdown_code_blocks,
+)
+
+
+def old_code(block, cursor=True):
+    # CodeBlock.refresh before the render cache: a new Syntax for every line, every chunk
+    code = block.code + ("●" if cursor else "")
+    code_table = Table(
+        show_header=False, show_footer=False, box=None, padding=0, expand=True
+    )
+    code_table.add_column()
+    for line in code.strip().split("\n"):
+        code_table.add_row(
+            Syntax(
+                line,
+                block.language,
+                theme="monokai",
+                line_numbers=False,
+                word_wrap=True,
+            )
+        )
+    return Group(Panel(code_table, box=MINIMAL, style="on #272722"), "")
+
+
+def old_message(block, cursor=True):
+    # MessageBlock.refresh before the render cache: the whole message parsed and drawn every chunk
+    content = textify_markdown_code_blocks(block.message) + ("●" if cursor else "")
+    return Panel(Markdown(content.strip()), box=MINIMAL)
+
+
+def script(lines):
+    return "\n".join(
+        f"def step_{i}(x):\n    return [x * {i} for _ in range(10)]  # step {i}"
+        for i in range(lines // 2)
+    )
+
+
+def answer(lines):
+    paragraphs = []
+    for i in range(lines // 4):
+        paragraphs.append(
+            f"Step **{i}** looks at the `data` and prints what it finds.\n\n"
+            f"- first item {i}\n- second item {i}\n"
+        )
+    return "\n".join(paragraphs)
+
+
+def on_test_terminal(block):
+    block.live.stop()
+    console = Console(file=io.StringIO(), force_terminal=True, width=100)
+    block.live = Live(auto_refresh=False, console=console, vertical_overflow="visible")
+    block.live.start()
+    return block
+
+
+def stream(block, attribute, text, old=None, chunk_size=4, delay=0.001):
+    start = time.process_time()
+    for i in range(0, len(text), chunk_size):
+        setattr(block, attribute, text[: i + chunk_size])
+        if old:
+            block.live.update(old(block))
+            block.live.refresh()
+        else:
+            block.refresh()
+        time.sleep(delay)
+    block.end()
+    return time.process_time() - start
+
+
+def main(lines=200, max_fps=30):
+    code = script(lines)
+    message = answer(lines)
+
+    print(f"{lines} lines in chunks of 4 characters, CPU seconds")
+    for name, make, attribute, text, old in [
+        ("CodeBlock", CodeBlock, "code", code, old_code),
+        ("MessageBlock", MessageBlock, "message", message, old_message),
+    ]:
+        BaseBlock.max_fps = 0
+        block = on_test_terminal(make())
+        block.language = "python"
+        before = stream(block, attribute, text, old)
+
+        BaseBlock.max_fps = 0
+        block = on_test_terminal(make())
+        block.language = "python"
+        cached = stream(block, attribute, text)
+
+        BaseBlock.max_fps = max_fps
+        block = on_test_terminal(make())
+        block.language = "python"
+        limited = stream(block, attribute, text)
+
+        print(f"  {name} ({len(text) // 4} chunks)")
+        print(f"    old, every chunk:    {before:.2f} s")
+        print(f"    cached, every chunk: {cached:.2f} s")
+        print(f"    cached, {max_fps:g} fps:      {limited:.2f} s")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 30,
+    )
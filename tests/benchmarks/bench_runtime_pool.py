@@ -0,0 +1,79 @@
+"""
+Time to first output of `print(computer.os)` (and `echo 1`), with and without the runtime pool:
+cold (started when the code arrives), warmed ahead of time, after a reset, and after the kernel crashes.
+The computer API is imported, like in the default profile.
+
+    python tests/benchmarks/bench_runtime_pool.py
+"""
+
+import time
+
+from interpreter import OpenInterpreter
+
+CODE = {"python": "print(computer.os)", "shell": "echo 1"}
+
+
+def run(terminal, language, code=None):
+    """
+    Runs the code. Returns how long its first output took (including starting the language,
+    and importing the computer API for Python), and the output.
+    """
+    start = time.perf_counter()
+    seconds = None
+    output = ""
+    for chunk in terminal.run(language, code or CODE[language], stream=True):
+        if chunk.get("format") != "active_line":
+            if seconds is None:
+                seconds = time.perf_counter() - start
+            output += str(chunk.get("content"))
+    return seconds, output.strip()
+
+
+def wait_until_warm(terminal):
+    for spare in list(terminal.runtimes.spares.values()):
+        spare["ready"].wait()
+    # Give the kernel a moment to finish what warm() queued on it
+    time.sleep(2)
+
+
+def main():
+    interpreter = OpenInterpreter(import_computer_api=True)
+    terminal = interpreter.computer.terminal
+
+    print("time to first output")
+    for language in CODE:
+        terminal.warm_languages = []
+        cold, _ = run(terminal, language)
+        terminal.terminate()
+
+        terminal.warm_languages = [language]
+        terminal.warm()
+        wait_until_warm(terminal)
+        warm, _ = run(terminal, language)
+
+        # reset() keeps the spare that taking the first one started
+        wait_until_warm(terminal)
+        terminal.terminate(keep_warm=True)
+        after_reset, _ = run(terminal, language)
+
+        print(f"  {language}")
+        print(f"    cold:        {cold * 1000:8.1f} ms")
+        print(f"    warmed:      {warm * 1000:8.1f} ms")
+        print(f"    after reset: {after_reset * 1000:8.1f} ms")
+
+        if language == "python":
+            wait_until_warm(terminal)
+            run(terminal, "python", "import os; os._exit(1)")
+            time.sleep(1)
+            after_crash, output = run(terminal, "python")
+            print(f"    after crash: {after_crash * 1000:8.1f} ms  ({output})")
+
+        terminal.terminate()
+
+    print("metrics")
+    for language, metrics in terminal.runtimes.metrics.items():
+        print(f"  {language}: {metrics}")
+
+
+if __name__ == "__main__":
+    main()
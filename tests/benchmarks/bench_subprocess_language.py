@@ -0,0 +1,41 @@
+"""
+Measures the round-trip latency of running `echo hi` through the Shell language.
+
+    python tests/benchmarks/bench_subprocess_language.py [runs]
+"""
+
+import statistics
+import sys
+import time
+
+from interpreter.core.computer.terminal.languages.shell import Shell
+
+
+def main(runs=50):
+    shell = Shell()
+
+    # The first run also starts the process. Don't count it.
+    list(shell.run("echo hi"))
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = "".join(
+            chunk["content"]
+            for chunk in shell.run("echo hi")
+            if chunk["format"] == "output"
+        )
+        timings.append(time.perf_counter() - start)
+        assert output.strip() == "hi", output
+
+    shell.terminate()
+
+    timings.sort()
+    print(f"echo hi, {runs} runs")
+    print(f"  median: {statistics.median(timings) * 1000:.2f} ms")
+    print(f"  p95:    {timings[int(len(timings) * 0.95) - 1] * 1000:.2f} ms")
+    print(f"  max:    {timings[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
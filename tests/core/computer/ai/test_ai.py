@@ -0,0 +1,95 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+from interpreter.core.computer.ai.ai import MapReduce, complete
+from interpreter.core.llm.llm import Llm
+
+
+class StubLlm:
+    """
+    Answers with the first word of each chunk, and records what it was asked.
+    """
+
+    def __init__(self, fail_first=0):
+        self.model = "stub"
+        self.api_key = None
+        self.calls = []
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+
+    def resolve_model(self):
+        return self.model
+
+    def completions(self, **params):
+        with self.lock:
+            self.calls.append(params["messages"][1]["content"])
+            if self.fail_first:
+                self.fail_first -= 1
+                raise ConnectionError("flaky")
+        words = params["messages"][1]["content"].split()
+        yield {"choices": [{"delta": {"content": words[0]}}]}
+
+
+class TestMapReduce(unittest.TestCase):
+    def setUp(self):
+        self.llm = StubLlm()
+        self.map_reduce = MapReduce(self.llm, max_workers=4, retry_delay=0)
+
+    def test_maps_in_order_and_reduces_to_one(self):
+        text = "".join(f"{i:03d}" + "x" * 37 for i in range(20))
+        result = self.map_reduce.run(text, "first word", chunk_size=10, overlap=0)
+
+        self.assertEqual(self.map_reduce.map("first word", ["b c", "a c"]), ["b", "a"])
+        self.assertEqual(result, "000" + "x" * 37)
+
+    def test_only_sends_changed_chunks(self):
+        chunks = [f"chunk{i} text" for i in range(6)]
+        self.map_reduce.map("prompt", chunks)
+        self.llm.calls.clear()
+
+        chunks[3] = "changed text"
+        answers = self.map_reduce.map("prompt", chunks + ["changed text"])
+
+        self.assertEqual(self.llm.calls, ["changed text"])
+        self.assertEqual(answers[3], "changed")
+        self.assertEqual(answers[-1], "changed")
+
+    def test_retries_failed_chunks(self):
+        self.llm.fail_first = 2
+        self.assertEqual(self.map_reduce.map("prompt", ["a b"]), ["a"])
+
+        self.llm.fail_first = 3
+        with self.assertRaises(ConnectionError):
+            self.map_reduce.map("prompt", ["c d"])
+
+    def test_reduce_always_shrinks(self):
+        # Every answer is longer than the budget, so nothing can be grouped by size
+        answers = ["y" * 100 + f" {i}" for i in range(5)]
+        result = self.map_reduce.reduce("merge", answers, max_tokens=1)
+        self.assertEqual(result, "y" * 100)
+        self.assertLessEqual(len(self.llm.calls), 5)
+
+
+class TestComplete(unittest.TestCase):
+    def test_resolves_the_model_like_a_chat_would(self):
+        llm = Llm(SimpleNamespace())
+        llm.model = "i"
+        sent = []
+
+        def completions(**params):
+            sent.append(params)
+            yield {"choices": [{"delta": {"content": "hi"}}]}
+
+        llm.completions = completions
+
+        self.assertEqual(complete(llm, "system", "hello"), "hi")
+        self.assertEqual(sent[0]["model"], "openai/i")
+        self.assertEqual(sent[0]["api_base"], "https://api.openinterpreter.com/v0")
+        self.assertEqual(sent[0]["api_key"], "x")
+        self.assertEqual(sent[0]["max_tokens"], 1000)
+        self.assertEqual(sent[0]["conversation_id"], llm.interpreter.conversation_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from interpreter.core.computer.display.point import point
+from interpreter.core.computer.utils.embedding_store import EmbeddingStore
+
+
+class TestImageSearch(unittest.TestCase):
+    def test_a_full_store_keeps_the_icons_on_screen(self):
+        with tempfile.TemporaryDirectory() as path:
+            hashes = EmbeddingStore(path, max_entries=3)
+            # "old" is on screen, and the least recently used
+            hashes.add(["old", "gone1", "gone2"], np.eye(4)[[0, 2, 3]])
+            icons = [{"hash": "old", "data": "old"}, {"hash": "new", "data": "new"}]
+
+            def embed(items, debug):
+                # The query looks like "old"
+                return np.eye(4)[
+                    [0 if item in ["query", "old"] else 1 for item in items]
+                ]
+
+            with mock.patch.object(point, "embed", embed):
+                found = point.image_search("query", icons, hashes, debug=False)
+
+            self.assertEqual(found[0]["hash"], "old")
+            self.assertNotIn("gone1", hashes)
+
+
+if __name__ == "__main__":
+    unittest.main()
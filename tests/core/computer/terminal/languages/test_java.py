@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from interpreter.core.computer.terminal.languages.java import (
+    Java,
+    main_class,
+    preprocess_java,
+)
+
+CODE = """class Helper {
+    static int[] numbers = {1, 2, 3};
+    Helper() {
+        super();
+        System.out.println("made");
+    }
+}
+
+public class Main {
+    public static void main(String[] args) {
+        int total = 0; // {
+        for (int i = 0; i < 3; i++) {
+            total += Helper.numbers[i];
+        }
+        Runnable r = new Runnable() {
+            public void run() {
+                System.out.println("}");
+            }
+        };
+        switch (total) {
+            case 6:
+                r.run();
+                break;
+        }
+        do {
+            total--;
+        }
+        while (total > 0);
+        String text = String.join(",",
+            "a");
+    }
+}"""
+
+
+class TestJava(unittest.TestCase):
+    def test_active_lines_mark_statements_only(self):
+        processed = preprocess_java(CODE).split("\n")
+        self.assertEqual(len(processed), len(CODE.split("\n")))
+
+        marked = [
+            i for i, line in enumerate(processed, 1) if f"##active_line{i}##" in line
+        ]
+        self.assertEqual(marked, [5, 11, 12, 13, 15, 17, 20, 22, 23, 25, 26, 29])
+        # Same line, same indentation
+        self.assertEqual(
+            processed[10],
+            '        System.out.println("##active_line11##"); int total = 0; // {',
+        )
+
+    def test_main_class_and_file_name(self):
+        self.assertEqual(main_class(CODE), ("Main", "Main.java"))
+        self.assertEqual(
+            main_class("class A {}\nclass B { static void main(String[] a) {} }"),
+            ("B", "B.java"),
+        )
+
+    def test_cache_keeps_the_most_recently_run_snippets(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            java = Java()
+            java.cache_dir = cache_dir
+            java.max_cached_snippets = 2
+
+            snippets = []
+            for i in range(3):
+                code = f"class Main{i} {{}}"
+                snippet_dir = java.preprocess_code(code).split("\t")[0]
+                # As if the runner compiled it, a while ago
+                open(os.path.join(snippet_dir, "compiled"), "w").close()
+                os.utime(snippet_dir, (i, i))
+                snippets.append((code, snippet_dir))
+
+            # The first one runs again
+            java.preprocess_code(snippets[0][0])
+            java.prune_cache()
+
+            kept = [os.path.exists(snippet_dir) for _, snippet_dir in snippets]
+            self.assertEqual(kept, [True, False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from interpreter.core.computer.terminal.languages.jupyter_language import (
+    END_OF_EXECUTION,
+    JupyterLanguage,
+)
+
+
+def output(content):
+    return {"type": "console", "format": "output", "content": content}
+
+
+def iopub(msg_id, msg_type, content):
+    return {
+        "header": {"msg_type": msg_type},
+        "msg_type": msg_type,
+        "parent_header": {"msg_id": msg_id},
+        "content": content,
+    }
+
+
+def stream(msg_id, text):
+    return iopub(msg_id, "stream", {"name": "stdout", "text": text})
+
+
+def idle(msg_id):
+    return iopub(msg_id, "status", {"execution_state": "idle"})
+
+
+def drain(message_queue):
+    chunks = []
+    while not message_queue.empty():
+        chunks.append(message_queue.get_nowait())
+    return chunks
+
+
+class FakeIopubChannel:
+    """
+    Hands out the messages it was given, then stops the dispatcher.
+    """
+
+    def __init__(self, language, messages):
+        self.language = language
+        self.messages = list(messages)
+
+    def get_msg(self, timeout=None):
+        if not self.messages:
+            self.language._terminated = True
+            raise queue.Empty
+        return self.messages.pop(0)
+
+
+class TestCaptureOutput(unittest.TestCase):
+    def setUp(self):
+        # No kernel needed to test how queued chunks come out
+        self.language = JupyterLanguage.__new__(JupyterLanguage)
+
+    def test_adjacent_output_is_batched(self):
+        # Arrange
+        message_queue = queue.Queue()
+        active_line = {"type": "console", "format": "active_line", "content": 2}
+        for chunk in [
+            output("a"),
+            output("b"),
+            active_line,
+            output("c"),
+            END_OF_EXECUTION,
+        ]:
+            message_queue.put(chunk)
+
+        # Act
+        chunks = list(self.language._capture_output(message_queue))
+
+        # Assert
+        self.assertEqual(chunks, [output("ab"), active_line, output("c")])
+
+
+class TestDispatchIopubMessages(unittest.TestCase):
+    def setUp(self):
+        # No kernel either: the dispatcher reads a fake iopub channel
+        self.language = JupyterLanguage.__new__(JupyterLanguage)
+        self.language.computer = SimpleNamespace(interpreter=SimpleNamespace())
+        self.language.km = SimpleNamespace(is_alive=lambda: True)
+        self.language.finish_flag = False
+        self.language._executions = {}
+        self.language._executions_lock = threading.Lock()
+        self.language._terminated = False
+        self.language.last_output_time = time.time()
+        self.language.last_output_message_time = time.time()
+
+    def dispatch(self, messages):
+        self.language.kc = SimpleNamespace(
+            iopub_channel=FakeIopubChannel(self.language, messages)
+        )
+        self.language._dispatch_iopub_messages()
+
+    def test_interleaved_messages_go_to_their_own_execution(self):
+        first, second = queue.Queue(), queue.Queue()
+        self.language._executions = {"first": first, "second": second}
+
+        self.dispatch(
+            [
+                stream("first", "1a"),
+                stream("second", "2a"),
+                stream("first", "1b"),
+                idle("second"),
+                stream("first", "1c"),
+                idle("first"),
+            ]
+        )
+
+        self.assertEqual(
+            drain(first), [output("1a"), output("1b"), output("1c"), END_OF_EXECUTION]
+        )
+        self.assertEqual(drain(second), [output("2a"), END_OF_EXECUTION])
+        self.assertEqual(self.language._executions, {})
+
+    def test_messages_for_stopped_or_unknown_executions_are_dropped(self):
+        stopped, following = queue.Queue(), queue.Queue()
+        self.language._executions = {"stopped": stopped}
+        self.language._end_execution("stopped")
+        self.language._executions["following"] = following
+
+        self.dispatch(
+            [
+                # Still coming from the stopped one, after it ended
+                stream("stopped", "late"),
+                idle("stopped"),
+                stream("unknown", "not ours"),
+                stream("following", "mine"),
+                idle("following"),
+            ]
+        )
+
+        self.assertEqual(drain(stopped), [END_OF_EXECUTION])
+        self.assertEqual(drain(following), [output("mine"), END_OF_EXECUTION])
@@ -0,0 +1,87 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from interpreter.core.computer.terminal.languages import react
+
+
+class TestReactTemplate(unittest.TestCase):
+    def setUp(self):
+        self.storage = tempfile.mkdtemp()
+        self.get_storage_path = react.get_storage_path
+        react.get_storage_path = lambda subdirectory: os.path.join(
+            self.storage, subdirectory
+        )
+        react._screenshot_template = None
+
+    def tearDown(self):
+        react.get_storage_path = self.get_storage_path
+        react._screenshot_template = None
+        shutil.rmtree(self.storage)
+
+    def test_screenshots_inline_the_vendored_bundles(self):
+        os.makedirs(os.path.join(self.storage, "vendor"))
+        digests = {}
+        for path in react.bundles.values():
+            source = f'var source = "{path}</script>";'
+            file = os.path.join(self.storage, "vendor", path.replace("/", "_"))
+            with open(file, "w") as f:
+                f.write(source)
+            digests[path] = hashlib.sha256(source.encode()).hexdigest()
+
+        with mock.patch.dict(react.bundle_sha256, digests):
+            page = react.screenshot_template()
+        self.assertNotIn("unpkg.com", page)
+        self.assertIn('var source = "react@17.0.2/umd/react.production.min.js', page)
+        # Only the template's own tags end a script
+        self.assertEqual(page.count("</script>"), len(react.bundles) + 1)
+        self.assertIn("{insert_react_code}", page)
+        self.assertIs(react.screenshot_template(), page)
+
+    def test_falls_back_to_the_cdn_when_the_bundles_cant_be_downloaded(self):
+        def offline(path):
+            raise OSError("No network")
+
+        vendored = react.vendored
+        react.vendored = offline
+        try:
+            self.assertEqual(react.screenshot_template(), react.template)
+        finally:
+            react.vendored = vendored
+
+    def test_only_bundles_matching_their_pinned_sha256_are_used(self):
+        path = "react@17.0.2/umd/react.production.min.js"
+        file = os.path.join(self.storage, "vendor", path.replace("/", "_"))
+        served = [b"var good;"]
+        digest = hashlib.sha256(b"var good;").hexdigest()
+
+        with mock.patch.dict(react.bundle_sha256, {path: digest}), mock.patch.object(
+            react.urllib.request,
+            "urlopen",
+            lambda *args, **kwargs: io.BytesIO(served[0]),
+        ):
+            self.assertEqual(react.vendored(path), "var good;")
+
+            # Changed on disk, so it's downloaded again
+            with open(file, "w") as f:
+                f.write("var tampered;")
+            self.assertEqual(react.vendored(path), "var good;")
+
+            # Changed on the CDN, so it's not used, or cached
+            os.remove(file)
+            served[0] = b"var changed;"
+            with self.assertRaises(ValueError):
+                react.vendored(path)
+            self.assertFalse(os.path.exists(file))
+
+        with mock.patch.dict(react.bundle_sha256, {path: None}):
+            with self.assertRaises(ValueError):
+                react.vendored(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
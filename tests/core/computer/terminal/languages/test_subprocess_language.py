@@ -0,0 +1,61 @@
+import shutil
+import time
+import unittest
+
+from interpreter.core.computer.terminal.languages.shell import Shell
+from interpreter.core.computer.terminal.languages.subprocess_language import (
+    LineSplitter,
+)
+
+
+class TestLineSplitter(unittest.TestCase):
+    def test_splits_like_readline(self):
+        splitter = LineSplitter(is_error_stream=False)
+
+        self.assertEqual(splitter.feed(b"one\ntw"), ["one\n"])
+        self.assertEqual(splitter.feed(b"o\r\nthree\rfo"), ["two\n", "three\n"])
+        self.assertEqual(splitter.feed(b"ur", final=True), ["four"])
+
+    def test_multibyte_characters_across_reads(self):
+        splitter = LineSplitter(is_error_stream=False)
+        data = "héllo\n".encode("utf-8")
+
+        self.assertEqual(splitter.feed(data[:2]), [])
+        self.assertEqual(splitter.feed(data[2:]), ["héllo\n"])
+
+
+@unittest.skipUnless(shutil.which("bash"), "requires bash")
+class TestShell(unittest.TestCase):
+    def setUp(self):
+        self.shell = Shell()
+        self.shell.start_cmd = ["bash"]
+
+    def tearDown(self):
+        self.shell.terminate()
+
+    def test_run_returns_stdout_and_stderr(self):
+        # Act
+        chunks = list(self.shell.run("echo hi\necho oops 1>&2"))
+
+        # Assert
+        output = "".join(c["content"] for c in chunks if c["format"] == "output")
+        active_lines = [c["content"] for c in chunks if c["format"] == "active_line"]
+        self.assertIn("hi\n", output)
+        self.assertIn("oops\n", output)
+        self.assertEqual(active_lines, [1, 2])
+
+    def test_consecutive_runs_do_not_bleed_into_each_other(self):
+        first = list(self.shell.run("echo first"))
+        second = list(self.shell.run("echo second"))
+
+        self.assertNotIn("second", str(first))
+        self.assertNotIn("first", str(second))
+
+    def test_a_run_ended_twice_does_not_end_the_next_one(self):
+        # Ends at the KeyboardInterrupt, then again at the real end marker
+        list(self.shell.run("echo KeyboardInterrupt 1>&2; sleep 0.2"))
+        time.sleep(0.5)
+
+        for i in range(5):
+            output = str(list(self.shell.run(f"echo run {i}")))
+            self.assertIn(f"run {i}", output)
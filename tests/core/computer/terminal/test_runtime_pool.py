@@ -0,0 +1,66 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+from interpreter.core.computer.terminal.runtime_pool import RuntimePool
+
+
+class SlowLanguage:
+    name = "Slow"
+    started = threading.Event()
+
+    def __init__(self, computer):
+        self.computer = computer
+        self.warmed = False
+        self.terminated = False
+        # Starting waits until the test says so
+        SlowLanguage.started.wait(5)
+
+    def warm(self):
+        self.warmed = True
+
+    def terminate(self):
+        self.terminated = True
+
+
+class TestRuntimePool(unittest.TestCase):
+    def setUp(self):
+        SlowLanguage.started = threading.Event()
+        terminal = SimpleNamespace(
+            warm_languages=["slow"],
+            get_language=lambda name: SlowLanguage if name == "slow" else None,
+        )
+        self.computer = SimpleNamespace(terminal=terminal, debug=False)
+        self.pool = RuntimePool(self.computer)
+
+    def test_take_hands_over_the_warm_one_and_warms_a_spare(self):
+        self.pool.warm(SlowLanguage)
+        SlowLanguage.started.set()
+
+        instance = self.pool.take(SlowLanguage)
+        self.assertTrue(instance.warmed)
+        self.assertIs(instance.computer, self.computer)
+
+        # A spare is on its way, for a reset or a crash
+        self.assertIn(SlowLanguage, self.pool.spares)
+        spare = self.pool.spares[SlowLanguage]
+        spare["ready"].wait(5)
+        self.assertIsNot(self.pool.take(SlowLanguage), instance)
+
+        metrics = self.pool.metrics["Slow"]
+        self.assertEqual(metrics["starts"], 3)
+        self.assertIsNotNone(metrics["wait_seconds"])
+
+    def test_terminate_shuts_down_spares_still_starting(self):
+        self.pool.warm(SlowLanguage)
+        spare = self.pool.spares[SlowLanguage]
+        self.pool.terminate()
+        self.assertEqual(self.pool.spares, {})
+
+        SlowLanguage.started.set()
+        spare["ready"].wait(5)
+        self.assertTrue(spare["instance"].terminated)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Stands in for headless Chrome in the HtmlRenderer tests. Started the way Chrome would be, it writes
+DevToolsActivePort to --user-data-dir and answers the DevTools commands HtmlRenderer sends.
+
+Each command is answered on its own thread, Runtime.evaluate after a delay, so replies come back out
+of order. A "screenshot" is the page's HTML, base64 encoded. HTML containing CRASH kills the process.
+"""
+
+import base64
+import hashlib
+import itertools
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+targets = itertools.count(1)
+pages = {}
+
+
+def handshake(connection):
+    request = b""
+    while b"\r\n\r\n" not in request:
+        request += connection.recv(4096)
+    headers = dict(
+        line.split(": ", 1)
+        for line in request.decode().split("\r\n")[1:]
+        if ": " in line
+    )
+    accept = base64.b64encode(
+        hashlib.sha1((headers["Sec-WebSocket-Key"] + WEBSOCKET_GUID).encode()).digest()
+    ).decode()
+    connection.sendall(
+        (
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode()
+    )
+
+
+def read_exactly(connection, size):
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError
+        data += chunk
+    return data
+
+
+def read_frame(connection):
+    first, second = read_exactly(connection, 2)
+    if first & 0x0F == 0x8:
+        raise ConnectionError  # Close
+    size = second & 0x7F
+    if size == 126:
+        size = struct.unpack(">H", read_exactly(connection, 2))[0]
+    elif size == 127:
+        size = struct.unpack(">Q", read_exactly(connection, 8))[0]
+    # Frames from clients are always masked
+    mask = read_exactly(connection, 4)
+    payload = read_exactly(connection, size)
+    return bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload)).decode()
+
+
+def send_frame(connection, lock, text):
+    payload = text.encode()
+    if len(payload) < 126:
+        header = struct.pack(">BB", 0x81, len(payload))
+    elif len(payload) < 65536:
+        header = struct.pack(">BBH", 0x81, 126, len(payload))
+    else:
+        header = struct.pack(">BBQ", 0x81, 127, len(payload))
+    with lock:
+        connection.sendall(header + payload)
+
+
+def answer(message):
+    method, params = message["method"], message["params"]
+    session = message.get("sessionId")
+    if method == "Target.createTarget":
+        return {"targetId": f"target-{next(targets)}"}
+    if method == "Target.attachToTarget":
+        return {"sessionId": "session-" + params["targetId"]}
+    if method == "Page.getFrameTree":
+        return {"frameTree": {"frame": {"id": session}}}
+    if method == "Page.setDocumentContent":
+        if "CRASH" in params["html"]:
+            os._exit(1)
+        pages[session] = params["html"]
+    if method == "Runtime.evaluate":
+        time.sleep(0.05)
+    if method == "Page.captureScreenshot":
+        return {"data": base64.b64encode(pages[session].encode()).decode()}
+    return {}
+
+
+def serve(connection):
+    lock = threading.Lock()
+    handshake(connection)
+
+    def reply(message):
+        response = {"id": message["id"], "result": answer(message)}
+        send_frame(connection, lock, json.dumps(response))
+
+    try:
+        while True:
+            message = json.loads(read_frame(connection))
+            threading.Thread(target=reply, args=(message,), daemon=True).start()
+    except (ConnectionError, OSError):
+        connection.close()
+
+
+def main():
+    profile_dir = next(
+        arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--user-data-dir=")
+    )
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    with open(os.path.join(profile_dir, "DevToolsActivePort"), "w") as f:
+        f.write(f"{server.getsockname()[1]}\n/devtools/browser/fake")
+    while True:
+        connection, _ = server.accept()
+        threading.Thread(target=serve, args=(connection,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import random
+import unittest
+
+from interpreter.core.computer.utils.box_index import (
+    BoxGrid,
+    merge_overlapping,
+    overlaps,
+)
+
+
+def random_boxes(count, seed=0):
+    random.seed(seed)
+    boxes = []
+    for _ in range(count):
+        left, top = random.randint(0, 1000), random.randint(0, 700)
+        boxes.append(
+            (left, top, left + random.randint(5, 80), top + random.randint(5, 80))
+        )
+    return boxes
+
+
+class TestBoxGrid(unittest.TestCase):
+    def test_queries_match_brute_force(self):
+        boxes = random_boxes(300)
+        grid = BoxGrid(boxes, cell_size=32)
+        for box in random_boxes(100, seed=1):
+            self.assertEqual(
+                grid.overlapping(box),
+                [i for i, other in enumerate(boxes) if overlaps(other, box)],
+            )
+
+        self.assertTrue(grid.any_containing(boxes[0]))
+        self.assertFalse(grid.any_overlapping((-50, -50, -40, -40)))
+
+    def test_merge_leaves_no_overlaps(self):
+        merged = merge_overlapping(random_boxes(400))
+        for i, a in enumerate(merged):
+            for b in merged[i + 1 :]:
+                self.assertFalse(overlaps(a, b))
+
+        # A chain that only overlaps once the first merge has grown the box
+        self.assertEqual(
+            merge_overlapping([(0, 0, 10, 10), (20, 0, 30, 10), (5, 0, 25, 10)]),
+            [(0, 0, 30, 10)],
+        )
+        # Touching isn't overlapping
+        self.assertEqual(len(merge_overlapping([(0, 0, 10, 10), (10, 0, 20, 10)])), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import unittest
+from unittest import mock
+
+from interpreter.core.computer.utils.computer_sync import (
+    SYNC_MIMETYPE,
+    ComputerSync,
+    KernelSync,
+)
+
+
+class FakeComputer:
+    def __init__(self):
+        self.verbose = False
+        self.max_output = 2800
+        self.languages = ["python"]
+        self.system_message = "long"
+        self.interpreter = object()  # Not JSON, so never synced
+
+    def load_dict(self, data_dict):
+        for key, value in data_dict.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+
+def kernel_receive(code):
+    # What the kernel does with push_code()'s code, without the kernel
+    prefix = ".KernelSync.receive("
+    KernelSync.receive(eval(code[code.index(prefix) + len(prefix) : -1]))
+
+
+class TestComputerSync(unittest.TestCase):
+    def setUp(self):
+        self.ours = FakeComputer()
+        self.theirs = FakeComputer()
+        self.sync = ComputerSync(self.ours)
+        KernelSync.instance = None
+        KernelSync.pending = []
+        with mock.patch("IPython.get_ipython", return_value=None):
+            self.kernel = KernelSync.install(self.theirs)
+
+    def test_sends_everything_once_then_only_changes(self):
+        first = self.sync.changes()
+        self.assertEqual(json.loads(first["max_output"]), 2800)
+        self.assertNotIn("system_message", first)
+        self.assertNotIn("interpreter", first)
+        self.assertIsNone(self.sync.push_code())
+
+        self.ours.verbose = True
+        self.ours.max_output = 100
+        self.ours.max_output = 200
+        code = self.sync.push_code()
+        kernel_receive(code)
+
+        # Both changes arrive together, with only the last value
+        self.assertEqual(self.sync.kernel_state["max_output"], "200")
+        self.assertTrue(self.theirs.verbose)
+        self.assertEqual(self.theirs.max_output, 200)
+
+    def test_kernel_sends_back_only_what_the_code_changed(self):
+        kernel_receive(self.sync.push_code())
+        published = []
+        with mock.patch(
+            "IPython.display.publish_display_data", side_effect=published.append
+        ):
+            # What we just sent isn't echoed back
+            self.kernel.post_execute()
+            self.assertEqual(published, [])
+
+            self.theirs.languages = ["python", "shell"]
+            self.kernel.post_execute()
+
+        [data] = published
+        self.sync.apply(data[SYNC_MIMETYPE])
+        self.assertEqual(self.ours.languages, ["python", "shell"])
+        # And it isn't sent to the kernel again
+        self.assertIsNone(self.sync.push_code())
+
+    def test_deltas_wait_for_the_computer_api(self):
+        KernelSync.instance = None
+        KernelSync.receive(json.dumps({"verbose": "true"}))
+
+        computer = FakeComputer()
+        with mock.patch("IPython.get_ipython", return_value=None):
+            KernelSync.install(computer)
+        self.assertTrue(computer.verbose)
+        self.assertEqual(KernelSync.pending, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from interpreter.core.computer.utils.embedding_store import EmbeddingStore
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+        self.vectors = np.eye(4, dtype=np.float32) * 3
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_persists_between_instances(self):
+        store = EmbeddingStore(self.path)
+        store.add(["a", "b"], self.vectors[:2])
+
+        reopened = EmbeddingStore(self.path)
+        self.assertIn("a", reopened)
+        self.assertEqual(reopened.vectors.dtype, np.float16)
+        # Stored normalized
+        np.testing.assert_allclose(reopened.get("b"), [0, 1, 0, 0])
+
+    def test_search_ranks_by_cosine_similarity(self):
+        store = EmbeddingStore(self.path)
+        store.add(["a", "b", "c"], self.vectors[:3])
+
+        hits = store.search([0.1, 1, 0.5, 0], keys=["a", "b", "c"], top_k=2)
+        self.assertEqual([i for i, _ in hits], [1, 2])
+        self.assertAlmostEqual(hits[0][1], 1 / np.linalg.norm([0.1, 1, 0.5]), 3)
+
+        # Evicted (or never added) keys are skipped
+        hits = store.search([0, 0, 1, 0], keys=["gone", "a", "c"], top_k=1)
+        self.assertEqual(hits[0][0], 2)
+
+    def test_evicts_least_recently_used(self):
+        store = EmbeddingStore(self.path, max_entries=3)
+        store.add(["a", "b", "c"], self.vectors[:3])
+        store.get("a")
+        store.add(["d"], self.vectors[3:])
+
+        self.assertEqual(list(store.rows), ["c", "a", "d"])
+        self.assertNotIn("b", EmbeddingStore(self.path, max_entries=3))
+        np.testing.assert_allclose(store.get("d"), [0, 0, 0, 1])
+
+    def test_adds_are_logged_and_replayed(self):
+        store = EmbeddingStore(self.path, max_entries=3)
+        store.add(["a", "b", "c"], self.vectors[:3])
+        with open(store.index_path) as f:
+            index = f.read()
+
+        # One at a time, evicting as we go
+        for key, vector in zip(["d", "b", "e"], self.vectors[[3, 0, 1]]):
+            store.add([key], [vector])
+
+        with open(store.index_path) as f:
+            self.assertEqual(f.read(), index)
+        reopened = EmbeddingStore(self.path, max_entries=3)
+        self.assertEqual(list(reopened.rows.items()), list(store.rows.items()))
+        np.testing.assert_allclose(reopened.get("e"), [0, 1, 0, 0])
+
+        # Folded into the index once the log gets long
+        for i in range(1024):
+            store.add(["b"], self.vectors[:1])
+        self.assertLess(store.log_entries, 1024)
+        with open(store.index_path) as f:
+            self.assertNotEqual(f.read(), index)
+        reopened = EmbeddingStore(self.path, max_entries=3)
+        self.assertEqual(list(reopened.rows.items()), list(store.rows.items()))
+
+
+if __name__ == "__main__":
+    unittest.main()
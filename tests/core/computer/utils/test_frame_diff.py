@@ -0,0 +1,45 @@
+import unittest
+
+from PIL import Image, ImageDraw
+
+from interpreter.core.computer.utils.frame_diff import FrameDiff
+
+
+class TestFrameDiff(unittest.TestCase):
+    def setUp(self):
+        self.frames = FrameDiff(tile_size=32)
+        self.screen = Image.new("RGB", (640, 480), "white")
+
+    def test_first_frame_and_resizes_are_full(self):
+        self.assertEqual(self.frames.update(self.screen)["change"], "full")
+        self.assertEqual(
+            self.frames.update(Image.new("RGB", (320, 240)))["change"], "full"
+        )
+
+    def test_unchanged_and_changed_region(self):
+        self.frames.update(self.screen)
+        self.assertEqual(
+            self.frames.update(self.screen.copy()),
+            {"change": "none", "region": None, "image": None},
+        )
+
+        after = self.screen.copy()
+        ImageDraw.Draw(after).rectangle([(100, 100), (120, 110)], fill="black")
+        change = self.frames.update(after)
+        self.assertEqual(change["change"], "region")
+        # The tile it's in, plus one tile of margin
+        self.assertEqual(change["region"], (64, 64, 160, 160))
+        self.assertEqual(change["image"].size, (96, 96))
+
+        # Compared with the last frame, not the first
+        self.assertEqual(self.frames.update(after)["change"], "none")
+
+    def test_big_changes_are_full(self):
+        self.frames.update(self.screen)
+        change = self.frames.update(Image.new("RGB", (640, 480), "black"))
+        self.assertEqual(change["change"], "full")
+        self.assertEqual(change["region"], (0, 0, 640, 480))
+
+
+if __name__ == "__main__":
+    unittest.main()
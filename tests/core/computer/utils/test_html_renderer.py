@@ -0,0 +1,74 @@
+import base64
+import os
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from interpreter.core.computer.utils.html_renderer import HtmlRenderer
+
+FAKE_CHROME = os.path.join(os.path.dirname(__file__), "fake_chrome.py")
+
+
+def screenshot(renderer, html):
+    return base64.b64decode(renderer.screenshot_base64(html)).decode()
+
+
+@unittest.skipIf(os.name == "nt", "starts the fake Chrome through a shell script")
+class TestHtmlRenderer(unittest.TestCase):
+    def setUp(self):
+        # Started the way Chrome would be
+        self.directory = tempfile.TemporaryDirectory()
+        chrome = os.path.join(self.directory.name, "chrome")
+        with open(chrome, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CHROME}" "$@"\n')
+        os.chmod(chrome, os.stat(chrome).st_mode | stat.S_IEXEC)
+        patcher = mock.patch.dict(os.environ, {"CHROME_BIN": chrome})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.renderer = HtmlRenderer(pages=2)
+
+    def tearDown(self):
+        self.renderer.quit()
+        self.directory.cleanup()
+
+    def test_renders_reuse_one_chrome_and_its_pages(self):
+        self.assertEqual(screenshot(self.renderer, "<b>one</b>"), "<b>one</b>")
+        self.assertEqual(screenshot(self.renderer, "<b>two</b>"), "<b>two</b>")
+
+        self.assertEqual(self.renderer.stats["starts"], 1)
+        self.assertEqual(self.renderer.open_pages, 1)
+
+    def test_concurrent_renders_get_their_own_page_and_reply(self):
+        results = {}
+
+        def render(i):
+            results[i] = screenshot(self.renderer, f"<i>{i}</i>")
+
+        threads = [threading.Thread(target=render, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(results, {i: f"<i>{i}</i>" for i in range(8)})
+        # No more pages than the pool allows, all back in it
+        self.assertEqual(self.renderer.open_pages, 2)
+        self.assertEqual(len(self.renderer.free_pages), 2)
+
+    def test_a_new_chrome_after_a_crash(self):
+        screenshot(self.renderer, "<b>before</b>")
+        with self.assertRaises(ConnectionError):
+            # Crashes the new one it retries with, too
+            screenshot(self.renderer, "CRASH")
+
+        self.assertEqual(screenshot(self.renderer, "<b>after</b>"), "<b>after</b>")
+        self.assertEqual(self.renderer.stats["starts"], 3)
+        self.assertEqual(self.renderer.open_pages, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
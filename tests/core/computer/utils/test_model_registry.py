@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from interpreter.core.computer.utils.model_registry import ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry(idle_timeout=None)
+        self.loader = mock.Mock(side_effect=lambda: object())
+        self.registry.register("model", self.loader)
+
+    def test_loads_once_on_first_use(self):
+        self.assertEqual(self.loader.call_count, 0)
+        model = self.registry.get("model")
+
+        self.assertIs(self.registry.get("model"), model)
+        self.assertEqual(self.loader.call_count, 1)
+
+        stats = self.registry.stats()["models"]["model"]
+        self.assertTrue(stats["loaded"])
+        self.assertIsNotNone(stats["load_time"])
+
+    def test_unloads_idle_models(self):
+        self.registry.get("model")
+        self.registry.idle_timeout = 10
+        self.assertEqual(self.registry.unload_idle(), [])
+
+        with mock.patch("time.time", return_value=time.time() + 11):
+            self.assertEqual(self.registry.unload_idle(), ["model"])
+        self.assertFalse(self.registry.stats()["models"]["model"]["loaded"])
+
+        # Loaded again the next time it's needed
+        self.registry.get("model")
+        self.assertEqual(self.loader.call_count, 2)
+
+    def test_warmup_and_get_share_one_load(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_loader():
+            started.set()
+            release.wait(5)
+            return "model"
+
+        self.registry.register("slow", slow_loader)
+        thread = self.registry.warmup(["slow"])
+        started.wait(5)
+
+        getter = threading.Thread(target=self.registry.get, args=("slow",))
+        getter.start()
+        release.set()
+        thread.join(5)
+        getter.join(5)
+
+        self.assertEqual(self.registry.stats()["models"]["slow"]["loads"], 1)
+
+    def test_records_load_errors(self):
+        self.registry.register("broken", mock.Mock(side_effect=ImportError("torch")))
+        self.registry.warmup(["broken"]).join(5)
+        stats = self.registry.stats()["models"]["broken"]
+        self.assertIn("torch", stats["error"])
+        # It was never used
+        self.assertIsNone(stats["last_used"])
+
+    def test_get_while_unloading(self):
+        errors = []
+        stop = time.time() + 0.3
+
+        def get():
+            try:
+                while time.time() < stop:
+                    self.assertIsNotNone(self.registry.get("model"))
+            except Exception as e:
+                errors.append(e)
+
+        getters = [threading.Thread(target=get) for _ in range(4)]
+        for getter in getters:
+            getter.start()
+        while time.time() < stop:
+            self.registry.unload("model")
+        for getter in getters:
+            getter.join(5)
+
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
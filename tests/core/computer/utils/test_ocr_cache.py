@@ -0,0 +1,135 @@
+import unittest
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from interpreter.core.computer.utils.ocr_cache import OcrCache
+
+
+def fake_ocr(calls):
+    """
+    "Reads" every white rectangle as a word, so we can see which parts of an image were OCR'd.
+    """
+
+    def ocr(img):
+        calls.append(img.size)
+        data = {"text": [], "left": [], "top": [], "width": [], "height": []}
+        box = img.convert("L").point(lambda value: 255 if value > 128 else 0).getbbox()
+        if box:
+            data["text"].append(f"word{len(calls)}")
+            data["left"].append(box[0])
+            data["top"].append(box[1])
+            data["width"].append(box[2] - box[0])
+            data["height"].append(box[3] - box[1])
+        return data
+
+    return ocr
+
+
+def line_ocr(img):
+    """
+    Reads each white rectangle as a word named after its size, grouped into lines like tesseract.
+    """
+    white = np.asarray(img.convert("L")) > 128
+    data = {
+        key: []
+        for key in ["text", "left", "top", "width", "height"]
+        + ["block_num", "par_num", "line_num"]
+    }
+
+    def runs(values):
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], values, [0]])))
+        return list(zip(edges[::2], edges[1::2]))
+
+    for line, (top, bottom) in enumerate(runs(white.any(axis=1).astype(int)), 1):
+        for left, right in runs(white[top:bottom].any(axis=0).astype(int)):
+            for key, value in [
+                ("text", f"{right - left}x{bottom - top}"),
+                ("left", int(left)),
+                ("top", int(top)),
+                ("width", int(right - left)),
+                ("height", int(bottom - top)),
+                ("block_num", 1),
+                ("par_num", 1),
+                ("line_num", line),
+            ]:
+                data[key].append(value)
+    return data
+
+
+def text(data):
+    # Like pytesseract_get_text
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(line, []).append(word)
+    return "\n".join(" ".join(words) for words in lines.values())
+
+
+def screen(*boxes):
+    img = Image.new("RGB", (640, 480))
+    draw = ImageDraw.Draw(img)
+    for box in boxes:
+        draw.rectangle(box, fill="white")
+    return img
+
+
+class TestOcrCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = OcrCache()
+        self.calls = []
+        self.ocr = fake_ocr(self.calls)
+
+    def test_same_pixels_are_ocrd_once(self):
+        first = self.cache.get(screen((10, 10, 50, 20)), "fake", self.ocr)
+        second = self.cache.get(screen((10, 10, 50, 20)), "fake", self.ocr)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, [(640, 480)])
+        # Callers get their own copy to change
+        second["left"][0] = 999
+        self.assertEqual(
+            self.cache.get(screen((10, 10, 50, 20)), "fake", self.ocr)["left"][0], 10
+        )
+
+    def test_only_changed_region_is_ocrd_again(self):
+        self.cache.get(screen((10, 10, 50, 20)), "fake", self.ocr)
+        data = self.cache.get(
+            screen((10, 10, 50, 20), (400, 300, 440, 310)), "fake", self.ocr
+        )
+
+        self.assertEqual(len(self.calls), 2)
+        region_width, region_height = self.calls[1]
+        self.assertLess(region_width * region_height, 640 * 480 / 4)
+
+        # The old word is kept, and the new one is in screen coordinates
+        self.assertEqual(data["text"], ["word1", "word2"])
+        self.assertEqual((data["left"][1], data["top"][1]), (400, 300))
+        self.assertEqual(self.cache.stats["partial"], 1)
+
+    def test_partial_ocr_reads_in_the_same_order_as_a_full_one(self):
+        top = [(10, 10, 50, 20), (100, 10, 130, 20)]
+        bottom = [(10, 200, 40, 210)]
+        self.cache.get(screen(*top, (10, 100, 60, 110), *bottom), "lines", line_ocr)
+
+        # The middle line changes
+        changed = screen(*top, (10, 100, 90, 110), (120, 100, 140, 110), *bottom)
+        partial = self.cache.get(changed, "lines", line_ocr)
+
+        self.assertEqual(self.cache.stats["partial"], 1)
+        self.assertEqual(text(partial), text(line_ocr(changed)))
+        self.assertEqual(text(partial).split("\n")[1], "81x11 21x11")
+
+    def test_large_changes_are_ocrd_in_full(self):
+        self.cache.get(screen((10, 10, 50, 20)), "fake", self.ocr)
+        self.cache.get(screen((0, 0, 639, 479)), "fake", self.ocr)
+        self.assertEqual(self.calls, [(640, 480), (640, 480)])
+
+    def test_engines_are_cached_separately(self):
+        self.cache.get(screen(), "one", self.ocr)
+        self.cache.get(screen(), "two", self.ocr)
+        self.assertEqual(len(self.calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
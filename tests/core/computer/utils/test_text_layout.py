@@ -0,0 +1,61 @@
+import unittest
+
+from interpreter.core.computer.utils.text_layout import TextLayout
+
+
+def ocr_data(lines):
+    """
+    pytesseract-style data for lines of words, each word 10px per character plus a 10px gap.
+    """
+    data = {
+        key: []
+        for key in ["text", "left", "top", "width", "height", "block_num"]
+        + ["par_num", "line_num"]
+    }
+    for line_num, line in enumerate(lines):
+        left = 0
+        for word in line.split():
+            data["text"].append(word)
+            data["left"].append(left)
+            data["top"].append(line_num * 30)
+            data["width"].append(len(word) * 10)
+            data["height"].append(20)
+            data["block_num"].append(1)
+            data["par_num"].append(1)
+            data["line_num"].append(line_num)
+            left += len(word) * 10 + 10
+    return data
+
+
+class TestTextLayout(unittest.TestCase):
+    def setUp(self):
+        self.layout = TextLayout(
+            ocr_data(["File Edit View", "Sign in to continue", "Cancel Submit,"])
+        )
+
+    def test_substring_narrows_box_to_match(self):
+        left, top, width, height = self.layout.find_text("mit")
+        self.assertEqual(list(left), [70 + 30])
+        self.assertEqual(list(width), [30])
+        self.assertEqual(list(top), [60])
+
+    def test_phrase_across_adjacent_words(self):
+        left, top, width, height = self.layout.find_text("sign in")
+        self.assertEqual((left[0], top[0], width[0], height[0]), (0, 30, 70, 20))
+
+        # Adjacent, but on different lines
+        left, _, _, _ = self.layout.find_text("view sign", fuzzy=None)
+        self.assertEqual(len(left), 0)
+
+    def test_fuzzy_matches_ocr_mistakes(self):
+        self.assertEqual(len(self.layout.find_text("Subnit", fuzzy=None)[0]), 0)
+
+        left, top, _, _ = self.layout.find_text("Subnit")
+        self.assertEqual((left[0], top[0]), (70, 60))
+
+        left, top, width, _ = self.layout.find_text("in to contimue")
+        self.assertEqual((left[0], top[0], width[0]), (50, 30, 140))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import base64
+import io
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from interpreter.core.computer.vision.vision import Vision
+
+
+class StubMoondream:
+    def __init__(self):
+        self.images = []
+
+    def encode_image(self, img):
+        self.images.append(img)
+        return img
+
+    def answer_question(self, enc_image, query, tokenizer, max_length):
+        return f"a {enc_image.size[0]}x{enc_image.size[1]} image"
+
+
+class StubEasyOCR:
+    def __init__(self):
+        self.calls = 0
+
+    def readtext(self, array):
+        self.calls += 1
+        return [([[0, 0], [10, 0], [10, 5], [0, 5]], "hello", 0.9)]
+
+
+class TestVision(unittest.TestCase):
+    def setUp(self):
+        self.vision = Vision(mock.Mock())
+        self.vision.model = StubMoondream()
+        self.vision.tokenizer = object()
+        self.vision.easyocr = StubEasyOCR()
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (32, 16), "blue").save(buffer, format="PNG")
+        self.lmc = {
+            "type": "image",
+            "format": "base64.png",
+            "content": base64.b64encode(buffer.getvalue()).decode(),
+        }
+
+    def test_describe_decodes_in_memory_and_remembers(self):
+        with mock.patch.object(tempfile, "NamedTemporaryFile") as temp_file:
+            first = self.vision.describe(lmc=self.lmc)
+            second = self.vision.describe(lmc=dict(self.lmc))
+
+        temp_file.assert_not_called()
+        self.assertEqual(first, ("a 32x16 image", "hello"))
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.vision.model.images), 1)
+        self.assertEqual(self.vision.easyocr.calls, 1)
+
+    def test_ocr_accepts_pil_images(self):
+        img = Image.new("RGB", (8, 8), "red")
+        self.assertEqual(self.vision.ocr(pil_image=img), "hello")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+
+from interpreter.core.llm.utils.context_manager import ContextManager
+from interpreter.core.llm.utils.tokenizers import EstimateTokenizer
+
+
+class TestContextManager(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = EstimateTokenizer()
+        self.tokenizer.count = mock.Mock(side_effect=EstimateTokenizer().count)
+        self.context_manager = ContextManager(tokenizer=self.tokenizer)
+        self.messages = [
+            {"role": "user", "content": "a" * 400},
+            {"role": "assistant", "content": "b" * 400},
+            {"role": "user", "content": "c" * 40},
+        ]
+
+    def test_keeps_everything_that_fits(self):
+        messages = self.context_manager.trim(
+            self.messages, system_message="system", max_tokens=1000
+        )
+        self.assertEqual(messages[0], {"role": "system", "content": "system"})
+        self.assertEqual(messages[1:], self.messages)
+        self.assertEqual(self.context_manager.last_trim["dropped"], [])
+
+    def test_drops_oldest_and_shortens_boundary(self):
+        messages = self.context_manager.trim(self.messages, max_tokens=80)
+        report = self.context_manager.last_trim
+
+        self.assertEqual(report["dropped"], self.messages[:1])
+        self.assertIs(report["truncated"], self.messages[1])
+        self.assertEqual(messages[-1], self.messages[2])
+        self.assertIn("...", messages[0]["content"])
+        self.assertLessEqual(report["tokens"], 80)
+
+    def test_only_counts_new_messages(self):
+        self.context_manager.trim(self.messages, max_tokens=1000)
+        self.tokenizer.count.reset_mock()
+
+        # Fresh dicts with the same content still hit the cache
+        messages = [dict(message) for message in self.messages]
+        messages.append({"role": "assistant", "content": "d"})
+        self.context_manager.trim(messages, max_tokens=1000)
+
+        counted = [call.args[0] for call in self.tokenizer.count.call_args_list]
+        self.assertEqual(counted, ["role", "assistant", "content", "d"])
+
+    def test_summarizes_dropped_messages(self):
+        summarizer = mock.Mock(return_value="earlier stuff")
+        self.context_manager.summarizer = summarizer
+
+        messages = self.context_manager.trim(self.messages[1:] * 2, max_tokens=250)
+        self.context_manager.trim(self.messages[1:] * 2, max_tokens=250)
+
+        summarizer.assert_called_once_with(self.messages[1:2])
+        self.assertIn("earlier stuff", messages[0]["content"])
+        self.assertEqual(
+            self.context_manager.last_trim["summary"], messages[0]["content"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import base64
+import io
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from interpreter.core.llm.utils.convert_to_openai_messages import (
+    ConversionCache,
+    convert_to_openai_messages,
+)
+
+
+def png_base64():
+    buffered = io.BytesIO()
+    Image.new("RGB", (4, 4)).save(buffered, format="png")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+class TestConversionCache(unittest.TestCase):
+    def setUp(self):
+        self.interpreter = mock.Mock()
+        self.interpreter.user_message_template = "<{content}>"
+        self.interpreter.always_apply_user_message_template = False
+        self.interpreter.code_output_sender = "user"
+        self.interpreter.code_output_template = "Output: {content}"
+        self.interpreter.empty_code_output_template = "No output"
+        self.messages = [
+            {"role": "user", "type": "message", "content": "first"},
+            {"role": "assistant", "type": "code", "format": "python", "content": "1"},
+            {"role": "computer", "type": "console", "format": "output", "content": "1"},
+            {
+                "role": "computer",
+                "type": "image",
+                "format": "base64.png",
+                "content": png_base64(),
+            },
+            {"role": "user", "type": "message", "content": "second"},
+        ]
+
+    def convert(self, cache=None, function_calling=True):
+        return convert_to_openai_messages(
+            self.messages,
+            function_calling=function_calling,
+            vision=True,
+            interpreter=self.interpreter,
+            cache=cache,
+        )
+
+    def test_cached_conversion_matches_uncached(self):
+        cache = ConversionCache()
+
+        for function_calling in [True, False]:
+            expected = self.convert(function_calling=function_calling)
+            self.assertEqual(self.convert(cache, function_calling), expected)
+            self.assertEqual(self.convert(cache, function_calling), expected)
+
+    def test_only_new_or_changed_messages_are_converted(self):
+        # Arrange
+        cache = ConversionCache()
+        self.convert(cache)
+
+        # Act
+        self.messages[2]["content"] += "\n2"
+        self.messages.append(
+            {"role": "assistant", "type": "message", "content": "done"}
+        )
+        converted = self.convert(cache)
+
+        # Assert
+        self.assertEqual(cache.misses, 5 + 2)
+        self.assertEqual(cache.hits, 4)
+        self.assertEqual(converted, self.convert())
+
+    def test_user_template_follows_the_last_user_message(self):
+        cache = ConversionCache()
+        self.assertEqual(self.convert(cache)[-1]["content"], "<second>")
+
+        self.messages.append({"role": "user", "type": "message", "content": "third"})
+        converted = self.convert(cache)
+
+        self.assertEqual(converted[-2]["content"], "second")
+        self.assertEqual(converted[-1]["content"], "<third>")
+
+    def test_callers_can_edit_what_they_get(self):
+        cache = ConversionCache()
+        self.convert(cache)[1].pop("function_call")
+
+        self.assertIn("function_call", self.convert(cache)[1])
@@ -0,0 +1,53 @@
+import json
+import unittest
+
+from interpreter.core.llm.utils.parse_partial_json import PartialJSONParser
+
+
+def feed_in_pieces(s, size):
+    parser = PartialJSONParser()
+    code = ""
+    for i in range(0, len(s), size):
+        parser.feed(s[i : i + size])
+        code += parser.read("code")
+    return parser, code
+
+
+class TestPartialJSONParser(unittest.TestCase):
+    def test_matches_json_loads_for_any_split(self):
+        arguments = {
+            "language": "python",
+            "code": 'print("hi")\n\tx = "\\\\" # é 😀 \u0001',
+            "flags": [1, {"a": "}"}],
+            "timeout": 1.5,
+            "stream": None,
+        }
+        for ensure_ascii in [True, False]:
+            s = json.dumps(arguments, ensure_ascii=ensure_ascii)
+            for size in range(1, 8):
+                parser, code = feed_in_pieces(s, size)
+                self.assertFalse(parser.failed)
+                self.assertEqual(parser.values, arguments)
+                self.assertEqual(code, arguments["code"])
+
+    def test_partial_values(self):
+        parser = PartialJSONParser()
+        parser.feed('{"language": "python", "code": "import os\nos.get')
+
+        # Raw newlines are tolerated, like parse_partial_json does
+        self.assertEqual(parser.get("code"), "import os\nos.get")
+        self.assertEqual(parser.values, {"language": "python"})
+        self.assertEqual(parser.read("code"), "import os\nos.get")
+        self.assertEqual(parser.read("code"), "")
+
+    def test_not_json(self):
+        parser = PartialJSONParser()
+        parser.feed("import os")
+        parser.feed("\nprint(os.getcwd())")
+
+        self.assertTrue(parser.failed)
+        self.assertEqual(parser.read_raw(), "import os\nprint(os.getcwd())")
+
+
+if __name__ == "__main__":
+    unittest.main()
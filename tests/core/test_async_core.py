@@ -1,7 +1,14 @@
+import asyncio
 import os
+import threading
 from unittest import TestCase, mock
 
-from interpreter.core.async_core import Server, AsyncInterpreter
+from interpreter.core.async_core import (
+    AsyncInterpreter,
+    Server,
+    SessionManager,
+    iterate_in_thread,
+)
 
 
 class TestServerConstruction(TestCase):
@@ -46,3 +53,75 @@ class TestServerConstruction(TestCase):
             s = Server(AsyncInterpreter())
             self.assertEqual(s.host, fake_host)
             self.assertEqual(s.port, fake_port)
+
+
+class TestSessionManager(TestCase):
+    def setUp(self):
+        self.default = AsyncInterpreter()
+        self.default.llm.model = "some-model"
+        self.default.max_output = 1234
+        self.sessions = SessionManager(self.default, max_workers=2, timeout=60)
+
+    def tearDown(self):
+        self.sessions.shutdown()
+
+    def test_sessions_are_isolated(self):
+        a = self.sessions.get("a")
+        b = self.sessions.get("b")
+
+        self.assertIs(self.sessions.get("a"), a)
+        self.assertIs(self.sessions.get(None), self.default)
+        self.assertIsNot(a.computer, b.computer)
+        self.assertIsNot(a.stop_event, b.stop_event)
+
+        a.messages.append({"role": "user", "type": "message", "content": "hi"})
+        self.assertEqual(b.messages, [])
+
+        # Settings come from the default interpreter
+        self.assertEqual(b.llm.model, "some-model")
+        self.assertEqual(b.max_output, 1234)
+        self.assertIs(b.respond_pool, self.sessions.pool)
+
+    def test_idle_sessions_are_evicted(self):
+        self.sessions.connect("connected")
+        self.sessions.get("idle")
+        self.sessions.get("recent")
+
+        self.sessions.last_used["idle"] -= 120
+        self.sessions.last_used["connected"] -= 120
+
+        self.assertEqual(self.sessions.evict_idle(), ["idle"])
+        self.assertEqual(set(self.sessions.sessions), {"connected", "recent"})
+
+
+class TestIterateInThread(TestCase):
+    def test_yields_items_and_errors(self):
+        def numbers():
+            yield from range(100)
+            raise ValueError("done")
+
+        async def collect():
+            items = []
+            with self.assertRaises(ValueError):
+                async for item in iterate_in_thread(numbers, maxsize=4):
+                    items.append(item)
+            return items
+
+        self.assertEqual(asyncio.run(collect()), list(range(100)))
+
+    def test_stops_the_iterator_when_we_stop(self):
+        closed = threading.Event()
+
+        def forever():
+            try:
+                while True:
+                    yield "chunk"
+            finally:
+                closed.set()
+
+        async def take_one():
+            async for item in iterate_in_thread(forever, maxsize=1):
+                return item
+
+        self.assertEqual(asyncio.run(take_one()), "chunk")
+        self.assertTrue(closed.wait(5))
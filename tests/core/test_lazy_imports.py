@@ -0,0 +1,33 @@
+import subprocess
+import sys
+import unittest
+
+CHECK = """
+import sys
+from interpreter import interpreter
+
+def loaded(name):
+    return name in sys.modules and type(sys.modules[name]).__name__ != "_LazyModule"
+
+print(",".join(name for name in sys.argv[1:] if loaded(name)))
+interpreter.computer.clipboard
+print("clipboard" in interpreter.computer.__dict__)
+"""
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_import_skips_heavy_modules(self):
+        # A fresh process, since this one has probably imported everything already
+        result = subprocess.run(
+            [sys.executable, "-c", CHECK, "litellm", "jupyter_client", "fastapi"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        loaded, tool_created = result.stdout.splitlines()
+        self.assertEqual(loaded, "")
+        self.assertEqual(tool_created, "True")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+from interpreter.core.render_message import RenderCache, render_message
+
+
+class TestRenderMessage(unittest.TestCase):
+    def setUp(self):
+        self.interpreter = mock.Mock()
+        self.interpreter.render_cache = RenderCache()
+        self.interpreter.computer.run.return_value = [
+            {"type": "console", "format": "output", "content": "rendered"}
+        ]
+
+    def render(self, message):
+        return render_message(self.interpreter, message)
+
+    def test_blocks_without_a_cache_comment_always_run(self):
+        for _ in range(3):
+            self.assertEqual(self.render("A {{print(1)}} B"), "A rendered B")
+
+        self.assertEqual(self.interpreter.computer.run.call_count, 3)
+        self.assertEqual(self.interpreter.render_cache.stats()["misses"], 3)
+
+    def test_static_blocks_run_once(self):
+        message = "{{\n# cache: static\nprint(1)\n}}"
+
+        for _ in range(3):
+            self.render(message)
+
+        self.assertEqual(self.interpreter.computer.run.call_count, 1)
+        self.assertEqual(self.interpreter.render_cache.stats()["hits"], 2)
+
+    def test_per_turn_blocks_run_once_per_turn(self):
+        message = "{{\n# cache: per-turn\nprint(1)\n}}"
+
+        self.render(message)
+        self.render(message)
+        self.interpreter.render_cache.new_turn()
+        self.render(message)
+
+        self.assertEqual(self.interpreter.computer.run.call_count, 2)
+
+    def test_ttl_blocks_expire(self):
+        message = "{{\n# cache: 30s\nprint(1)\n}}"
+
+        with mock.patch("interpreter.core.render_message.time.time", return_value=100):
+            self.render(message)
+        with mock.patch("interpreter.core.render_message.time.time", return_value=120):
+            self.render(message)
+        with mock.patch("interpreter.core.render_message.time.time", return_value=131):
+            self.render(message)
+
+        self.assertEqual(self.interpreter.computer.run.call_count, 2)
+
+    def test_dependencies_invalidate(self):
+        message = "{{\n# cache: static\n# depends: os\nprint(1)\n}}"
+
+        self.interpreter.os = False
+        self.render(message)
+        self.render(message)
+        self.interpreter.os = True
+        self.render(message)
+
+        self.assertEqual(self.interpreter.computer.run.call_count, 2)
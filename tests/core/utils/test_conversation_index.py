@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+from interpreter.core.utils.conversation_index import ConversationIndex
+from interpreter.core.utils.conversation_journal import (
+    ConversationJournal,
+    load_conversation,
+)
+
+
+class TestConversationIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = ConversationIndex(self.directory.name)
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def save(self, filename, messages):
+        journal = ConversationJournal(os.path.join(self.directory.name, filename))
+        journal.save(messages)
+        self.index.update(filename, messages, start=journal.kept, model="gpt-4o")
+        return journal
+
+    def test_saves_keep_the_index_in_sync(self):
+        messages = [{"role": "user", "type": "message", "content": "plot a sine wave"}]
+        journal = ConversationJournal(
+            os.path.join(self.directory.name, "Plot__1.jsonl")
+        )
+        journal.save(messages)
+        self.index.update("Plot__1.jsonl", messages, start=journal.kept)
+
+        messages.append(
+            {"role": "assistant", "type": "code", "format": "python", "content": "x"}
+        )
+        journal.save(messages)
+        self.index.update("Plot__1.jsonl", messages, start=journal.kept)
+
+        [conversation] = self.index.page()
+        self.assertEqual(conversation["title"], "Plot... (1)")
+        self.assertEqual(conversation["message_count"], 2)
+        self.assertGreater(conversation["token_count"], 0)
+
+        # Nothing to do, since the index is already up to date
+        self.index.sync()
+        self.assertEqual(self.index.count(), 1)
+
+    def test_pages_newest_first_and_searches_text(self):
+        for i in range(5):
+            self.save(
+                f"Chat_{i}__1.jsonl",
+                [{"role": "user", "type": "message", "content": f"topic{i} weather"}],
+            )
+            # Make sure the modification times differ
+            path = os.path.join(self.directory.name, f"Chat_{i}__1.jsonl")
+            os.utime(path, (1000 + i, 1000 + i))
+        self.index.sync()
+
+        titles = [c["title"] for c in self.index.page(offset=1, limit=2)]
+        self.assertEqual(titles, ["Chat 3... (1)", "Chat 2... (1)"])
+
+        results = self.index.search("topic2 weather")
+        self.assertEqual([r["filename"] for r in results], ["Chat_2__1.jsonl"])
+        self.assertIn("[topic2]", results[0]["snippet"])
+        self.assertEqual(len(self.index.search("weather", limit=10)), 5)
+        self.assertEqual(self.index.search('"unbalanced'), [])
+
+    def test_sync_picks_up_outside_changes(self):
+        self.save("Old__1.jsonl", [{"role": "user", "type": "message", "content": "a"}])
+        with open(os.path.join(self.directory.name, "Other__2.json"), "w") as f:
+            f.write('[{"role": "user", "type": "message", "content": "hello"}]')
+        os.remove(os.path.join(self.directory.name, "Old__1.jsonl"))
+
+        self.index.sync()
+        self.assertEqual([c["filename"] for c in self.index.page()], ["Other__2.json"])
+        self.assertEqual(len(self.index.search("hello")), 1)
+
+    def test_sync_deletes_blobs_nothing_refers_to(self):
+        def screenshot(seed):
+            return {"role": "computer", "type": "image", "content": str(seed) * 10000}
+
+        kept = self.save("Kept__1.jsonl", [screenshot(1), screenshot(2)])
+        self.save("Deleted__2.jsonl", [screenshot(3)])
+        # The same screenshot as in Kept, stored once
+        self.save("Shared__3.jsonl", [screenshot(1)])
+        # Drop the second screenshot, then compact it away
+        kept.save([screenshot(1)])
+        kept.compact()
+        os.remove(os.path.join(self.directory.name, "Deleted__2.jsonl"))
+
+        self.index.blob_min_age = 0
+        self.index.sync()
+
+        blobs = os.path.join(self.directory.name, "blobs")
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(blobs)), 1)
+        path = os.path.join(self.directory.name, "Kept__1.jsonl")
+        self.assertEqual(load_conversation(path), [screenshot(1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from interpreter.core.utils.conversation_journal import (
+    ConversationJournal,
+    load_conversation,
+)
+
+
+def screenshot(seed):
+    return {
+        "role": "computer",
+        "type": "image",
+        "format": "base64.png",
+        "content": str(seed) * 10000,
+    }
+
+
+class TestConversationJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "chat.jsonl")
+        self.messages = [
+            {"role": "user", "type": "message", "content": "hi"},
+            screenshot(1),
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def line_count(self):
+        with open(self.path) as f:
+            return len(f.readlines())
+
+    def test_appends_only_new_messages_and_stores_images_once(self):
+        journal = ConversationJournal(self.path)
+        self.assertEqual(journal.save(self.messages), 2)
+        self.assertEqual(journal.save(self.messages), 0)
+
+        self.messages += [
+            {"role": "assistant", "type": "message", "content": "hello"},
+            screenshot(1),
+        ]
+        self.assertEqual(journal.save(self.messages), 2)
+
+        self.assertEqual(load_conversation(self.path), self.messages)
+        # The screenshot is in the blob store, not the journal, and stored once
+        self.assertLess(os.path.getsize(self.path), 1000)
+        blobs = os.path.join(self.directory.name, "blobs")
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(blobs)), 1)
+
+    def test_edits_truncate_and_compact(self):
+        journal = ConversationJournal(self.path, compact_ratio=2)
+        journal.save(self.messages)
+
+        # Undo the last message, then say something else
+        self.messages[-1] = {"role": "user", "type": "message", "content": "again"}
+        journal.save(self.messages)
+        self.assertEqual(self.line_count(), 4)
+        self.assertEqual(load_conversation(self.path), self.messages)
+
+        # Too many superseded lines, so it's rewritten as just the live messages
+        self.messages[-1]["content"] = "and again"
+        journal.save(self.messages)
+        self.assertEqual(self.line_count(), 2)
+        self.assertEqual(load_conversation(self.path), self.messages)
+
+    def test_recovers_from_a_torn_write(self):
+        ConversationJournal(self.path).save(self.messages)
+        with open(self.path, "a") as f:
+            f.write('{"role": "assistant", "type": "mess')
+
+        self.assertEqual(load_conversation(self.path), self.messages)
+
+        # Reopening picks up where the journal left off, without the torn line
+        journal = ConversationJournal(self.path)
+        self.messages.append({"role": "assistant", "type": "message", "content": "!"})
+        self.assertEqual(journal.save(self.messages), 1)
+        self.assertEqual(load_conversation(self.path), self.messages)
+
+
+if __name__ == "__main__":
+    unittest.main()
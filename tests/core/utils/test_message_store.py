@@ -0,0 +1,85 @@
+import threading
+import unittest
+
+from interpreter.core.utils.message_store import MessageStore, OutputRingBuffer
+from interpreter.core.utils.truncate_output import truncate_output
+
+
+class TestOutputRingBuffer(unittest.TestCase):
+    def test_matches_truncate_output_after_every_chunk(self):
+        chunks = ["line %d\n" % i for i in range(500)] + ["x" * 5000, "tail"]
+
+        # Arrange
+        expected = ""
+        buffer = OutputRingBuffer(100, add_scrollbars=True)
+
+        # Act
+        for chunk in chunks:
+            expected = truncate_output(expected + chunk, 100, add_scrollbars=True)
+            buffer.append(chunk)
+
+        # Assert
+        self.assertEqual(buffer.materialize(), expected)
+        self.assertLessEqual(buffer.size, 100)
+
+    def test_short_output_is_untouched(self):
+        buffer = OutputRingBuffer(100, initial="hello")
+        buffer.append(" world")
+        self.assertEqual(buffer.materialize(), "hello world")
+
+
+class TestMessageStore(unittest.TestCase):
+    def test_flush_writes_content_back(self):
+        # Arrange
+        store = MessageStore()
+        message = {"role": "assistant", "type": "message", "content": "Hel"}
+
+        # Act
+        store.open(message)
+        store.append("lo")
+        store.append(" there")
+
+        # Assert
+        self.assertEqual(message["content"], "Hel")
+        store.flush()
+        self.assertEqual(message["content"], "Hello there")
+        self.assertFalse(store.is_open(message))
+
+    def test_opening_another_message_flushes_the_first(self):
+        store = MessageStore()
+        first = {"role": "assistant", "type": "message", "content": "a"}
+        second = {
+            "role": "computer",
+            "type": "console",
+            "format": "output",
+            "content": "",
+        }
+
+        store.open(first)
+        store.append("b")
+        store.open(second, max_output_chars=3)
+        store.append("12345")
+        store.flush()
+
+        self.assertEqual(first["content"], "ab")
+        self.assertEqual(second["content"], truncate_output("12345", 3))
+
+    def test_flushing_from_another_thread_while_appending(self):
+        store = MessageStore()
+        message = {"role": "assistant", "type": "message", "content": ""}
+        appended = threading.Event()
+
+        def flush():
+            # Like the server reading interpreter.messages while a reply streams
+            while not appended.is_set():
+                store.flush()
+
+        flusher = threading.Thread(target=flush)
+        flusher.start()
+        for _ in range(20000):
+            store.append_to(message, "x")
+        appended.set()
+        flusher.join()
+        store.flush()
+
+        self.assertEqual(message["content"], "x" * 20000)
@@ -0,0 +1,106 @@
+import io
+import time
+import unittest
+
+from rich.box import MINIMAL
+from rich.console import Console
+from rich.markdown import Markdown
+from rich.panel import Panel
+
+from interpreter.terminal_interface.components.base_block import BaseBlock
+from interpreter.terminal_interface.components.code_block import CodeBlock
+from interpreter.terminal_interface.components.message_block import (
+    MessageBlock,
+    textify_markdown_code_blocks,
+)
+
+MESSAGE = """# Plan
+
+First I'll look at the file.
+
+- one
+- two
+
+  still two
+
+```python
+print("hi")
+```
+
+---
+| a | b |
+|---|---|
+| 1 | 2 |
+
+    indented
+
+Done."""
+
+
+class FakeLive:
+    def __init__(self):
+        self.renders = 0
+
+    def update(self, renderable):
+        self.renderable = renderable
+
+    def refresh(self):
+        self.renders += 1
+
+    def stop(self):
+        pass
+
+
+def draw(renderable):
+    console = Console(file=io.StringIO(), width=60, color_system=None)
+    console.print(renderable)
+    return console.file.getvalue()
+
+
+def block(cls):
+    block = cls()
+    block.live.stop()
+    block.live = FakeLive()
+    return block
+
+
+class TestBlocks(unittest.TestCase):
+    def tearDown(self):
+        BaseBlock.max_fps = 30
+
+    def test_streamed_message_draws_like_the_whole_message(self):
+        BaseBlock.max_fps = 0
+        message_block = block(MessageBlock)
+        for character in MESSAGE:
+            message_block.message += character
+            message_block.refresh()
+
+        # Most of it was finished along the way, and isn't drawn again
+        self.assertGreater(len(message_block.finished), 4)
+
+        content = textify_markdown_code_blocks(MESSAGE) + "●"
+        self.assertEqual(
+            draw(message_block.live.renderable),
+            draw(Panel(Markdown(content.strip()), box=MINIMAL)),
+        )
+
+    def test_refreshes_are_coalesced(self):
+        BaseBlock.max_fps = 10
+        code_block = block(CodeBlock)
+        code_block.language = "python"
+        for i in range(50):
+            code_block.code += f"x = {i}\n"
+            code_block.refresh()
+        self.assertEqual(code_block.live.renders, 1)
+
+        # The last refresh is drawn once the frame is up, without another chunk
+        time.sleep(0.2)
+        self.assertEqual(code_block.live.renders, 2)
+        self.assertIn("x = 49", draw(code_block.live.renderable))
+
+        code_block.end()
+        self.assertEqual(code_block.live.renders, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()